@@ -1,11 +1,30 @@
 import logging
 import os
-import yt_dlp
+import sys
 import json
 import contextlib
 import io
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Make the shared `common` package importable when run as a script
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common.melody import ensure_melody, melody_path
+from common.metrics import instrument_tool, record_cache_lookup, stage
+from common.offline_mode import FAKE_SERVICES, load_fake_library, pick_fake_song
+from common.song_index import LibrarySearch
+from common.song_library import SongLibrary
+from common.startup_profile import lazy_module, mark_ready, start_background_warmup
+from common.video import (RENDITIONS, faststart_path, have_ffmpeg, is_faststart, make_faststart, make_rendition,
+                          rendition_path)
+
 from mcp.server.fastmcp import FastMCP
 
+# yt-dlp registers hundreds of extractors on import; defer it
+yt_dlp = lazy_module("yt_dlp")
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("AudioPlaybackMCP")
@@ -20,100 +39,209 @@ SONGS_DIR = os.path.join(BASE_DIR, "songs")
 if not os.path.exists(SONGS_DIR):
     os.makedirs(SONGS_DIR)
 
-def download_video(query: str):
+# Downloaded songs, the queries that found them, and cached search results
+library = SongLibrary(SONGS_DIR)
+# Fuzzy search over the library (rebuilt when library.json changes)
+library_search = LibrarySearch(SONGS_DIR)
+
+# Extract each song's reference melody after download, off the request path
+# (set AUDIO_MELODY_EXTRACTION=0 to disable)
+MELODY_EXTRACTION = os.getenv("AUDIO_MELODY_EXTRACTION", "1") != "0"
+
+# Extra video renditions to transcode after download, e.g. "low" (see common.video.RENDITIONS);
+# empty = serve the original only
+VIDEO_RENDITIONS = [name for name in os.getenv("AUDIO_VIDEO_RENDITIONS", "").split(",") if name in RENDITIONS]
+
+# One worker for all post-download jobs, so they never compete with a download for CPU
+_post_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="post-download")
+_post_pending = set()
+_post_lock = threading.Lock()
+
+def _run_post_job(key, label, fn, *args):
+    t0 = time.perf_counter()
+    try:
+        fn(*args)
+        logger.info(f"{label} ready ({time.perf_counter() - t0:.1f}s)")
+    except Exception as e:
+        logger.error(f"{label} failed: {e}")
+    finally:
+        with _post_lock:
+            _post_pending.discard(key)
+
+def schedule_post_job(output_path: str, label: str, fn, *args) -> bool:
+    """Queues `fn(*args)` unless `output_path` exists or is already queued. Returns True if it exists."""
+    if os.path.exists(output_path):
+        return True
+    with _post_lock:
+        if output_path not in _post_pending:
+            _post_pending.add(output_path)
+            _post_pool.submit(_run_post_job, output_path, label, fn, *args)
+    return False
+
+def schedule_melody_extraction(file_path: str) -> bool:
+    """Queues contour extraction for a downloaded song. Returns True if the contour already exists."""
+    return schedule_post_job(melody_path(file_path), f"Melody contour for {os.path.basename(file_path)}",
+                             ensure_melody, file_path)
+
+def prepare_video(file_path: str) -> dict:
     """
-    Searches for a video and downloads it as MP4.
-    Returns filename (basename) and title.
+    Queues a faststart copy of an MP4 whose index sits at the end (downloads
+    that weren't merged by ffmpeg) and the configured lower renditions.
+    Returns {rendition: url} of what is ready now; "original" is the
+    faststart copy once it exists.
+    """
+    filename = os.path.basename(file_path)
+    renditions = {"original": f"/songs/{filename}"}
+    if not file_path.endswith(".mp4") or not have_ffmpeg():
+        return renditions
+
+    try:
+        with stage("faststart_check"):
+            needs_faststart = not is_faststart(file_path)
+    except OSError as e:
+        logger.error(f"Could not read {filename}: {e}")
+        needs_faststart = False
+    if needs_faststart:
+        # Until the copy is ready the original still plays, just slower to start
+        fast = faststart_path(file_path)
+        if schedule_post_job(fast, f"Faststart copy of {filename}", make_faststart, file_path):
+            renditions["original"] = f"/songs/{os.path.basename(fast)}"
+
+    for name in VIDEO_RENDITIONS:
+        out = rendition_path(file_path, name)
+        if schedule_post_job(out, f"Rendition '{name}' of {filename}", make_rendition, file_path, name):
+            renditions[name] = f"/songs/{os.path.basename(out)}"
+    return renditions
+
+def fake_download(query: str):
+    """Offline mode: resolves the query to a pre-seeded song instead of YouTube."""
+    song = pick_fake_song(query, load_fake_library(SONGS_DIR))
+    file_path = os.path.join(SONGS_DIR, song["file"])
+    return {
+        "url": f"/songs/{song['file']}",
+        "title": song["title"],
+        "track": song["title"],
+        "file_path": os.path.abspath(file_path)
+    }
+
+def _pick_result(results):
+    """First search result longer than a minute (skips Shorts/teasers), else the first."""
+    for entry in results:
+        if (entry.get('duration') or 0) > 60:
+            return entry
+    return results[0] if results else None
+
+def _song_result(song: dict) -> dict:
+    title = song.get("title") or song["id"]
+    return {
+        "url": f"/songs/{song['file']}",
+        "title": title,
+        "track": title,
+        "file_path": os.path.abspath(os.path.join(SONGS_DIR, song["file"]))
+    }
+
+def search_videos(query: str) -> list:
     """
-    # Updated ydl_opts based on the instruction
-    # Updated ydl_opts based on the instruction
+    Flat YouTube search: ids, titles and durations of the top 5 results from a
+    single results page, without resolving each video's formats. Cached per
+    normalized query in the song library.
+    """
+    results = library.cached_search(query)
+    record_cache_lookup("search_results", results is not None)
+    if results is not None:
+        return results
+
     ydl_opts = {
-        'format': 'bestvideo[ext=mp4][vcodec^=avc1]+bestaudio[ext=m4a]/best[ext=mp4]/best', # Force h264 for browser playback
-        'merge_output_format': 'mp4', # Force merge to mp4
-        'outtmpl': os.path.join(SONGS_DIR, '%(id)s.%(ext)s'),
         'quiet': True,
         'no_warnings': True,
-        'noprogress': True,
         'noplaylist': True,
-        'default_search': 'ytsearch5:',
-        'extract_flat': False,
+        'extract_flat': 'in_playlist',
     }
+    logger.info(f"Searching for: {query}")
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        with stage("search"), yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            info = ydl.extract_info(f"ytsearch5:{query}", download=False)
 
-    # Cache file for query -> video_id mapping
-    CACHE_FILE = os.path.join(SONGS_DIR, "query_cache.json")
-    query_cache = {}
-    if os.path.exists(CACHE_FILE):
-        try:
-            with open(CACHE_FILE, 'r') as f:
-                query_cache = json.load(f)
-        except:
-            pass
-
-    # Check cache first
-    cached_id = query_cache.get(query)
-    if cached_id:
-        file_path = os.path.join(SONGS_DIR, f"{cached_id}.mp4")
-        if os.path.exists(file_path):
-            logger.info(f"Cache hit for '{query}' -> {cached_id}")
-            return {
-                "url": f"/songs/{cached_id}.mp4",
-                "title": f"Cached: {query}", # We might lose original title, but speed is key
-                "track": f"Cached: {query}",
-                "file_path": os.path.abspath(file_path)
-            }
+    results = [{
+        "id": entry['id'],
+        "title": entry.get('title'),
+        "duration": entry.get('duration'),
+        "channel": entry.get('channel') or entry.get('uploader'),
+        "url": entry.get('url') or f"https://www.youtube.com/watch?v={entry['id']}",
+    } for entry in info.get('entries') or [] if entry.get('id')]
+    if results:
+        library.store_search(query, results)
+    return results
+
+def download_video(query: str):
+    """
+    Resolves a query to a local MP4, downloading it only if needed.
+    Returns filename (basename) and title.
+    """
+    if FAKE_SERVICES:
+        return fake_download(query)
+
+    # 1. Asked for with these exact words before
+    song = library.find_by_query(query)
+    record_cache_lookup("query_cache", song is not None)
+    if song:
+        logger.info(f"Cache hit for '{query}' -> {song['id']}")
+        return _song_result(song)
+
+    # 2. Different phrasing of a song we already have
+    with stage("library_match"):
+        song, score = library.match(query)
+    record_cache_lookup("library_match", song is not None)
+    if song:
+        logger.info(f"Library match for '{query}' -> {song['id']} ({song.get('title')}, score {score:.0f})")
+        library.record(song["id"], song["file"], query=query)
+        return _song_result(song)
 
     try:
-        # Redirect stdout/stderr to suppress any leaking output from yt-dlp
-        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                logger.info(f"Searching for: {query}")
-                info = ydl.extract_info(query, download=False)
-                
-                video_info = None
-                if 'entries' in info:
-                    # Filter for videos > 60s to avoid Shorts/Teasers
-                    for entry in info['entries']:
-                        duration = entry.get('duration', 0)
-                        if duration > 60:
-                            video_info = entry
-                            break
-                    
-                    # Fallback to first if no long video found
-                    if not video_info and info['entries']:
-                        video_info = info['entries'][0]
-                else:
-                    video_info = info
-
-                if not video_info:
-                     raise Exception("No video found")
-
-                video_id = video_info['id']
-                title = video_info['title']
-                file_path = os.path.join(SONGS_DIR, f"{video_id}.mp4")
-
-                # Download if not exists
-                if not os.path.exists(file_path):
-                    logger.info(f"Downloading video: {title}")
-                    ydl_opts['default_search'] = 'ytsearch1:' # Reset
-                    with yt_dlp.YoutubeDL(ydl_opts) as ydl_download:
-                        ydl_download.download([video_info['webpage_url']])
-                
-                # Update Cache
-                query_cache[query] = video_id
-                with open(CACHE_FILE, 'w') as f:
-                    json.dump(query_cache, f)
-            
-            return {
-                "url": f"/songs/{video_id}.mp4",
-                "title": title,
-                "track": title,
-                "file_path": os.path.abspath(file_path)
+        # 3. Cached or flat search results; the chosen video may be on disk under another query
+        video_info = _pick_result(search_videos(query))
+        if not video_info:
+            raise Exception("No video found")
+
+        video_id = video_info['id']
+        title = video_info['title'] or video_id
+        file_path = os.path.join(SONGS_DIR, f"{video_id}.mp4")
+
+        # 4. Full extraction and download only for that one video
+        file_exists = os.path.exists(file_path)
+        record_cache_lookup("video_files", file_exists)
+        if not file_exists:
+            ydl_opts = {
+                'format': 'bestvideo[ext=mp4][vcodec^=avc1]+bestaudio[ext=m4a]/best[ext=mp4]/best', # Force h264 for browser playback
+                'merge_output_format': 'mp4', # Force merge to mp4
+                # Index (moov) first, written during the merge itself (prepare_video copies unmerged downloads)
+                'postprocessor_args': {'merger': ['-movflags', '+faststart']},
+                'outtmpl': os.path.join(SONGS_DIR, '%(id)s.%(ext)s'),
+                'quiet': True,
+                'no_warnings': True,
+                'noprogress': True,
+                'noplaylist': True,
             }
+            logger.info(f"Downloading video: {title}")
+            # Redirect stdout/stderr to suppress any leaking output from yt-dlp
+            with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+                with stage("download"), yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                    ydl.download([video_info['url']])
+
+        library.record(video_id, f"{video_id}.mp4", query=query, title=title,
+                       duration=video_info.get('duration'), channel=video_info.get('channel'))
+        return {
+            "url": f"/songs/{video_id}.mp4",
+            "title": title,
+            "track": title,
+            "file_path": os.path.abspath(file_path)
+        }
     except Exception as e:
         logger.error(f"Error in download_video: {e}")
         raise e
 
 @mcp.tool()
+@instrument_tool
 def play_song(query: str) -> str:
     """
     Searches for a karaoke video, downloads it, and returns the playback details.
@@ -122,7 +250,10 @@ def play_song(query: str) -> str:
         query: Song title (e.g. "Bohemian Rhapsody")
         
     Returns:
-        JSON string containing track title, url, file_path, and is_sing_king flag.
+        JSON string containing track title, url, file_path, is_sing_king flag,
+        renditions ({"original": url, "low": url, ...}: the video versions ready to
+        play; lower ones appear once transcoded) and melody_ready (whether the
+        reference melody contour has been extracted yet).
     """
     search_query = f"{query} karaoke"
     try:
@@ -135,17 +266,22 @@ def play_song(query: str) -> str:
 
         title = video_data['title']
         is_sing_king = "sing king" in title.lower()
+
+        # The contour is queued first: scoring needs it sooner than a lower rendition
+        melody_ready = schedule_melody_extraction(file_path) if MELODY_EXTRACTION else False
+        renditions = prepare_video(file_path)
         
-        # Construct URL relative to the Host
-        filename = os.path.basename(file_path)
-        url = f"/songs/{filename}"
+        # Relative to the Host; the faststart copy once there is one
+        url = renditions["original"]
 
         result = {
             "status": "success", 
             "track": title,
             "url": url,
             "file_path": file_path,
-            "is_sing_king": is_sing_king
+            "is_sing_king": is_sing_king,
+            "renditions": renditions,
+            "melody_ready": melody_ready
         }
         return json.dumps(result)
         
@@ -154,9 +290,31 @@ def play_song(query: str) -> str:
         return json.dumps({"error": str(e)})
 
 @mcp.tool()
+@instrument_tool
+def search_library(query: str, limit: int = 5) -> str:
+    """
+    Finds songs that are already downloaded, so they play without a YouTube search.
+    Typos and partial titles are fine.
+
+    Args:
+        query: Song title, artist or part of either (e.g. "bohem", "queen")
+        limit: Maximum number of results
+
+    Returns:
+        JSON string {"results": [...]}, best match first. Each result has id, title,
+        song, artist, duration, url and score (0-100).
+    """
+    with stage("library_search"):
+        results = library_search.search(query, max(1, min(limit, 25)))
+    return json.dumps({"results": results})
+
+@mcp.tool()
+@instrument_tool
 def stop_song() -> str:
     """Stops the current song playback."""
     return json.dumps({"status": "stopped"})
 
 if __name__ == "__main__":
+    mark_ready()
+    start_background_warmup(["yt_dlp", "librosa"] if MELODY_EXTRACTION else ["yt_dlp"])
     mcp.run()
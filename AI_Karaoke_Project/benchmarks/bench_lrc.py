@@ -0,0 +1,149 @@
+"""
+LRC parsing throughput and coverage: the old per-line regex parser vs. common.lrc.
+
+Generates a synthetic corpus of LRC files the way lyric providers serve them:
+plain lines, choruses stamped with several times on one line, enhanced
+(word-timed) lines, blank end-of-line markers and offset headers. Each parser
+turns every file into a timeline; the report gives lines/s, MB/s and how many
+of the sung lines each one recovered.
+
+Usage:
+    python benchmarks/bench_lrc.py --files 2000 --lines 60 --repeats 5
+    python benchmarks/bench_lrc.py --plain        # plain lines only: same output, speed alone
+"""
+
+import argparse
+import json
+import random
+import re
+import statistics
+import sys
+import time
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_DIR))
+
+from common.lrc import parse_lrc  # noqa: E402
+from common.timeline import from_lines  # noqa: E402
+
+WORDS = ["love", "night", "baby", "dance", "heart", "fire", "light", "dream", "never", "forever",
+         "tonight", "sky", "home", "gold", "river", "stay", "run", "alone", "together", "Bohemian"]
+
+
+def _stamp(t: float) -> str:
+    return f"{int(t // 60):02d}:{t % 60:05.2f}"
+
+
+def make_lrc(rng: random.Random, n_lines: int, plain: bool = False):
+    """One synthetic LRC file and the number of sung lines it contains (`plain`: one tag, no word tags)."""
+    out = [f"[ar:Artist {rng.randint(1, 999)}]", f"[ti:Song {rng.randint(1, 9999)}]", "[by:bench]"]
+    if rng.random() < 0.3:
+        out.append(f"[offset:{rng.choice(['+', '-'])}{rng.randint(50, 500)}]")
+    chorus = " ".join(rng.choice(WORDS) for _ in range(5))
+    chorus_times = []
+    sung = 0
+    t = rng.uniform(5, 15)
+    for _ in range(n_lines):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(3, 8))]
+        kind = 1.0 if plain else rng.random()
+        if kind < 0.15:
+            # Chorus: stamped once per repeat, written out on one line at the end
+            chorus_times.append(t)
+            sung += 1
+        elif kind < 0.45:
+            # Enhanced LRC: a tag before every word and one after the last
+            tags, w_t = [], t
+            for word in words:
+                tags.append(f"<{_stamp(w_t)}>{word} ")
+                w_t += rng.uniform(0.25, 0.6)
+            out.append(f"[{_stamp(t)}]{''.join(tags).rstrip()}<{_stamp(w_t)}>")
+            sung += 1
+        else:
+            out.append(f"[{_stamp(t)}]{' '.join(words)}")
+            sung += 1
+        t += rng.uniform(2.5, 5.0)
+        if rng.random() < 0.1:
+            # Instrumental break: a blank stamped line ends the previous line
+            out.append(f"[{_stamp(t)}]")
+            t += rng.uniform(4, 12)
+    if chorus_times:
+        out.append("".join(f"[{_stamp(ct)}]" for ct in chorus_times) + chorus)
+    return "\n".join(out), sung
+
+
+def legacy_parse(lrc_text: str) -> dict:
+    """The regex parser search_lyrics used before common.lrc, plus the timeline conversion it fed."""
+    lines = lrc_text.split('\n')
+    parsed = []
+    regex = re.compile(r'\[(\d+):(\d+(?:\.\d+)?)\](.*)')
+
+    for line in lines:
+        match = regex.match(line.strip())
+        if match:
+            minutes = int(match.group(1))
+            seconds = float(match.group(2))
+            text = match.group(3).strip()
+            total_seconds = minutes * 60 + seconds
+            if text:
+                parsed.append({"timestamp": total_seconds, "text": text})
+    return from_lines(parsed)
+
+
+def run(parser, corpus, repeats):
+    timings = []
+    recovered = 0
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        timelines = [parser(text) for text in corpus]
+        timings.append(time.perf_counter() - t0)
+        recovered = sum(len(tl["t"]) for tl in timelines)
+    clean = sum(1 for tl in timelines for text in tl["text"] if "<" not in text and "[" not in text)
+    return statistics.median(timings), recovered, clean
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark LRC parsing on a synthetic corpus.")
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--lines", type=int, default=60, help="Sung lines per file.")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--plain", action="store_true",
+                        help="Plain LRC only, which both parsers read fully (like-for-like speed).")
+    parser.add_argument("--json", help="Write the report to this file.")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    corpus, sung = [], 0
+    for _ in range(args.files):
+        text, n = make_lrc(rng, args.lines, args.plain)
+        corpus.append(text)
+        sung += n
+    megabytes = sum(len(text.encode()) for text in corpus) / 1e6
+    print(f"Corpus: {args.files} files, {megabytes:.1f} MB, {sung} sung lines")
+
+    rows = []
+    for name, fn in (("legacy regex", legacy_parse), ("common.lrc", parse_lrc)):
+        seconds, recovered, clean = run(fn, corpus, args.repeats)
+        rows.append({
+            "parser": name,
+            "seconds_p50": round(seconds, 4),
+            "lines_per_s": round(recovered / seconds),
+            "mb_per_s": round(megabytes / seconds, 1),
+            "lines_recovered": recovered,
+            "lines_expected": sung,
+            "lines_without_tags": clean,
+        })
+
+    print(f"{'parser':<14} {'p50 s':>8} {'lines/s':>10} {'MB/s':>7} {'recovered':>12} {'tag-free':>9}")
+    for row in rows:
+        print(f"{row['parser']:<14} {row['seconds_p50']:>8.3f} {row['lines_per_s']:>10} {row['mb_per_s']:>7} "
+              f"{row['lines_recovered']:>6}/{row['lines_expected']:<5} {row['lines_without_tags']:>9}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"files": args.files, "megabytes": round(megabytes, 2), "results": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""
+Benchmark for the singing evaluation pipeline.
+
+Generates synthetic performances of several lengths (see synthetic_audio.py),
+times each stage of `analyze_audio` on its own and the whole pipeline with
+Whisper stubbed out (the ground-truth transcript is passed instead), and
+reports p50/p99 latency, throughput and peak Python-tracked memory. The full
+pipeline runs twice: against the backing track (chroma + DTW) and against a
+reference melody contour extracted from it (`analyze_audio_melody`).
+
+Usage:
+    python benchmarks/bench_pipeline.py --durations 10 30 60 --repeats 5
+    python benchmarks/bench_pipeline.py --json results.json
+    python benchmarks/bench_pipeline.py --baseline results.json   # exit 1 on regression
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_DIR))
+sys.path.insert(0, str(PROJECT_DIR / "singing_evaluator_agent"))
+
+from common.melody import extract_melody, load_melody, melody_path, save_melody  # noqa: E402
+from common.metrics import collect_stages  # noqa: E402
+from audio_tools import audio_analysis as aa  # noqa: E402
+from synthetic_audio import make_case  # noqa: E402
+
+librosa = aa.librosa
+
+
+def _percentile(values, q):
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+def measure(fn, repeats):
+    """Runs `fn` `repeats` times; returns latencies (s) and peak traced memory (MB)."""
+    latencies = []
+    peak = 0
+    for _ in range(repeats):
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - t0)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return latencies, peak / 1e6
+
+
+def summarize(name, latencies, peak_mb, audio_seconds):
+    p50 = _percentile(latencies, 50)
+    return {
+        "name": name,
+        "runs": len(latencies),
+        "p50_ms": round(p50 * 1000, 2),
+        "p99_ms": round(_percentile(latencies, 99) * 1000, 2),
+        "mean_ms": round(float(np.mean(latencies)) * 1000, 2),
+        # Seconds of audio analysed per second of wall time (real-time factor)
+        "throughput_x_realtime": round(audio_seconds / p50, 2) if p50 > 0 else None,
+        "peak_mem_mb": round(peak_mb, 1),
+    }
+
+
+def bench_case(case, repeats):
+    """Benchmarks the individual stages and the full pipeline for one generated case."""
+    analysis_sr = aa.ANALYSIS_SAMPLE_RATE or None
+    y, sr = librosa.load(case["performance_path"], sr=analysis_sr)
+    hop = aa.hop_for(sr)
+    ref = case["reference_path"]
+    lyrics = [dict(l, timestamp=l["timestamp"] - case["offset"]) for l in case["lyrics"]]
+    lyrics = [l for l in lyrics if -2.0 < l["timestamp"] < case["duration"] + 5.0]
+    duration = case["duration"]
+
+    stages = {
+        "load": lambda: librosa.load(case["performance_path"], sr=analysis_sr),
+        "yin": lambda: librosa.yin(y, fmin=librosa.note_to_hz('C2'), fmax=librosa.note_to_hz('C7'),
+                                   sr=sr, frame_length=aa.frame_for(sr), hop_length=hop),
+        "timing": lambda: aa.calculate_timing_score(y, sr, lyrics),
+        "dtw_score": lambda: aa.calculate_dtw_score(y, sr, ref),
+        "pitch_detail": lambda: aa.analyze_pitch_detail(y, sr, ref),
+        "diff": lambda: aa.analyze_lyrics_diff(case["transcript"], lyrics, case["transcript_words"]),
+        "align": lambda: aa.align_words(case["transcript_words"], lyrics),
+        "rms": lambda: librosa.feature.rms(y=y, frame_length=aa.frame_for(sr), hop_length=hop),
+    }
+
+    results = []
+    for name, fn in stages.items():
+        fn()  # untimed run so one-time librosa setup is not attributed to the stage
+        latencies, peak = measure(fn, repeats)
+        results.append(summarize(name, latencies, peak, duration))
+
+    stage_breakdown = []
+
+    def full():
+        with collect_stages() as timer:
+            result = aa.analyze_audio(case["performance_path"], reference_lyrics=case["lyrics"],
+                                      reference_audio_path=ref, offset=case["offset"],
+                                      transcript=case["transcript"],
+                                      transcript_words=case["transcript_words"])
+        if "error" in result:
+            raise RuntimeError(f"analyze_audio failed: {result['error']}")
+        stage_breakdown.append(timer.as_ms())
+
+    def run_full(name):
+        full()
+        stage_breakdown.clear()
+        latencies, peak = measure(full, repeats)
+        summary = summarize(name, latencies, peak, duration)
+        summary["stages_ms_median"] = {
+            k: round(float(np.median([b.get(k, 0.0) for b in stage_breakdown])), 2)
+            for k in stage_breakdown[0]
+        } if stage_breakdown else {}
+        results.append(summary)
+
+    # Without a melody contour: chroma + DTW against the backing track
+    run_full("analyze_audio")
+
+    # Offline contour extraction (once per song), then scoring against the contour
+    latencies, peak = measure(lambda: save_melody(melody_path(ref), *_extracted(ref)), 1)
+    results.append(summarize("melody_extract", latencies, peak, duration))
+    melody = load_melody(melody_path(ref))
+    f0 = librosa.yin(y, fmin=librosa.note_to_hz('C2'), fmax=librosa.note_to_hz('C7'),
+                     sr=sr, frame_length=aa.frame_for(sr), hop_length=hop)
+    fn = lambda: aa.analyze_pitch_contour(f0, y, sr, hop, melody, case["offset"])
+    fn()
+    latencies, peak = measure(fn, repeats)
+    results.append(summarize("pitch_contour", latencies, peak, duration))
+    run_full("analyze_audio_melody")
+    os.remove(melody_path(ref))
+    return results
+
+
+def _extracted(song_path):
+    melody = extract_melody(song_path)
+    return melody.midi, melody.hop_seconds
+
+
+def compare(current, baseline, tolerance):
+    """Returns a list of regressions (p50 slower than baseline by more than `tolerance`)."""
+    base = {(r["duration"], r["name"]): r for r in baseline["results"]}
+    regressions = []
+    for r in current["results"]:
+        b = base.get((r["duration"], r["name"]))
+        if b and b["p50_ms"] > 0 and r["p50_ms"] > b["p50_ms"] * (1 + tolerance):
+            regressions.append(f"{r['name']} @ {r['duration']}s: {b['p50_ms']}ms -> {r['p50_ms']}ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the singing evaluation pipeline.")
+    parser.add_argument("--durations", type=float, nargs="+", default=[10, 30, 60],
+                        help="Performance lengths in seconds.")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Write results to this file.")
+    parser.add_argument("--baseline", help="Compare against a previous --json output.")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Allowed p50 slowdown vs. baseline before failing (0.2 = 20%%).")
+    args = parser.parse_args()
+
+    output = {
+        "python": sys.version.split()[0],
+        "librosa": librosa.__version__,
+        "cpu_count": os.cpu_count(),
+        "analysis_sr": aa.ANALYSIS_SAMPLE_RATE,
+        "repeats": args.repeats,
+        "results": [],
+    }
+    with tempfile.TemporaryDirectory(prefix="karaoke_bench_") as tmp_dir:
+        for duration in args.durations:
+            case = make_case(os.path.join(tmp_dir, f"case_{duration:g}s"), duration, seed=args.seed)
+            print(f"\n=== {duration:g}s performance (offset {case['offset']}s) ===")
+            print(f"{'stage':<22}{'p50 ms':>10}{'p99 ms':>10}{'x realtime':>12}{'peak MB':>10}")
+            for r in bench_case(case, args.repeats):
+                r["duration"] = duration
+                output["results"].append(r)
+                print(f"{r['name']:<22}{r['p50_ms']:>10.1f}{r['p99_ms']:>10.1f}"
+                      f"{r['throughput_x_realtime'] or 0:>12.1f}{r['peak_mem_mb']:>10.1f}")
+                if r.get("stages_ms_median"):
+                    print("  stages (median ms): " +
+                          ", ".join(f"{k}={v}" for k, v in r["stages_ms_median"].items()))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(output, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(output, json.load(f), args.tolerance)
+        if regressions:
+            print("\nREGRESSIONS:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("\nNo regressions against baseline.")
+
+
+if __name__ == "__main__":
+    main()
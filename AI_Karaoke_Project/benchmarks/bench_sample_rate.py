@@ -0,0 +1,96 @@
+"""
+Accuracy vs. speed report for the evaluator's analysis sample rate.
+
+Runs the full `analyze_audio` pipeline (Whisper stubbed) on synthetic
+performances at the native recording rate and at each candidate analysis rate,
+then reports how far every score moves from the native-rate result and how
+much faster the run is.
+
+Usage:
+    python benchmarks/bench_sample_rate.py --rates 0 22050 16000 --durations 15 30 60
+(0 = native rate, the reference every other rate is compared against)
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_DIR))
+sys.path.insert(0, str(PROJECT_DIR / "singing_evaluator_agent"))
+
+from audio_tools import audio_analysis as aa  # noqa: E402
+from synthetic_audio import make_case  # noqa: E402
+
+SCORES = ["overall_score", "pitch_accuracy_score", "rhythm_score", "lyrics_score"]
+
+
+def run_case(case, rate, repeats):
+    latencies = []
+    result = None
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        result = aa.analyze_audio(case["performance_path"], reference_lyrics=case["lyrics"],
+                                  reference_audio_path=case["reference_path"], offset=case["offset"],
+                                  transcript=case["transcript"], analysis_sr=rate)
+        latencies.append(time.perf_counter() - t0)
+    if "error" in result:
+        raise RuntimeError(f"analyze_audio failed at {rate} Hz: {result['error']}")
+    return result, float(np.median(latencies))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare evaluation scores across analysis sample rates.")
+    parser.add_argument("--rates", type=int, nargs="+", default=[0, 22050, 16000])
+    parser.add_argument("--durations", type=float, nargs="+", default=[15, 30, 60])
+    parser.add_argument("--seeds", type=int, default=3, help="Synthetic cases per duration.")
+    parser.add_argument("--repeats", type=int, default=2)
+    parser.add_argument("--json", help="Write the report to this file.")
+    args = parser.parse_args()
+
+    rates = [0] + [r for r in args.rates if r != 0]
+    rows = []
+    with tempfile.TemporaryDirectory(prefix="karaoke_sr_") as tmp_dir:
+        for duration in args.durations:
+            for seed in range(args.seeds):
+                case = make_case(os.path.join(tmp_dir, f"{duration:g}_{seed}"), duration, seed=seed)
+                aa.analyze_audio(case["performance_path"], transcript="")  # warm caches
+                native, native_time = run_case(case, 0, args.repeats)
+                for rate in rates[1:]:
+                    result, elapsed = run_case(case, rate, args.repeats)
+                    row = {"duration": duration, "seed": seed, "rate": rate,
+                           "speedup": round(native_time / elapsed, 2)}
+                    for key in SCORES:
+                        row[f"{key}_delta"] = round(result[key] - native[key], 4)
+                    rows.append(row)
+
+    print(f"{'rate':>7}{'cases':>7}{'speedup':>9}" + "".join(f"{k.split('_')[0] + ' |d|max':>16}" for k in SCORES))
+    summary = {}
+    for rate in rates[1:]:
+        subset = [r for r in rows if r["rate"] == rate]
+        entry = {
+            "cases": len(subset),
+            "median_speedup": float(np.median([r["speedup"] for r in subset])),
+        }
+        for key in SCORES:
+            deltas = np.abs([r[f"{key}_delta"] for r in subset])
+            entry[f"{key}_mean_abs_delta"] = round(float(np.mean(deltas)), 4)
+            entry[f"{key}_max_abs_delta"] = round(float(np.max(deltas)), 4)
+        summary[rate] = entry
+        print(f"{rate:>7}{entry['cases']:>7}{entry['median_speedup']:>8.2f}x"
+              + "".join(f"{entry[f'{k}_max_abs_delta']:>16.4f}" for k in SCORES))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"summary": summary, "cases": rows}, f, indent=2)
+        print(f"\nReport written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
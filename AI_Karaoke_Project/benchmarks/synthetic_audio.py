@@ -0,0 +1,137 @@
+"""
+Deterministic synthetic karaoke material for benchmarks and load tests.
+
+A "song" is a backing track (chord pads + kick/hat pulses) mixed with a sung
+melody (harmonic sine sweeps with vibrato, one phrase per lyric line). The
+"performance" is the same melody re-sung with a known delay, slight detune and
+room noise, so every generated case comes with ground truth:
+    - `offset`: seconds between song start and the first sung note
+    - `lyrics`: LRC-style lines ({"timestamp", "text"}) aligned to the melody
+    - `transcript`: the words that were "sung" (stands in for Whisper)
+    - `transcript_words`: the same words with timestamps
+"""
+
+import os
+
+import numpy as np
+import soundfile as sf
+
+WORDS = ("love night heart fire dance light dream sky baby tonight "
+         "forever feel hold run away home shine star rain down").split()
+
+# A minor pentatonic, MIDI note numbers (singable range)
+SCALE = [57, 60, 62, 64, 67, 69, 72]
+LINE_SECONDS = 4.0
+
+
+def _midi_to_hz(midi):
+    return 440.0 * 2 ** ((np.asarray(midi, dtype=np.float64) - 69) / 12)
+
+
+def melody_contour(duration, sr, seed=0, detune_cents=0.0):
+    """Per-sample f0 (Hz, 0 = silence) for a phrase-structured melody."""
+    rng = np.random.default_rng(seed)
+    n = int(duration * sr)
+    f0 = np.zeros(n)
+    t = 0.0
+    while t < duration:
+        # Each lyric line: a phrase of 4-6 notes followed by a short breath
+        note_times = np.linspace(t, t + LINE_SECONDS * 0.8, rng.integers(4, 7) + 1)
+        for start, end in zip(note_times[:-1], note_times[1:]):
+            a, b = int(start * sr), min(n, int(end * sr))
+            if a >= n:
+                break
+            f0[a:b] = _midi_to_hz(rng.choice(SCALE))
+        t += LINE_SECONDS
+    voiced = f0 > 0
+    tt = np.arange(n) / sr
+    vibrato = 2 ** (0.015 * np.sin(2 * np.pi * 5.5 * tt) + detune_cents / 1200.0)
+    return np.where(voiced, f0 * vibrato, 0.0)
+
+
+def sing(f0, sr):
+    """Renders a harmonic 'voice' from a per-sample f0 contour."""
+    phase = 2 * np.pi * np.cumsum(f0) / sr
+    voice = sum(np.sin(k * phase) * (0.6 ** k) for k in range(1, 6))
+    # Soften note edges to avoid clicks
+    envelope = np.convolve((f0 > 0).astype(np.float64), np.hanning(int(0.02 * sr) + 1), mode="same")
+    envelope /= max(envelope.max(), 1e-9)
+    return voice * envelope
+
+
+def backing_track(duration, sr, seed=0):
+    rng = np.random.default_rng(seed + 100)
+    n = int(duration * sr)
+    t = np.arange(n) / sr
+    y = np.zeros(n)
+    # Chord pad changing every two lines
+    for i, start in enumerate(np.arange(0, duration, LINE_SECONDS * 2)):
+        a, b = int(start * sr), min(n, int((start + LINE_SECONDS * 2) * sr))
+        root = SCALE[i % len(SCALE)] - 12
+        for interval in (0, 3, 7):
+            y[a:b] += 0.15 * np.sin(2 * np.pi * _midi_to_hz(root + interval) * t[a:b])
+    # Kick on every beat (120 bpm) and noisy hats on off-beats
+    beat = int(0.5 * sr)
+    kick = np.sin(2 * np.pi * 60 * np.arange(int(0.1 * sr)) / sr) * np.exp(-np.linspace(0, 8, int(0.1 * sr)))
+    hat = rng.standard_normal(int(0.03 * sr)) * np.exp(-np.linspace(0, 10, int(0.03 * sr))) * 0.1
+    for pos in range(0, n - len(kick), beat):
+        y[pos:pos + len(kick)] += 0.5 * kick
+        h = pos + beat // 2
+        if h + len(hat) < n:
+            y[h:h + len(hat)] += hat
+    return y
+
+
+def make_lyrics(duration, seed=0):
+    rng = np.random.default_rng(seed + 200)
+    lines = []
+    for t in np.arange(0, duration, LINE_SECONDS):
+        words = rng.choice(WORDS, size=rng.integers(3, 7))
+        lines.append({"timestamp": round(float(t), 2), "text": " ".join(words)})
+    return lines
+
+
+def make_case(out_dir, duration, seed=0, offset=1.5, user_sr=44100, ref_sr=48000):
+    """
+    Writes `reference.wav` (the song) and `performance.wav` (the singer) to
+    `out_dir` and returns the paths plus ground truth.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    rng = np.random.default_rng(seed + 300)
+
+    # The song: melody over backing, slightly longer than the performance
+    song_len = duration + offset + 2.0
+    ref_f0 = melody_contour(song_len, ref_sr, seed=seed)
+    reference = backing_track(song_len, ref_sr, seed=seed) + 0.5 * sing(ref_f0, ref_sr)
+    reference /= np.max(np.abs(reference)) * 1.1
+
+    # The performance: the singer joins `offset` seconds into the song
+    user_f0 = melody_contour(song_len, user_sr, seed=seed, detune_cents=15.0)
+    start = int(offset * user_sr)
+    voice = sing(user_f0, user_sr)[start:start + int(duration * user_sr)]
+    performance = 0.4 * voice / max(np.max(np.abs(voice)), 1e-9)
+    performance += 0.003 * rng.standard_normal(len(performance))
+
+    ref_path = os.path.join(out_dir, "reference.wav")
+    perf_path = os.path.join(out_dir, "performance.wav")
+    sf.write(ref_path, reference.astype(np.float32), ref_sr)
+    sf.write(perf_path, performance.astype(np.float32), user_sr)
+
+    lyrics = make_lyrics(song_len, seed=seed)
+    sung_lines = [l for l in lyrics if offset - 0.5 <= l["timestamp"] < offset + duration]
+    sung = [l["text"] for l in sung_lines]
+    # Word timestamps as the STT backend would report them (recording time, ~0.6s per word)
+    transcript_words = [
+        {"word": w, "start": round(l["timestamp"] - offset + k * 0.6, 2),
+         "end": round(l["timestamp"] - offset + (k + 1) * 0.6, 2)}
+        for l in sung_lines for k, w in enumerate(l["text"].split())
+    ]
+    return {
+        "duration": duration,
+        "offset": offset,
+        "reference_path": ref_path,
+        "performance_path": perf_path,
+        "lyrics": lyrics,
+        "transcript": " ".join(sung),
+        "transcript_words": transcript_words,
+    }
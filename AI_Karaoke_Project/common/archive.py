@@ -0,0 +1,191 @@
+"""
+Performance archive: keeps scored recordings for replay, audits and re-scoring.
+
+Layout under the archive root (KARAOKE_ARCHIVE_DIR on the host):
+    2026/10/18/<id>.opus   the recording, mono Ogg/Opus (~60 kbps) or FLAC
+    2026/10/18/<id>.json   evaluation, feedback and everything needed to re-score it
+    index.sqlite3          one row per performance, for lookup by user, song and date
+A 3-minute take is ~1.3 MB as Opus vs ~16 MB as 16-bit WAV. The sidecar JSON
+uses the fields `singing_evaluator_agent/batch_rescore.py` reads, so the archive
+root can be passed to it as is.
+
+Encoding and writing happen on a single background thread (`submit` returns
+immediately). When the archive grows past `max_bytes`, the oldest performances
+are deleted.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from common.startup_profile import lazy_module
+
+np = lazy_module("numpy")
+sf = lazy_module("soundfile")
+librosa = lazy_module("librosa")
+
+logger = logging.getLogger("PerformanceArchive")
+
+# name -> (soundfile format, subtype, file suffix)
+AUDIO_FORMATS = {
+    "opus": ("OGG", "OPUS", ".opus"),
+    "flac": ("FLAC", "PCM_16", ".flac"),
+}
+# Sample rates libopus can encode at; others are resampled to 48 kHz
+_OPUS_RATES = (8000, 12000, 16000, 24000, 48000)
+
+INDEX_FILE = "index.sqlite3"
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS performances (
+    id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    user_name TEXT,
+    song_id TEXT,
+    offset REAL,
+    overall_score REAL,
+    duration REAL,
+    audio_file TEXT NOT NULL,
+    meta_file TEXT NOT NULL,
+    bytes INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_performances_user ON performances (user_name, created_at);
+CREATE INDEX IF NOT EXISTS idx_performances_song ON performances (song_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_performances_created ON performances (created_at);
+"""
+_COLUMNS = ["id", "created_at", "user_name", "song_id", "offset", "overall_score", "duration",
+            "audio_file", "meta_file", "bytes"]
+
+
+class PerformanceArchive:
+    """
+        archive = PerformanceArchive("/data/performances", max_bytes=2 * 1024**3)
+        perf_id = archive.submit((y, sr), {"user_name": ..., "song_id": ..., "evaluation": ...})
+        archive.find(user="alice", since=time.time() - 86400)
+    """
+
+    def __init__(self, root, max_bytes, audio_format="opus"):
+        if audio_format not in AUDIO_FORMATS:
+            raise ValueError(f"Unknown archive format '{audio_format}' (expected one of {sorted(AUDIO_FORMATS)})")
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = int(max_bytes)
+        self.audio_format = audio_format
+        # One writer: keeps bursts of submissions from competing for CPU with scoring
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="archive")
+        self._db_lock = threading.Lock()
+        self._db = sqlite3.connect(self.root / INDEX_FILE, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        with self._db_lock:
+            self._db.executescript(_SCHEMA)
+
+    # === WRITING ===
+
+    def submit(self, audio, meta: dict) -> str:
+        """
+        Queues a performance for archiving and returns its id right away.
+        `audio` is a decoded (y, sr) pair or the encoded upload bytes.
+        """
+        perf_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        future = self._pool.submit(self.store, perf_id, audio, meta)
+        future.add_done_callback(lambda f: f.exception() and logger.error(
+            f"Archiving performance {perf_id} failed: {f.exception()}"))
+        return perf_id
+
+    def store(self, perf_id, audio, meta: dict):
+        """Encodes and writes one performance, indexes it and applies retention (blocking)."""
+        if isinstance(audio, (bytes, bytearray)):
+            from common.audio_buffer import decode_audio
+            y, sr = decode_audio(bytes(audio))
+        else:
+            y, sr = audio
+
+        fmt, subtype, suffix = AUDIO_FORMATS[self.audio_format]
+        if self.audio_format == "opus" and sr not in _OPUS_RATES:
+            y, sr = librosa.resample(np.asarray(y, dtype=np.float32), orig_sr=sr, target_sr=48000), 48000
+
+        created_at = time.time()
+        day_dir = Path(time.strftime("%Y/%m/%d", time.localtime(created_at)))
+        (self.root / day_dir).mkdir(parents=True, exist_ok=True)
+        audio_file = str(day_dir / f"{perf_id}{suffix}")
+        meta_file = str(day_dir / f"{perf_id}.json")
+
+        # 1. Audio, then the sidecar (written last, so a sidecar always has its audio)
+        sf.write(self.root / audio_file, np.asarray(y, dtype=np.float32), sr, format=fmt, subtype=subtype)
+        sidecar = dict(meta, id=perf_id, audio=Path(audio_file).name,
+                       created_at=time.strftime("%Y-%m-%dT%H:%M:%S%z", time.localtime(created_at)))
+        with open(self.root / meta_file, "w") as f:
+            json.dump(sidecar, f)
+        size = os.path.getsize(self.root / audio_file) + os.path.getsize(self.root / meta_file)
+
+        # 2. Index
+        evaluation = meta.get("evaluation") or {}
+        with self._db_lock, self._db:
+            self._db.execute(
+                f"INSERT OR REPLACE INTO performances ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})",
+                (perf_id, created_at, meta.get("user_name"), meta.get("song_id"), meta.get("offset"),
+                 evaluation.get("overall_score"), len(y) / sr, audio_file, meta_file, size))
+        logger.info(f"Archived performance {perf_id} ({size / 1024:.0f} KB)")
+
+        # 3. Retention
+        self.enforce_retention()
+
+    def enforce_retention(self):
+        """Deletes the oldest performances until the archive fits in max_bytes."""
+        with self._db_lock:
+            total = self._db.execute("SELECT COALESCE(SUM(bytes), 0) FROM performances").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            victims = []
+            for row in self._db.execute("SELECT id, audio_file, meta_file, bytes FROM performances "
+                                        "ORDER BY created_at"):
+                if total <= self.max_bytes:
+                    break
+                victims.append(row)
+                total -= row["bytes"]
+            with self._db:
+                self._db.executemany("DELETE FROM performances WHERE id = ?", [(row["id"],) for row in victims])
+
+        for row in victims:
+            for name in (row["audio_file"], row["meta_file"]):
+                try:
+                    os.remove(self.root / name)
+                except FileNotFoundError:
+                    pass
+        logger.info(f"Archive retention: removed {len(victims)} oldest performances")
+
+    # === LOOKUP ===
+
+    def find(self, user=None, song=None, since=None, until=None, limit=50) -> list:
+        """Index rows matching all given filters (`since`/`until` are Unix times), newest first."""
+        clauses, params = [], []
+        for clause, value in (("user_name = ?", user), ("song_id = ?", song),
+                              ("created_at >= ?", since), ("created_at < ?", until)):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._db_lock:
+            rows = self._db.execute(f"SELECT * FROM performances {where} ORDER BY created_at DESC LIMIT ?",
+                                    (*params, int(limit))).fetchall()
+        return [dict(row) for row in rows]
+
+    def get(self, perf_id):
+        """Index row of one performance, or None."""
+        with self._db_lock:
+            row = self._db.execute("SELECT * FROM performances WHERE id = ?", (perf_id,)).fetchone()
+        return dict(row) if row else None
+
+    def path(self, relative_name) -> Path:
+        return self.root / relative_name
+
+    def close(self):
+        """Waits for queued writes, then closes the index."""
+        self._pool.shutdown(wait=True)
+        with self._db_lock:
+            self._db.close()
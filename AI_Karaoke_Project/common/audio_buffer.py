@@ -0,0 +1,206 @@
+"""
+In-memory audio handoff between the host and the Singing Evaluator.
+
+The host decodes an uploaded recording once into a float32 mono array, copies it
+into a named shared-memory block and passes only a small descriptor over MCP:
+    {"shm_name": "...", "samples": 123456, "sr": 44100, "dtype": "float32"}
+The evaluator maps the same block as a NumPy array (no copy, no disk I/O).
+The host owns the block and unlinks it once the tool call returns.
+
+Browser recordings are usually WebM/Opus whatever the upload says; those are
+decoded by piping them through ffmpeg (`StreamDecoder`, which can also decode
+an upload while its chunks are still arriving).
+"""
+
+import io
+import json
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from multiprocessing import shared_memory
+
+from common.startup_profile import lazy_module
+
+np = lazy_module("numpy")
+librosa = lazy_module("librosa")
+
+logger = logging.getLogger("AudioBuffer")
+
+# Rate ffmpeg decodes to when the caller doesn't ask for one (Opus is 48 kHz internally)
+DECODE_SAMPLE_RATE = 48000
+
+# (magic bytes, offset, suffix) of the containers browsers and our tools produce
+_CONTAINER_MAGIC = [
+    (b"\x1a\x45\xdf\xa3", 0, ".webm"),  # EBML (WebM / Matroska)
+    (b"OggS", 0, ".ogg"),
+    (b"RIFF", 0, ".wav"),
+    (b"fLaC", 0, ".flac"),
+    (b"ftyp", 4, ".mp4"),
+    (b"ID3", 0, ".mp3"),
+]
+# Containers soundfile can't read but ffmpeg can decode from a pipe
+FFMPEG_PIPE_SUFFIXES = {".webm"}
+
+
+def sniff_suffix(data: bytes, default=".wav"):
+    """File suffix of the container in `data` (browsers label uploads inconsistently)."""
+    for magic, offset, suffix in _CONTAINER_MAGIC:
+        if data[offset:offset + len(magic)] == magic:
+            return suffix
+    return default
+
+
+def have_ffmpeg() -> bool:
+    return shutil.which("ffmpeg") is not None
+
+
+class StreamDecoder:
+    """
+    Decodes a compressed stream with ffmpeg while it is still being received.
+        decoder = StreamDecoder()
+        decoder.feed(chunk)        # as chunks arrive (blocks only if ffmpeg falls behind)
+        y, sr = decoder.finish()   # float32 mono at `sr`
+    A reader thread drains ffmpeg's PCM output as it is produced, so finishing
+    only waits for the tail of the stream.
+    """
+
+    def __init__(self, sr=DECODE_SAMPLE_RATE):
+        self.sr = int(sr)
+        self._proc = subprocess.Popen(
+            ["ffmpeg", "-hide_banner", "-loglevel", "error", "-i", "pipe:0",
+             "-f", "f32le", "-ac", "1", "-ar", str(self.sr), "pipe:1"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        self._pcm = bytearray()
+        self._stderr = b""
+        self._readers = [threading.Thread(target=self._read_pcm, daemon=True),
+                         threading.Thread(target=self._read_stderr, daemon=True)]
+        for reader in self._readers:
+            reader.start()
+
+    def _read_pcm(self):
+        for block in iter(lambda: self._proc.stdout.read(65536), b""):
+            self._pcm += block
+
+    def _read_stderr(self):
+        self._stderr = self._proc.stderr.read()
+
+    def feed(self, chunk: bytes):
+        self._proc.stdin.write(chunk)
+
+    def finish(self, timeout=120):
+        """Closes the input and returns (y, sr). Raises RuntimeError if ffmpeg failed."""
+        try:
+            self._proc.stdin.close()
+        except BrokenPipeError:
+            pass
+        self._proc.wait(timeout=timeout)
+        for reader in self._readers:
+            reader.join()
+        if self._proc.returncode != 0:
+            raise RuntimeError(f"ffmpeg decode failed: {self._stderr.decode(errors='replace').strip()}")
+        y = np.frombuffer(self._pcm, dtype="<f4", count=len(self._pcm) // 4)
+        return y.astype(np.float32, copy=False), self.sr
+
+    def abort(self):
+        if self._proc.poll() is None:
+            self._proc.kill()
+        self._proc.wait()
+
+
+def decode_audio(data: bytes, sr=None, suffix=None):
+    """
+    Decodes encoded audio bytes to a float32 mono array. WebM goes through an
+    ffmpeg pipe; other formats are tried in memory first (WAV/FLAC/OGG/MP3 via
+    soundfile) and fall back to a temp file.
+    """
+    suffix = suffix or sniff_suffix(data)
+    if suffix in FFMPEG_PIPE_SUFFIXES and have_ffmpeg():
+        decoder = StreamDecoder(sr or DECODE_SAMPLE_RATE)
+        try:
+            decoder.feed(data)
+        except BrokenPipeError:
+            pass  # ffmpeg gave up early; finish() reports why
+        return decoder.finish()
+    try:
+        y, sr_out = librosa.load(io.BytesIO(data), sr=sr, mono=True)
+    except Exception as e:
+        logger.debug(f"In-memory decode failed ({e}), decoding via temp file")
+        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
+            tmp.write(data)
+            tmp_path = tmp.name
+        try:
+            y, sr_out = librosa.load(tmp_path, sr=sr, mono=True)
+        finally:
+            os.remove(tmp_path)
+    return np.ascontiguousarray(y, dtype=np.float32), sr_out
+
+
+class SharedAudio:
+    """Owner side of a shared-memory audio block (use as a context manager)."""
+
+    def __init__(self, y, sr):
+        y = np.ascontiguousarray(y, dtype=np.float32)
+        self.sr = int(sr)
+        self.samples = len(y)
+        self._shm = shared_memory.SharedMemory(create=True, size=max(1, y.nbytes))
+        np.ndarray(y.shape, dtype=np.float32, buffer=self._shm.buf)[:] = y
+
+    @property
+    def descriptor(self) -> str:
+        return json.dumps({"shm_name": self._shm.name, "samples": self.samples,
+                           "sr": self.sr, "dtype": "float32"})
+
+    def close(self):
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class AttachedAudio:
+    """
+    Reader side: maps a block created by another process.
+        with AttachedAudio(descriptor) as (y, sr): ...
+    `y` is a view into shared memory; don't keep references after the block exits.
+    """
+
+    def __init__(self, descriptor: str):
+        info = json.loads(descriptor)
+        self.sr = int(info["sr"])
+        self.samples = int(info["samples"])
+        self._shm = shared_memory.SharedMemory(name=info["shm_name"])
+        _untrack(self._shm)
+        self.y = np.ndarray((self.samples,), dtype=np.float32, buffer=self._shm.buf)
+
+    def __enter__(self):
+        return self.y, self.sr
+
+    def __exit__(self, *exc):
+        self.y = None
+        try:
+            self._shm.close()
+        except BufferError:
+            # A view is still referenced somewhere (e.g. a traceback); the mapping
+            # is released when that reference dies.
+            logger.warning("Shared audio block still referenced; close deferred")
+
+
+def _untrack(shm):
+    """
+    Python < 3.13 registers attached blocks with this process' resource tracker,
+    which would unlink (or warn about) the host's block when the agent exits.
+    """
+    try:
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, "shared_memory")
+    except Exception:
+        pass
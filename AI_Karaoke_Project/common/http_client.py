@@ -0,0 +1,88 @@
+"""
+Pooled, rate-limited HTTP sessions for external APIs.
+
+`pooled_session(rate, burst)` returns a requests.Session that:
+- keeps up to POOL_SIZE keep-alive connections per host, so repeated lookups
+  skip the TCP/TLS handshake
+- puts a (connect, read) timeout on every request that doesn't set its own
+- takes a token from a TokenBucket before each request. If none comes free
+  within `max_wait` seconds it raises RateLimited, so a throttled API is
+  skipped for that lookup instead of queueing callers behind it.
+
+`adopt(session, ...)` builds one from an existing session (a client library's),
+keeping its headers and cookies.
+"""
+
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# (connect, read) seconds; connect slightly above a multiple of 3 s, the TCP retransmit window
+DEFAULT_TIMEOUT = (3.05, 5.0)
+POOL_SIZE = 10
+
+
+class RateLimited(requests.exceptions.RequestException):
+    """No request token came free in time."""
+
+
+class TokenBucket:
+    """`rate` requests per second on average, bursts of up to `burst`."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, max_wait: float = 0.0) -> bool:
+        """Takes a token, waiting up to `max_wait` seconds for one. False if none came free."""
+        deadline = time.monotonic() + max_wait
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class PooledSession(requests.Session):
+    def __init__(self, bucket=None, timeout=DEFAULT_TIMEOUT, max_wait=1.0):
+        super().__init__()
+        adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+        self.bucket = bucket
+        self.timeout = timeout
+        self.max_wait = max_wait
+
+    def request(self, method, url, **kwargs):
+        if self.bucket is not None and not self.bucket.acquire(self.max_wait):
+            raise RateLimited(f"Rate limit reached for {urlsplit(url).netloc}")
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        return super().request(method, url, **kwargs)
+
+
+def pooled_session(rate=None, burst=5, timeout=DEFAULT_TIMEOUT, max_wait=1.0) -> PooledSession:
+    """A PooledSession limited to `rate` requests/s (None or 0: unlimited)."""
+    bucket = TokenBucket(rate, burst) if rate else None
+    return PooledSession(bucket, timeout, max_wait)
+
+
+def adopt(session, rate=None, burst=5, timeout=DEFAULT_TIMEOUT, max_wait=1.0) -> PooledSession:
+    """A pooled_session carrying over `session`'s headers and cookies."""
+    pooled = pooled_session(rate, burst, timeout, max_wait)
+    pooled.headers.update(session.headers)
+    pooled.cookies.update(session.cookies)
+    return pooled
@@ -0,0 +1,135 @@
+"""
+LRC lyrics parser (plain and enhanced), producing a compact timeline (common.timeline).
+
+One pass over the file: a single compiled regex finds every line's leading tags,
+and enhanced word tags are split out with another.
+
+    [01:02.50]Line text                      a line
+    [00:40.00][01:52.00]Chorus line          one line sung at several times
+    [00:12.00]<00:12.00>Is <00:12.48>this <00:13.10>the <00:13.40>real <00:14.02>life<00:15.10>
+                                             enhanced LRC: word onsets; a trailing tag ends the line
+    [00:15.50]                               blank line: the previous line ends here
+    [offset:+250]                            header, ms; positive = lyrics shown earlier
+    [ar:Queen] [ti:...] [length:...]         other headers (ignored)
+Times may be mm:ss, mm:ss.xx or mm:ss:xx. Lines are sorted by time. A line ends
+at its trailing word tag or at the blank line that follows it, if either is
+given, and otherwise at `common.timeline.estimate_end`.
+"""
+
+import re
+
+from common.timeline import DEFAULT_LAST_LINE_SECONDS, SECONDS_PER_WORD, estimate_end
+
+# The leading [..][..] tags of each line and the rest of it, over the whole file at once
+_LINE = re.compile(r"^[ \t]*((?:\[[^\]\n]*\])+)(.*)$", re.MULTILINE)
+# A time: mm:ss, mm:ss.xx or mm:ss:xx
+_TIME = re.compile(r"(\d+):(\d+(?:[.:]\d+)?)$")
+# Every [time] among a line's tags: "[00:40.00][01:52.00]" -> [("00", "40.00"), ("01", "52.00")]
+_TIME_TAG = re.compile(r"\[(\d+):(\d+(?:[.:]\d+)?)\]")
+# [offset:+250] header, in ms
+_OFFSET = re.compile(r"\[\s*offset\s*:\s*([+-]?\d+)\s*\]", re.IGNORECASE)
+# Enhanced LRC word tags; re.split puts the two captured fields between the text chunks
+_WORD_TAG = re.compile(r"<(\d+):(\d+(?:[.:]\d+)?)>")
+
+
+def parse_time(tag: str):
+    """'01:02.50' / '01:02:50' / '01:02' -> 62.5 seconds; None if `tag` is not a time."""
+    m = _TIME.match(tag.strip())
+    if not m:
+        return None
+    # Some editors write the hundredths after a second colon
+    return int(m.group(1)) * 60 + float(m.group(2).replace(":", ".", 1))
+
+
+def _parse_words(body: str):
+    """
+    '<00:12.00>Is <00:12.48>this<00:13.10>' -> ("Is this", [12.0, 12.48], 13.1).
+    A word takes the time of the tag it starts after; "<..>Bo<..>hemian" is one
+    word. Several words after one tag share the span to the next tag evenly.
+    Returns (text, onsets or None, end or None).
+    """
+    parts = _WORD_TAG.split(body)
+    lead = parts[0]
+    if len(parts) == 1:
+        return " ".join(lead.split()), None, None
+    # Tag times, and the text from each tag up to the next
+    times = [int(mm) * 60 + float(ss.replace(":", ".", 1)) for mm, ss in zip(parts[1::3], parts[2::3])]
+    chunks = parts[3::3]
+    text = lead + "".join(chunks)
+    words = text.split()
+
+    sung = [i for i, chunk in enumerate(chunks) if not chunk.isspace() and chunk]
+    if len(sung) == len(words) == len(" ".join(chunks).split()):
+        # The usual layout, one word per tag
+        onsets = [times[i] for i in sung]
+    else:
+        onsets = []
+        in_word = False
+        for i, (t, chunk) in enumerate(zip(times, chunks)):
+            starts = len(chunk.split())
+            if in_word and chunk[:1] and not chunk[0].isspace():
+                starts -= 1  # continues the word from the previous segment
+            if starts > 0:
+                span = times[i + 1] - t if i + 1 < len(times) else starts * SECONDS_PER_WORD
+                onsets.extend(t + k * span / starts for k in range(starts))
+            if chunk:
+                in_word = not chunk[-1].isspace()
+
+    if lead.strip() or len(onsets) != len(words):
+        # Text before the first tag: no word timing for this line
+        onsets = None
+    # A trailing tag with nothing after it marks when the last word ends
+    end = times[-1] if not chunks[-1].strip() else None
+    return " ".join(words), onsets, end
+
+
+def parse_lrc(lrc_text: str, last_line_seconds=DEFAULT_LAST_LINE_SECONDS) -> dict:
+    """Parses LRC / enhanced LRC text into a timeline: {"t", "end", "text", "words"?}."""
+    offset = 0.0
+    events = []  # (time, text, word onsets relative to the time, explicit duration); blank text = end marker
+
+    for tags, body in _LINE.findall(lrc_text):
+        stamps = _TIME_TAG.findall(tags)
+        if not stamps:
+            header = _OFFSET.match(tags)
+            if header:
+                offset = int(header.group(1)) / 1000.0
+            continue
+        # Some editors write the hundredths after a second colon
+        times = [int(mm) * 60 + float(ss.replace(":", ".", 1)) for mm, ss in stamps]
+
+        body = body.strip()
+        onsets, end = None, None
+        if "<" in body:
+            body, onsets, end = _parse_words(body)
+        first = times[0]
+        rel_onsets = [o - first for o in onsets] if onsets else None
+        duration = end - first if end is not None else None
+        for t in times:
+            events.append((t, body, rel_onsets, duration))
+
+    events.sort(key=lambda e: e[0])
+
+    t_out, end_out, text_out, words_out = [], [], [], []
+    for i, (t, body, rel_onsets, duration) in enumerate(events):
+        if not body:
+            continue
+        next_start = events[i + 1][0] if i + 1 < len(events) else t + last_line_seconds
+        if duration is not None:
+            end = t + duration
+        elif i + 1 < len(events) and not events[i + 1][1]:
+            # Followed by a blank timestamped line: that's where it ends
+            end = next_start
+        elif rel_onsets:
+            end = min(next_start, t + rel_onsets[-1] + SECONDS_PER_WORD)
+        else:
+            end = estimate_end(t, next_start, body)
+        t_out.append(t - offset)
+        end_out.append(end - offset)
+        text_out.append(body)
+        words_out.append([t - offset + o for o in rel_onsets] if rel_onsets else None)
+
+    timeline = {"t": t_out, "end": end_out, "text": text_out}
+    if any(words_out):
+        timeline["words"] = words_out
+    return timeline
@@ -0,0 +1,144 @@
+"""
+Song media serving with byte ranges and long-lived caching.
+
+Downloaded songs are immutable once they are in the library (a video id
+always maps to the same bytes), so responses carry a strong ETag and
+`Cache-Control: immutable` for a year. Repeat plays come from the browser or
+proxy cache, and seeks revalidate nothing. Supported:
+    Range: bytes=a-b / a- / -n   (single range; multi-range requests get the whole file)
+    If-Range, If-None-Match      (304)
+    HEAD
+Bodies are read in large blocks on a worker thread, so a video stream costs the
+event loop a few wake-ups per MB. With `accel` set, the app only checks the
+request and hands the transfer to the front proxy:
+    "nginx"    -> X-Accel-Redirect: <accel_prefix><name>
+    "sendfile" -> X-Sendfile: <absolute path>   (Apache mod_xsendfile, lighttpd)
+
+`create_media_app(songs_dir)` returns an ASGI app. The host mounts it at /songs,
+and `host_agent/media_server.py` runs it as a separate process.
+"""
+
+import logging
+import mimetypes
+import os
+import re
+from email.utils import formatdate
+
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+logger = logging.getLogger("MediaFiles")
+
+# Only media is served; the library's JSON indexes and melody contours stay private
+MEDIA_SUFFIXES = {".mp4", ".m4a", ".webm", ".mp3", ".wav", ".ogg"}
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+CHUNK_SIZE = 512 * 1024
+ACCEL_MODES = ("nginx", "sendfile")
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def media_etag(name, st) -> str:
+    """Strong validator: the file name (video id) plus size and mtime."""
+    stem = name.rsplit(".", 1)[0]
+    return f'"{stem}-{st.st_size:x}-{st.st_mtime_ns:x}"'
+
+
+def parse_range(header, size):
+    """
+    (start, end) byte span (end exclusive) for a single-range header, None to
+    send the whole file (no usable range), or ValueError if the range starts
+    past the end of the file.
+    """
+    match = _RANGE_RE.match(header.strip().replace(" ", ""))
+    if not match:
+        return None  # malformed or multiple ranges: ignore (RFC 9110 allows serving 200)
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last n bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError("empty suffix range")
+        return max(0, size - length), size
+    start = int(first)
+    if last and int(last) < start:
+        return None  # invalid (bytes=5-3), not unsatisfiable: ignore it like a malformed header
+    if start >= size:
+        raise ValueError("range not satisfiable")
+    end = min(size, int(last) + 1) if last else size
+    return start, end
+
+
+def _read_span(path, start, end, chunk_size=CHUNK_SIZE):
+    # Sync generator: StreamingResponse runs each read on a worker thread
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def create_media_app(songs_dir, accel=None, accel_prefix="/internal-songs/") -> Starlette:
+    if accel and accel not in ACCEL_MODES:
+        raise ValueError(f"Unknown media accel mode '{accel}' (expected one of {ACCEL_MODES})")
+    songs_dir = os.path.abspath(songs_dir)
+
+    async def serve(request):
+        name = request.path_params["name"]
+        # No subdirectories, no dotfiles, media only
+        if "/" in name or name.startswith(".") or os.path.splitext(name)[1].lower() not in MEDIA_SUFFIXES:
+            return PlainTextResponse("Not Found", status_code=404)
+        path = os.path.join(songs_dir, name)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return PlainTextResponse("Not Found", status_code=404)
+
+        etag = media_etag(name, st)
+        headers = {
+            "ETag": etag,
+            "Last-Modified": formatdate(st.st_mtime, usegmt=True),
+            "Cache-Control": CACHE_CONTROL,
+            "Accept-Ranges": "bytes",
+        }
+        media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+
+        # 1. Conditional GET
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and (if_none_match.strip() == "*" or etag in [t.strip() for t in if_none_match.split(",")]):
+            return Response(status_code=304, headers=headers)
+
+        # 2. Offload the transfer to the proxy (it handles ranges itself)
+        if accel == "nginx":
+            return Response(headers={**headers, "X-Accel-Redirect": f"{accel_prefix}{name}"}, media_type=media_type)
+        if accel == "sendfile":
+            return Response(headers={**headers, "X-Sendfile": path}, media_type=media_type)
+
+        # 3. Byte range (ignored if If-Range names another version)
+        start, end, status = 0, st.st_size, 200
+        range_header = request.headers.get("range")
+        if_range = request.headers.get("if-range")
+        if range_header and (if_range is None or if_range.strip() == etag):
+            try:
+                span = parse_range(range_header, st.st_size)
+            except ValueError:
+                return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{st.st_size}"})
+            if span is not None:
+                start, end = span
+                status = 206
+                headers["Content-Range"] = f"bytes {start}-{end - 1}/{st.st_size}"
+        headers["Content-Length"] = str(end - start)
+
+        if request.method == "HEAD":
+            return Response(status_code=status, headers=headers, media_type=media_type)
+        return StreamingResponse(_read_span(path, start, end), status_code=status, headers=headers,
+                                 media_type=media_type)
+
+    return Starlette(routes=[Route("/{name}", serve, methods=["GET", "HEAD"])])
@@ -0,0 +1,129 @@
+"""
+Reference melody contours, stored next to each song.
+
+`<songs_dir>/<song_id>.melody.npz` holds the sung melody of a track as one
+MIDI pitch per frame plus the frame hop:
+    midi:        float16[n_frames]  (NaN = unvoiced)
+    hop_seconds: float64
+float16 keeps ~6 cents of resolution in the singing range, so a 4-minute song
+at the default 20 ms hop is ~24 KB before compression.
+
+Contours are extracted once per song, offline (`extract_melody`, run by the
+Audio Playback Agent after a download).
+"""
+
+import io
+import os
+import threading
+
+from common.startup_profile import lazy_module
+
+np = lazy_module("numpy")
+librosa = lazy_module("librosa")
+
+MELODY_SUFFIX = ".melody.npz"
+
+# Extraction settings: 16 kHz is plenty for f0 up to C6; 20 ms frames
+EXTRACT_SAMPLE_RATE = 16000
+HOP_SECONDS = 0.02
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def melody_path(song_path) -> str:
+    """`songs/abc123.mp4` -> `songs/abc123.melody.npz`."""
+    return os.path.splitext(str(song_path))[0] + MELODY_SUFFIX
+
+
+class Melody:
+    """A reference contour: `midi[i]` is the pitch at `i * hop_seconds` into the song."""
+
+    def __init__(self, midi, hop_seconds):
+        self.midi = np.asarray(midi, dtype=np.float32)
+        self.hop_seconds = float(hop_seconds)
+
+    @property
+    def duration(self) -> float:
+        return len(self.midi) * self.hop_seconds
+
+    def at(self, t):
+        """Target MIDI pitch at song time(s) `t` (NaN when unvoiced or out of range)."""
+        idx = np.round(np.asarray(t, dtype=np.float64) / self.hop_seconds).astype(np.int64)
+        valid = (idx >= 0) & (idx < len(self.midi))
+        out = np.full(idx.shape, np.nan, dtype=np.float32)
+        out[valid] = self.midi[idx[valid]]
+        return out
+
+    def window(self, start, end):
+        """(times, midi) of the frames between `start` and `end` seconds, e.g. for drawing."""
+        i0 = max(0, int(start / self.hop_seconds))
+        i1 = min(len(self.midi), int(np.ceil(end / self.hop_seconds)) + 1)
+        times = np.arange(i0, i1) * self.hop_seconds
+        return times, self.midi[i0:i1]
+
+
+def save_melody(path, midi, hop_seconds):
+    """Writes a contour atomically (readers never see a half-written file)."""
+    buf = io.BytesIO()
+    np.savez_compressed(buf, midi=np.asarray(midi, dtype=np.float16), hop_seconds=np.float64(hop_seconds))
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(buf.getvalue())
+    os.replace(tmp_path, path)
+
+
+def load_melody(path):
+    """Loads a contour (cached per file version), or returns None if the song has none yet."""
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    with _cache_lock:
+        cached = _cache.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+    with np.load(path) as data:
+        melody = Melody(data["midi"], float(data["hop_seconds"]))
+    with _cache_lock:
+        _cache[path] = (mtime, melody)
+    return melody
+
+
+def extract_melody(song_path, sr=EXTRACT_SAMPLE_RATE, hop_seconds=HOP_SECONDS):
+    """
+    Extracts the predominant melody of a (polyphonic) song file.
+    Per frame, picks the pitch in C3-C6 with the highest harmonic-summation
+    salience on a CQT, which favours the harmonic-rich lead line over pads and
+    bass, then fixes the usual sub-octave picks. Unvoiced = no clear peak.
+    """
+    y, sr = librosa.load(song_path, sr=sr, mono=True)
+    hop = int(round(hop_seconds * sr))
+    bins_per_octave = 36
+    fmin = librosa.note_to_hz('C3')
+    # 3 octaves of candidates plus 2 more so harmonics 2-4 are on the grid
+    n_bins = bins_per_octave * 5
+    C = np.abs(librosa.cqt(y, sr=sr, hop_length=hop, fmin=fmin, n_bins=n_bins, bins_per_octave=bins_per_octave))
+    freqs = librosa.cqt_frequencies(n_bins, fmin=fmin, bins_per_octave=bins_per_octave)
+    salience = librosa.salience(C, freqs=freqs, harmonics=[1, 2, 3, 4], weights=[1.0, 0.7, 0.5, 0.35],
+                                fill_value=0)[:bins_per_octave * 3]
+
+    frames = np.arange(salience.shape[1])
+    best = np.argmax(salience, axis=0)
+    peak = salience[best, frames]
+    # Harmonic summation also scores f0/2 highly; prefer the octave above when it is nearly as salient
+    up = np.minimum(best + bins_per_octave, salience.shape[0] - 1)
+    best = np.where(salience[up, frames] > 0.7 * peak, up, best)
+
+    voiced = peak > 5.0 * np.mean(salience, axis=0)
+    midi = np.where(voiced, librosa.hz_to_midi(freqs[best]), np.nan).astype(np.float32)
+    return Melody(midi, hop / sr)
+
+
+def ensure_melody(song_path):
+    """Extracts and saves the contour next to `song_path` unless it already exists. Returns its path."""
+    path = melody_path(song_path)
+    if not os.path.exists(path):
+        melody = extract_melody(song_path)
+        save_melody(path, melody.midi, melody.hop_seconds)
+    return path
@@ -0,0 +1,279 @@
+"""
+Lightweight latency metrics shared by the host and the MCP agents.
+
+- Agents wrap their tools with `instrument_tool`: the tool's duration, any
+  per-stage timings recorded with `stage(...)`, and cumulative cache hit/miss
+  counts are attached to the JSON result under the `_timing` key. The wrapper
+  also continues the caller's trace (see `common.tracing`), and every stage
+  becomes a span.
+- The host feeds those envelopes (plus its own round-trip timings) into a
+  `Registry` and exposes it in the Prometheus text format.
+
+No external dependency: histograms use fixed buckets and are rendered by hand.
+"""
+
+import contextlib
+import contextvars
+import functools
+import inspect
+import json
+import threading
+import time
+
+from common import tracing
+
+# Seconds. Covers fast lookups (ms) up to a long evaluation + LLM call.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+TIMING_KEY = "_timing"
+
+
+def _label_str(labelnames, values):
+    if not labelnames:
+        return ""
+    pairs = []
+    for name, value in zip(labelnames, values):
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, help_text, labelnames=()):
+        super().__init__(name, help_text, labelnames)
+        self._values = {}
+
+    def inc(self, amount=1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def set_total(self, value, **labels):
+        """Sets the counter from a cumulative value reported by another process."""
+        with self._lock:
+            self._values[self._key(labels)] = float(value)
+
+    def _samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_label_str(self.labelnames, k)} {v}" for k, v in items]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name, help_text, labelnames=()):
+        super().__init__(name, help_text, labelnames)
+        self._values = {}
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = float(value)
+
+    def inc(self, amount=1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount=1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def _samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_label_str(self.labelnames, k)} {v}" for k, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # key -> [bucket counts..., sum, count]
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    @contextlib.contextmanager
+    def time(self, **labels):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, **labels)
+
+    def _samples(self):
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._series.items()]
+        lines = []
+        bucket_labels = self.labelnames + ("le",)
+        for key, series in items:
+            for bound, count in zip(self.buckets, series):
+                lines.append(f"{self.name}_bucket{_label_str(bucket_labels, key + (bound,))} {count}")
+            lines.append(f"{self.name}_bucket{_label_str(bucket_labels, key + ('+Inf',))} {series[-1]}")
+            lines.append(f"{self.name}_sum{_label_str(self.labelnames, key)} {series[-2]}")
+            lines.append(f"{self.name}_count{_label_str(self.labelnames, key)} {series[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._add(Counter(name, help_text, labelnames))
+
+    def gauge(self, name, help_text, labelnames=()):
+        return self._add(Gauge(name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(name, help_text, labelnames, buckets))
+
+    def render_prometheus(self) -> str:
+        return "\n".join(m.render() for m in self._metrics) + "\n"
+
+
+# === AGENT SIDE: stage timings and cache statistics ===
+
+class StageTimer:
+    """Accumulates wall time per named stage (a stage may run several times)."""
+
+    def __init__(self):
+        self.timings = {}
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + (time.perf_counter() - t0)
+
+    def as_ms(self):
+        return {name: round(sec * 1000, 2) for name, sec in self.timings.items()}
+
+
+_current_timer = contextvars.ContextVar("stage_timer", default=None)
+
+
+@contextlib.contextmanager
+def collect_stages():
+    """Makes `stage(...)` calls in this context record into a fresh StageTimer."""
+    timer = StageTimer()
+    token = _current_timer.set(timer)
+    try:
+        yield timer
+    finally:
+        _current_timer.reset(token)
+
+
+@contextlib.contextmanager
+def stage(name):
+    """Times a block into the active StageTimer and records it as a trace span."""
+    timer = _current_timer.get()
+    with tracing.start_span(name):
+        if timer is None:
+            yield
+            return
+        with timer.stage(name):
+            yield
+
+
+_cache_stats = {}
+_cache_lock = threading.Lock()
+
+
+def record_cache_lookup(cache_name, hit):
+    with _cache_lock:
+        stats = _cache_stats.setdefault(cache_name, {"hits": 0, "misses": 0})
+        stats["hits" if hit else "misses"] += 1
+
+
+def cache_stats():
+    with _cache_lock:
+        return {name: dict(stats) for name, stats in _cache_stats.items()}
+
+
+def instrument_tool(fn):
+    """
+    Decorator for MCP tools returning a JSON object string. Adds a `_timing`
+    envelope with the tool duration, stage timings (ms) and cache statistics.
+
+    The tool also gains an optional `traceparent` argument: the host fills it in
+    so the tool's span (and its stage spans) join the caller's trace.
+    """
+    @functools.wraps(fn)
+    def wrapper(*args, traceparent: str = "", **kwargs):
+        t0 = time.perf_counter()
+        with tracing.start_span(f"tool:{fn.__name__}", traceparent=traceparent, kind="SERVER"), \
+                collect_stages() as timer:
+            result = fn(*args, **kwargs)
+        duration_ms = round((time.perf_counter() - t0) * 1000, 2)
+        try:
+            data = json.loads(result)
+        except (TypeError, ValueError):
+            return result
+        if not isinstance(data, dict):
+            return result
+        data[TIMING_KEY] = {
+            "tool": fn.__name__,
+            "duration_ms": duration_ms,
+            "stages_ms": timer.as_ms(),
+            "caches": cache_stats(),
+        }
+        return json.dumps(data)
+
+    # Advertise `traceparent` in the tool's input schema (FastMCP reads the signature)
+    sig = inspect.signature(fn)
+    trace_param = inspect.Parameter(tracing.TRACEPARENT_ARG, inspect.Parameter.KEYWORD_ONLY,
+                                    default="", annotation=str)
+    wrapper.__signature__ = sig.replace(parameters=list(sig.parameters.values()) + [trace_param])
+    return wrapper
+
+
+def split_timing(result_text):
+    """Host side: removes the `_timing` envelope from a tool result. Returns (text, timing)."""
+    if not result_text or TIMING_KEY not in result_text:
+        return result_text, None
+    try:
+        data = json.loads(result_text)
+    except ValueError:
+        return result_text, None
+    if not isinstance(data, dict) or TIMING_KEY not in data:
+        return result_text, None
+    timing = data.pop(TIMING_KEY)
+    return json.dumps(data), timing
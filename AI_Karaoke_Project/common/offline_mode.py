@@ -0,0 +1,52 @@
+"""
+Offline stand-ins used when KARAOKE_FAKE_SERVICES=1 (load testing / CI).
+
+- Lyrics: deterministic synced LRC generated from the query, no network.
+- Songs: queries resolve to a pre-seeded library (loadtest/seed_library.py)
+  instead of searching/downloading from YouTube.
+
+OpenAI (chat + Whisper) is faked separately by pointing OPENAI_BASE_URL at
+loadtest/fake_openai.py, so the agents' OpenAI code paths run unchanged.
+"""
+
+import hashlib
+import json
+import os
+import random
+
+FAKE_SERVICES = os.getenv("KARAOKE_FAKE_SERVICES", "0") == "1"
+
+FAKE_LIBRARY_FILE = "fake_library.json"
+
+_WORDS = ("love night heart fire dance light dream sky baby tonight "
+          "forever feel hold run away home shine star rain down").split()
+
+
+def _seed(query: str) -> int:
+    return int(hashlib.sha1(query.lower().encode("utf-8")).hexdigest()[:8], 16)
+
+
+def fake_lrc(query: str, lines: int = 40, line_seconds: float = 4.0) -> str:
+    """Deterministic LRC text for `query` (same query -> same lyrics)."""
+    rng = random.Random(_seed(query))
+    out = [f"[ti:{query}]"]
+    for i in range(lines):
+        t = 2.0 + i * line_seconds
+        words = " ".join(rng.choice(_WORDS) for _ in range(rng.randint(3, 6)))
+        out.append(f"[{int(t // 60):02d}:{t % 60:05.2f}]{words}")
+    return "\n".join(out)
+
+
+def load_fake_library(songs_dir: str) -> list:
+    path = os.path.join(songs_dir, FAKE_LIBRARY_FILE)
+    if not os.path.exists(path):
+        return []
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def pick_fake_song(query: str, library: list) -> dict:
+    """Maps any query onto one of the seeded songs (stable per query)."""
+    if not library:
+        raise Exception("Fake song library is empty. Run loadtest/seed_library.py first.")
+    return library[_seed(query) % len(library)]
@@ -0,0 +1,141 @@
+"""
+Low-latency pitch tracking for live on-screen feedback.
+
+The browser streams small mono float32 chunks of microphone audio; a
+`PitchTracker` keeps the most recent analysis frame and runs YIN (de Cheveigné
+& Kawahara, 2002) on it whenever a chunk arrives. One FFT per chunk (well under
+a millisecond for a 2048-sample frame), so the answer is back long before the
+next chunk. If the song has a reference melody (see `common.melody`), each
+result also carries the target note at that point of the song.
+
+Wire format of a chunk (see `parse_chunk`):
+    float64 song position in seconds (little-endian) + float32 mono samples
+"""
+
+import math
+import struct
+
+from common.startup_profile import lazy_module
+
+np = lazy_module("numpy")
+
+FMIN = 65.0     # C2
+FMAX = 1047.0   # C6
+YIN_THRESHOLD = 0.15
+# Frames quieter than this RMS are reported as unvoiced without running YIN
+SILENCE_RMS = 0.01
+
+# Microphone rates a stream may declare; the analysis frame grows with the rate
+MIN_SAMPLE_RATE = 8000
+MAX_SAMPLE_RATE = 96000
+
+NOTE_NAMES = ["C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B"]
+
+_HEADER = struct.Struct("<d")
+
+
+def hz_to_midi(f0):
+    return 69.0 + 12.0 * math.log2(f0 / 440.0)
+
+
+def note_name(midi):
+    n = int(round(midi))
+    return f"{NOTE_NAMES[n % 12]}{n // 12 - 1}"
+
+
+def parse_chunk(data: bytes):
+    """Splits a binary chunk into (song_time, float32 samples). ValueError if it is malformed."""
+    if len(data) < _HEADER.size or (len(data) - _HEADER.size) % 4:
+        raise ValueError(f"bad pitch chunk of {len(data)} bytes")
+    (song_time,) = _HEADER.unpack_from(data)
+    return song_time, np.frombuffer(data, dtype="<f4", offset=_HEADER.size)
+
+
+def yin_pitch(frame, sr, fmin=FMIN, fmax=FMAX, threshold=YIN_THRESHOLD):
+    """F0 of one frame in Hz, or None if it is unvoiced."""
+    x = np.asarray(frame, dtype=np.float64)
+    tau_min = max(2, int(sr / fmax))
+    tau_max = min(int(sr / fmin), len(x) // 2)
+    w = len(x) - tau_max  # integration window
+    if tau_max <= tau_min:
+        return None
+
+    # 1. Difference function d(tau) = E(0) + E(tau) - 2 r(tau), with r from one FFT
+    n_fft = 1 << (len(x) + w - 1).bit_length()
+    spectrum = np.fft.rfft(x, n_fft) * np.conj(np.fft.rfft(x[:w], n_fft))
+    r = np.fft.irfft(spectrum, n_fft)[:tau_max + 1]
+    energy = np.concatenate([[0.0], np.cumsum(x * x)])
+    e_tau = energy[w:w + tau_max + 1] - energy[:tau_max + 1]
+    d = np.maximum(e_tau[0] + e_tau - 2.0 * r, 0.0)
+
+    # 2. Cumulative mean normalized difference
+    cmnd = np.ones_like(d)
+    running = np.cumsum(d[1:])
+    cmnd[1:] = d[1:] * np.arange(1, len(d)) / np.maximum(running, 1e-12)
+
+    # 3. First dip below the threshold, walked down to its local minimum
+    below = np.nonzero(cmnd[tau_min:] < threshold)[0]
+    if len(below) == 0:
+        return None
+    tau = tau_min + int(below[0])
+    while tau + 1 <= tau_max and cmnd[tau + 1] < cmnd[tau]:
+        tau += 1
+
+    # 4. Parabolic interpolation around the minimum
+    if 0 < tau < tau_max:
+        a, b, c = cmnd[tau - 1], cmnd[tau], cmnd[tau + 1]
+        denom = a - 2 * b + c
+        shift = 0.5 * (a - c) / denom if denom > 0 else 0.0
+    else:
+        shift = 0.0
+    return float(sr / (tau + shift))
+
+
+class PitchTracker:
+    """
+    Per-connection state: the last `frame_length` samples of the stream.
+        tracker = PitchTracker(48000, melody=load_melody(...))
+        result = tracker.push(samples, song_time)
+    """
+
+    def __init__(self, sr, frame_length=None, melody=None):
+        self.sr = int(sr)
+        # Two periods of the lowest pitch must fit in the frame
+        self.frame_length = frame_length or 1 << math.ceil(math.log2(2 * self.sr / FMIN))
+        self.melody = melody
+        self._frame = np.zeros(self.frame_length, dtype=np.float32)
+        self._filled = 0
+
+    def push(self, samples, song_time=None) -> dict:
+        """Appends a chunk and returns the pitch of the newest frame."""
+        k = len(samples)
+        n = self.frame_length
+        if k >= n:
+            self._frame[:] = samples[-n:]
+        elif k:
+            self._frame[:-k] = self._frame[k:]
+            self._frame[-k:] = samples
+        self._filled = min(n, self._filled + k)
+
+        # Report the time at the centre of the analysed frame
+        t = None if song_time is None else round(song_time - 0.5 * n / self.sr, 3)
+        result = {"t": t, "f0": None, "midi": None, "note": None, "target": None, "cents_off": None}
+
+        if self.melody is not None and t is not None:
+            target = float(self.melody.at(t))
+            if not math.isnan(target):
+                result["target"] = round(target, 2)
+
+        if self._filled < n or float(np.sqrt(np.mean(self._frame ** 2))) < SILENCE_RMS:
+            return result
+        f0 = yin_pitch(self._frame, self.sr)
+        if f0 is None:
+            return result
+
+        midi = hz_to_midi(f0)
+        result.update(f0=round(f0, 1), midi=round(midi, 2), note=note_name(midi))
+        if result["target"] is not None:
+            # Singing an octave off still counts as the right note (fold into +-600 cents)
+            cents = (midi - result["target"]) * 100.0
+            result["cents_off"] = round((cents + 600.0) % 1200.0 - 600.0, 1)
+        return result
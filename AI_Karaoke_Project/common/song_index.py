@@ -0,0 +1,142 @@
+"""
+In-memory search over the local song library, for autocomplete.
+
+Each song is indexed under its title and the queries that found it. A trigram inverted index narrows a
+query to a few candidates, and only those are scored with rapidfuzz. Typos
+and partial titles still match. Candidate counting is one numpy bincount
+over the posting lists, so a lookup takes a fraction of a millisecond even
+for libraries of thousands of songs.
+
+`LibrarySearch(songs_dir)` rebuilds the index when `library.json` changes.
+The Audio Agent's `search_library` tool and the host's `/api/library/search`
+each keep one.
+"""
+
+import json
+import logging
+import os
+import threading
+from collections import Counter
+
+from common.song_library import LIBRARY_FILE, normalize_query
+from common.startup_profile import lazy_module
+
+fuzz = lazy_module("rapidfuzz.fuzz")
+np = lazy_module("numpy")
+
+logger = logging.getLogger("SongIndex")
+
+# Candidates scored per query (by shared trigrams)
+MAX_CANDIDATES = 20
+# Suggestions below this score (0-100) are noise
+MIN_SCORE = 60
+
+
+def trigrams(text: str) -> set:
+    """Character trigrams of each word, padded so word starts weigh more ("  b", " bo", "boh", ...)."""
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def split_title(title: str):
+    """'Queen - Bohemian Rhapsody (Karaoke Version)' -> ('bohemian rhapsody', 'queen')."""
+    if " - " in title:
+        artist, song = title.split(" - ", 1)
+        return normalize_query(song), normalize_query(artist)
+    return normalize_query(title), ""
+
+
+class SongIndex:
+    def __init__(self, songs):
+        """`songs`: SongLibrary entries ({"id", "title", "file", "queries", ...})."""
+        self.songs = []
+        self._names = []      # per song: normalized strings it can be found by
+        postings = {}         # trigram -> song positions
+        for song in songs:
+            title = song.get("title") or song["id"]
+            name, artist = split_title(title)
+            # The full title covers its song and artist parts (WRatio compares partially)
+            names = {normalize_query(title)} | {normalize_query(q) for q in song.get("queries", [])}
+            names.discard("")
+            pos = len(self.songs)
+            self.songs.append({
+                "id": song["id"],
+                "title": title,
+                "song": name,
+                "artist": artist,
+                "duration": song.get("duration"),
+                "url": f"/songs/{song['file']}",
+            })
+            self._names.append(sorted(names))
+            for gram in set().union(*map(trigrams, names)):
+                postings.setdefault(gram, []).append(pos)
+        self._postings = {gram: np.array(positions, dtype=np.int32) for gram, positions in postings.items()}
+
+    def __len__(self):
+        return len(self.songs)
+
+    def search(self, query: str, limit: int = 5) -> list:
+        """Best matching songs for a (partial, misspelled) query, best first, with a 0-100 `score`."""
+        norm = normalize_query(query)
+        if not norm:
+            return []
+
+        # 1. Candidates sharing the most trigrams with the query
+        lists = [self._postings[gram] for gram in trigrams(norm) if gram in self._postings]
+        if not lists:
+            return []
+        counts = np.bincount(np.concatenate(lists), minlength=len(self.songs))
+        # Songs sharing at least half as many as the best one, at most MAX_CANDIDATES of them
+        candidates = np.flatnonzero(counts >= max(1, counts.max() // 2))
+        if len(candidates) > MAX_CANDIDATES:
+            candidates = candidates[np.argpartition(counts[candidates], -MAX_CANDIDATES)[-MAX_CANDIDATES:]]
+
+        # 2. Score them. WRatio takes the best of full, partial (prefixes while
+        # typing) and token-order-insensitive comparisons; shared trigrams break ties.
+        scored = []
+        for pos in candidates.tolist():
+            score = max(fuzz.WRatio(norm, name) for name in self._names[pos])
+            if score >= MIN_SCORE:
+                scored.append((score, int(counts[pos]), pos))
+        scored.sort(key=lambda item: (-item[0], -item[1], self.songs[item[2]]["title"]))
+        return [dict(self.songs[pos], score=round(score, 1)) for score, _, pos in scored[:limit]]
+
+
+class LibrarySearch:
+    """A SongIndex over `<songs_dir>/library.json`, rebuilt whenever the file changes."""
+
+    def __init__(self, songs_dir):
+        self.songs_dir = str(songs_dir)
+        self.path = os.path.join(self.songs_dir, LIBRARY_FILE)
+        self._index = SongIndex([])
+        self._version = None
+        self._lock = threading.Lock()
+
+    def _songs_on_disk(self) -> list:
+        with open(self.path) as f:
+            songs = json.load(f).get("songs", {})
+        return [dict(song, id=video_id) for video_id, song in songs.items()
+                if os.path.exists(os.path.join(self.songs_dir, song["file"]))]
+
+    def index(self) -> SongIndex:
+        try:
+            st = os.stat(self.path)
+            version = (st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            return self._index
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    try:
+                        self._index = SongIndex(self._songs_on_disk())
+                        logger.info(f"Indexed {len(self._index)} library songs")
+                    except (OSError, ValueError) as e:
+                        logger.error(f"Could not index {self.path}: {e}")
+                    self._version = version
+        return self._index
+
+    def search(self, query: str, limit: int = 5) -> list:
+        return self.index().search(query, limit)
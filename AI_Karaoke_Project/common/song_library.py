@@ -0,0 +1,210 @@
+"""
+Local song library: which videos have been downloaded, under which titles and queries.
+
+`<songs_dir>/library.json`:
+    {"songs":    {"<video_id>": {"title", "duration", "channel", "file", "queries": [...], "added_at"}},
+     "searches": {"<normalized query>": {"at": <unix time>, "results": [{"id", "title", "duration",
+                                                                         "channel", "url"}, ...]}}}
+
+The Audio Agent resolves a request in tiers, cheapest first:
+    1. the query, or something close to it, matches a title or earlier query of a
+       song already on disk (rapidfuzz, no network)
+    2. cached flat search results for the query (no network)
+    3. a flat YouTube search (ids, titles and durations only). A download
+       happens only if the chosen video isn't on disk yet.
+The old `query_cache.json` (query -> video id) is imported on first load.
+
+A song's lyrics are looked up once and stored next to it as
+`<video_id>.lyrics.json` (the Lyrics Agent's search_lyrics result). Every
+later play, whatever the query, reuses that file.
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+from common.startup_profile import lazy_module
+
+fuzz = lazy_module("rapidfuzz.fuzz")
+
+logger = logging.getLogger("SongLibrary")
+
+LIBRARY_FILE = "library.json"
+LEGACY_QUERY_CACHE = "query_cache.json"
+
+# A library song is used without searching when a title or alias scores at least this (0-100)
+MATCH_THRESHOLD = 85
+# ...and beats every other song by this much ("hello" could be Adele or Lionel Richie)
+MATCH_MARGIN = 5
+# A partial title matches only if each of its words is at least this close to a word of the title
+PARTIAL_WORD_THRESHOLD = 80
+# Flat search results are reused for this long, then searched again (new uploads, takedowns)
+SEARCH_TTL_SECONDS = int(os.getenv("AUDIO_SEARCH_CACHE_TTL", str(7 * 24 * 3600)))
+MAX_CACHED_SEARCHES = 500
+
+# Words that say nothing about which song is meant
+_FILLER = re.compile(r"\b(karaoke|version|lyrics?|instrumental|official|music video|video|audio|hd|hq|"
+                     r"sing king|with|backing track|no vocals?)\b")
+_NON_WORD = re.compile(r"[^\w\s]")
+
+
+def lyrics_path(song_path) -> str:
+    """`songs/abc123.mp4` -> `songs/abc123.lyrics.json`."""
+    return f"{os.path.splitext(str(song_path))[0]}.lyrics.json"
+
+
+def load_lyrics(song_path):
+    """Stored lyrics for a song file ({"title", "lyrics": [...], "synced", ...}), or None."""
+    try:
+        with open(lyrics_path(song_path)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, json.JSONDecodeError) as e:
+        logger.warning(f"Ignoring unreadable lyrics for {song_path}: {e}")
+        return None
+
+
+def save_lyrics(song_path, lyrics: dict):
+    path = lyrics_path(song_path)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(lyrics, f)
+    os.replace(tmp_path, path)
+
+
+def normalize_query(text: str) -> str:
+    """'Bohemian Rhapsody (Karaoke Version)' -> 'bohemian rhapsody'."""
+    text = _NON_WORD.sub(" ", (text or "").lower().replace("'", ""))
+    return " ".join(_FILLER.sub(" ", text).split())
+
+
+def match_score(query: str, candidate: str) -> float:
+    """How well a normalized query names a normalized title or alias (0-100)."""
+    # Same words in any order, typos allowed
+    score = fuzz.token_sort_ratio(query, candidate)
+    # Or a partial title ("bohemian rapsody" -> "queen bohemian rhapsody"): every
+    # query word has to be in the candidate, not the other way round, so that
+    # "help me rhonda" doesn't settle for "help". A single word is too generic for that.
+    words = query.split()
+    if len(words) >= 2:
+        candidate_words = candidate.split()
+        best = [max((fuzz.ratio(word, other) for other in candidate_words), default=0.0) for word in words]
+        if min(best) >= PARTIAL_WORD_THRESHOLD:
+            # Longer words say more about the song than "me" or "the"
+            score = max(score, sum(b * len(w) for b, w in zip(best, words)) / sum(map(len, words)))
+    return score
+
+
+class SongLibrary:
+    def __init__(self, songs_dir):
+        self.songs_dir = songs_dir
+        self.path = os.path.join(songs_dir, LIBRARY_FILE)
+        self._lock = threading.Lock()
+        self._data = self._load()
+
+    def _load(self) -> dict:
+        data = {"songs": {}, "searches": {}}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path) as f:
+                    data.update(json.load(f))
+            except (OSError, json.JSONDecodeError) as e:
+                logger.error(f"Could not read {self.path}, starting empty: {e}")
+        legacy = os.path.join(self.songs_dir, LEGACY_QUERY_CACHE)
+        if os.path.exists(legacy) and not data["songs"]:
+            try:
+                with open(legacy) as f:
+                    for query, video_id in json.load(f).items():
+                        song = data["songs"].setdefault(video_id, {"title": None, "file": f"{video_id}.mp4",
+                                                                   "queries": [], "added_at": time.time()})
+                        song["queries"].append(query)
+                logger.info(f"Imported {len(data['songs'])} songs from {LEGACY_QUERY_CACHE}")
+            except (OSError, json.JSONDecodeError):
+                pass
+        return data
+
+    def save(self):
+        with self._lock:
+            payload = json.dumps(self._data)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(payload)
+        os.replace(tmp_path, self.path)
+
+    # === SONGS ===
+
+    def get(self, video_id):
+        with self._lock:
+            song = self._data["songs"].get(video_id)
+            return dict(song, id=video_id) if song else None
+
+    def songs(self) -> list:
+        """All songs whose file is on disk."""
+        with self._lock:
+            items = list(self._data["songs"].items())
+        return [dict(song, id=video_id) for video_id, song in items
+                if os.path.exists(os.path.join(self.songs_dir, song["file"]))]
+
+    def record(self, video_id, file, query=None, title=None, duration=None, channel=None):
+        """Adds or updates a downloaded song and remembers `query` as an alias for it."""
+        with self._lock:
+            song = self._data["songs"].setdefault(video_id, {"title": title, "file": file, "queries": [],
+                                                             "added_at": time.time()})
+            song["file"] = file
+            for key, value in (("title", title), ("duration", duration), ("channel", channel)):
+                if value is not None:
+                    song[key] = value
+            if query and query not in song["queries"]:
+                song["queries"].append(query)
+        self.save()
+
+    def find_by_query(self, query):
+        """Song previously downloaded for exactly this query, if its file still exists."""
+        with self._lock:
+            items = list(self._data["songs"].items())
+        for video_id, song in items:
+            if query in song.get("queries", ()) and os.path.exists(os.path.join(self.songs_dir, song["file"])):
+                return dict(song, id=video_id)
+        return None
+
+    def match(self, query, threshold=MATCH_THRESHOLD):
+        """Best on-disk song for a differently phrased query: (song, score), or (None, best score)."""
+        norm = normalize_query(query)
+        if not norm:
+            return None, 0.0
+        scored = []
+        for song in self.songs():
+            names = [song.get("title")] + song.get("queries", [])
+            score = max((match_score(norm, normalize_query(name)) for name in filter(None, names)), default=0.0)
+            scored.append((score, song))
+        if not scored:
+            return None, 0.0
+        scored.sort(key=lambda item: item[0], reverse=True)
+        best_score, best = scored[0]
+        runner_up = scored[1][0] if len(scored) > 1 else 0.0
+        if best_score >= threshold and best_score - runner_up >= MATCH_MARGIN:
+            return best, best_score
+        return None, best_score
+
+    # === SEARCH RESULTS ===
+
+    def cached_search(self, query):
+        """Fresh flat search results for this query, or None."""
+        with self._lock:
+            entry = self._data["searches"].get(normalize_query(query))
+        if entry and time.time() - entry["at"] < SEARCH_TTL_SECONDS:
+            return entry["results"]
+        return None
+
+    def store_search(self, query, results):
+        with self._lock:
+            searches = self._data["searches"]
+            searches[normalize_query(query)] = {"at": time.time(), "results": results}
+            if len(searches) > MAX_CACHED_SEARCHES:
+                for key in sorted(searches, key=lambda k: searches[k]["at"])[:len(searches) - MAX_CACHED_SEARCHES]:
+                    del searches[key]
+        self.save()
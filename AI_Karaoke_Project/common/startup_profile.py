@@ -0,0 +1,135 @@
+"""
+Startup helpers shared by the MCP agents.
+
+Heavy libraries (librosa, scipy, yt-dlp, OpenAI clients, ...) are loaded on first
+use through `lazy_module` or pre-loaded by `start_background_warmup` once the
+agent is already serving the MCP handshake. Every import done through these
+helpers is timed, so `startup_report()` can show where startup time went.
+"""
+
+import importlib
+import logging
+import sys
+import threading
+import time
+
+logger = logging.getLogger("StartupProfile")
+
+# Process start reference (this module is imported first thing by every agent)
+_PROCESS_START = time.perf_counter()
+
+_import_times = {}
+_lock = threading.Lock()
+_ready_at = None
+_warmup = {"status": "idle", "duration_s": None}
+_stages = {}
+
+
+def timed_import(name: str):
+    """Imports a module (once) and records how long the import took."""
+    # Always go through import_module: a module another thread is still importing
+    # is already in sys.modules, half initialized, and import_module waits for it.
+    # Only the thread that actually imported it records a time.
+    already_loaded = name in sys.modules
+    t0 = time.perf_counter()
+    module = importlib.import_module(name)
+    elapsed = time.perf_counter() - t0
+    if already_loaded:
+        return module
+
+    with _lock:
+        # Keep the first (real) measurement if two threads raced on the import
+        _import_times.setdefault(name, elapsed)
+    logger.debug(f"Imported {name} in {elapsed * 1000:.1f}ms")
+    return module
+
+
+class LazyModule:
+    """
+    Module proxy that performs the real import on first attribute access.
+    Lets module-level code keep writing `librosa.load(...)` without paying
+    the import cost at agent startup.
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            self._module = timed_import(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<LazyModule {self._name} ({state})>"
+
+
+def lazy_module(name: str) -> LazyModule:
+    return LazyModule(name)
+
+
+def mark_ready():
+    """Records the moment the agent is about to start serving MCP requests."""
+    global _ready_at
+    _ready_at = time.perf_counter()
+
+
+def record_startup_stage(name: str, seconds: float):
+    """Records a named startup step (e.g. an analysis warm-up run) for the report."""
+    with _lock:
+        _stages[name] = seconds
+
+
+def start_background_warmup(module_names, callback=None) -> threading.Thread:
+    """
+    Imports `module_names` in a daemon thread so the main thread can answer the
+    MCP handshake immediately. `callback` (optional) runs after the imports.
+    """
+    def _run():
+        _warmup["status"] = "running"
+        t0 = time.perf_counter()
+        for name in module_names:
+            try:
+                timed_import(name)
+            except Exception as e:
+                logger.warning(f"Background import of {name} failed: {e}")
+        if callback:
+            try:
+                callback()
+            except Exception as e:
+                logger.warning(f"Warm-up callback failed: {e}")
+        _warmup["duration_s"] = round(time.perf_counter() - t0, 3)
+        _warmup["status"] = "done"
+        log_startup_report()
+
+    thread = threading.Thread(target=_run, name="agent-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def startup_report() -> dict:
+    """Returns per-module import times (ms, slowest first) and startup milestones."""
+    with _lock:
+        imports = sorted(_import_times.items(), key=lambda kv: kv[1], reverse=True)
+        stages = dict(_stages)
+    return {
+        "ready_after_s": round(_ready_at - _PROCESS_START, 3) if _ready_at else None,
+        "warmup": dict(_warmup),
+        "stages_s": {name: round(sec, 3) for name, sec in stages.items()},
+        "imports_ms": {name: round(sec * 1000, 1) for name, sec in imports},
+    }
+
+
+def log_startup_report(log=None):
+    log = log or logger
+    report = startup_report()
+    log.info(f"Startup profile: ready after {report['ready_after_s']}s, "
+             f"warm-up {report['warmup']['status']} ({report['warmup']['duration_s']}s)")
+    for name, sec in report["stages_s"].items():
+        log.info(f"  stage  {name:<28} {sec:>8.3f} s")
+    for name, ms in report["imports_ms"].items():
+        log.info(f"  import {name:<28} {ms:>8.1f} ms")
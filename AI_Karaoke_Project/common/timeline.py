@@ -0,0 +1,102 @@
+"""
+Compact lyric timeline: parallel arrays instead of one dict per line.
+
+    {"t":    [12.5, 16.0, ...],           line start times (s), sorted
+     "end":  [15.8, 19.2, ...],           when each line's singing ends (s)
+     "text": ["Is this the real life", ...],
+     "words": [[12.5, 12.9, ...], null, ...]}   optional: onset of each word of
+                                                 text.split(), null if unknown
+
+Without per-line keys it serializes smaller than the [{"timestamp", "text"}, ...]
+list parse_lrc used to return, even with the end times added. Because `t` is
+sorted, the active line at a playback time is a binary search (`line_at`;
+frontend/src/utils/timeline.js does the same lookup for the player).
+
+The Lyrics Agent returns this as `timeline`. The evaluator accepts it or the
+old list of lines (`as_timeline`).
+"""
+
+from bisect import bisect_left, bisect_right
+
+# Without an explicit end (enhanced LRC word tags, a blank timestamped line), a line
+# lasts ~0.6 s per word, at least MIN_LINE_SECONDS, and stops when the next line
+# starts. The last line is taken to have DEFAULT_LAST_LINE_SECONDS before "the next".
+SECONDS_PER_WORD = 0.6
+MIN_LINE_SECONDS = 0.5
+DEFAULT_LAST_LINE_SECONDS = 5.0
+
+
+def is_timeline(obj) -> bool:
+    return isinstance(obj, dict) and "t" in obj and "text" in obj
+
+
+def estimate_end(start, next_start, text) -> float:
+    """End of a line whose end isn't given: sung duration estimated from its word count."""
+    n_words = max(1, len(text.split()))
+    return start + max(MIN_LINE_SECONDS, min(next_start - start, n_words * SECONDS_PER_WORD))
+
+
+def _estimated_ends(t, text, last_line_seconds=DEFAULT_LAST_LINE_SECONDS) -> list:
+    next_starts = t[1:] + [t[-1] + last_line_seconds] if t else []
+    return [estimate_end(start, nxt, line) for start, nxt, line in zip(t, next_starts, text)]
+
+
+def from_lines(lines, last_line_seconds=DEFAULT_LAST_LINE_SECONDS) -> dict:
+    """
+    Timeline from [{"timestamp" (or "start_time"), "text", "end"?, "words"?}, ...].
+    Lines without an end get `estimate_end`.
+    """
+    rows = sorted(lines, key=lambda l: float(l.get("timestamp", l.get("start_time", 0))))
+    t = [float(l.get("timestamp", l.get("start_time", 0))) for l in rows]
+    text = [l.get("text", "") for l in rows]
+    end = [float(l["end"]) if l.get("end") is not None else default
+           for l, default in zip(rows, _estimated_ends(t, text, last_line_seconds))]
+    timeline = {"t": t, "end": end, "text": text}
+    words = [l.get("words") for l in rows]
+    if any(words):
+        timeline["words"] = words
+    return timeline
+
+
+def to_lines(timeline) -> list:
+    """[{"timestamp", "end", "text", "words"?}, ...], the per-line form the scoring code iterates."""
+    words = timeline.get("words") or [None] * len(timeline["t"])
+    lines = []
+    for start, end, text, line_words in zip(timeline["t"], timeline["end"], timeline["text"], words):
+        line = {"timestamp": start, "end": end, "text": text}
+        if line_words:
+            line["words"] = line_words
+        lines.append(line)
+    return lines
+
+
+def as_timeline(lyrics):
+    """Timeline from either format (or a search_lyrics result holding one); None if empty."""
+    if isinstance(lyrics, dict) and not is_timeline(lyrics):
+        lyrics = lyrics.get("timeline") or lyrics.get("lyrics")
+    if not lyrics:
+        return None
+    if not is_timeline(lyrics):
+        lyrics = from_lines(lyrics)
+    elif "end" not in lyrics:
+        lyrics = dict(lyrics, end=_estimated_ends(list(lyrics["t"]), list(lyrics["text"])))
+    return lyrics if lyrics["t"] else None
+
+
+def line_at(timeline, time) -> int:
+    """Index of the line being sung at `time` (the last one started), or -1 before the first."""
+    return bisect_right(timeline["t"], time) - 1
+
+
+def window(timeline, start, end, shift=0.0) -> dict:
+    """Lines starting in (start, end), with every time moved by -shift."""
+    t = timeline["t"]
+    lo, hi = bisect_right(t, start), bisect_left(t, end)
+    sub = {
+        "t": [x - shift for x in t[lo:hi]],
+        "end": [x - shift for x in timeline["end"][lo:hi]],
+        "text": timeline["text"][lo:hi],
+    }
+    if timeline.get("words"):
+        sub["words"] = [[w - shift for w in ws] if ws else None for ws in timeline["words"][lo:hi]]
+    return sub
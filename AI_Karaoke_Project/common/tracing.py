@@ -0,0 +1,179 @@
+"""
+Minimal distributed tracing for the host and the MCP agents.
+
+Trace context travels as a W3C `traceparent` string ("00-<trace>-<span>-01"):
+the host passes it as an extra tool argument (see `metrics.instrument_tool`)
+and every agent continues the trace with its own spans.
+
+Finished spans are appended as Zipkin v2 JSON (one span per line) to
+`$KARAOKE_TRACE_DIR/<service>.jsonl`, which Zipkin/Jaeger/OTel collectors can
+ingest (wrap the lines in a JSON array and POST to /api/v2/spans). If
+KARAOKE_TRACE_DIR is unset, spans are still created (so trace ids propagate)
+but nothing is written. Finishing a span only queues it; a writer thread
+appends whatever has queued up in one write, so a slow disk never stalls a
+request or the host's event loop. Queued spans are flushed at exit.
+"""
+
+import atexit
+import contextlib
+import contextvars
+import json
+import os
+import queue
+import secrets
+import threading
+import time
+
+TRACEPARENT_ARG = "traceparent"
+
+_service_name = os.getenv("KARAOKE_SERVICE_NAME", "karaoke")
+_trace_dir = os.getenv("KARAOKE_TRACE_DIR")
+
+# (file, zipkin span) pairs waiting for the writer thread
+_queue = queue.Queue()
+_writer = None
+_writer_lock = threading.Lock()
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+def configure(service_name: str, trace_dir: str = None):
+    """Sets this process' service name (and optionally overrides the export directory)."""
+    global _service_name, _trace_dir
+    _service_name = service_name
+    if trace_dir:
+        _trace_dir = trace_dir
+
+
+class Span:
+    def __init__(self, name, trace_id=None, parent_id=None, kind=None, tags=None):
+        self.name = name
+        self.trace_id = trace_id or secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.kind = kind
+        self.tags = {k: str(v) for k, v in (tags or {}).items()}
+        self.start_us = int(time.time() * 1_000_000)
+        self._t0 = time.perf_counter()
+        self.duration_us = None
+
+    def set_tag(self, key, value):
+        self.tags[key] = str(value)
+
+    @property
+    def traceparent(self):
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def finish(self):
+        self.duration_us = max(1, int((time.perf_counter() - self._t0) * 1_000_000))
+        _export(self)
+
+    def to_zipkin(self):
+        span = {
+            "traceId": self.trace_id,
+            "id": self.span_id,
+            "name": self.name,
+            "timestamp": self.start_us,
+            "duration": self.duration_us,
+            "localEndpoint": {"serviceName": _service_name},
+        }
+        if self.parent_id:
+            span["parentId"] = self.parent_id
+        if self.kind:
+            span["kind"] = self.kind
+        if self.tags:
+            span["tags"] = self.tags
+        return span
+
+
+def parse_traceparent(value):
+    """Returns (trace_id, parent_span_id) or (None, None) for a missing/invalid header."""
+    if not value:
+        return None, None
+    parts = value.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None, None
+    return parts[1], parts[2]
+
+
+def current_span():
+    return _current_span.get()
+
+
+def current_traceparent():
+    span = _current_span.get()
+    return span.traceparent if span else None
+
+
+@contextlib.contextmanager
+def start_span(name, traceparent=None, kind=None, **tags):
+    """
+    Opens a span as a child of the current span, or of `traceparent` when given
+    (used at process boundaries). Starts a new trace if neither exists.
+    """
+    parent = _current_span.get()
+    trace_id, parent_id = parse_traceparent(traceparent)
+    if trace_id is None and parent is not None:
+        trace_id, parent_id = parent.trace_id, parent.span_id
+
+    span = Span(name, trace_id=trace_id, parent_id=parent_id, kind=kind, tags=tags)
+    token = _current_span.set(span)
+    try:
+        yield span
+    except Exception as e:
+        span.set_tag("error", e)
+        raise
+    finally:
+        _current_span.reset(token)
+        span.finish()
+
+
+def _export(span):
+    if not _trace_dir:
+        return
+    _queue.put((os.path.join(_trace_dir, f"{_service_name}.jsonl"), span.to_zipkin()))
+    _ensure_writer()
+
+
+def _ensure_writer():
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = threading.Thread(target=_write_loop, name="trace-writer", daemon=True)
+                _writer.start()
+                atexit.register(flush)
+
+
+def _write_loop():
+    while True:
+        batch = [_queue.get()]
+        # Everything that queued up meanwhile goes out in the same write
+        while True:
+            try:
+                batch.append(_queue.get_nowait())
+            except queue.Empty:
+                break
+        _write(batch)
+        for _ in batch:
+            _queue.task_done()
+
+
+def _write(batch):
+    lines = {}
+    for path, span in batch:
+        lines.setdefault(path, []).append(json.dumps(span) + "\n")
+    for path, span_lines in lines.items():
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "a", encoding="utf-8") as f:
+                f.write("".join(span_lines))
+        except OSError:
+            # Tracing must never break a request
+            pass
+
+
+def flush():
+    """Waits until every finished span has been written."""
+    if _writer is not None:
+        _queue.join()
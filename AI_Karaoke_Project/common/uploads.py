@@ -0,0 +1,153 @@
+"""
+Chunked, resumable recording uploads.
+
+The browser sends its MediaRecorder output while the song is still playing:
+    POST /api/uploads                     -> {"upload_id": ..., "received": 0}
+    PUT  /api/uploads/<id>?offset=<n>     body = the next bytes of the recording
+    GET  /api/uploads/<id>                -> {"received": n}   (where to resume)
+and then submits the performance with `upload_id` instead of a file. Chunks
+are appended to a spool file and, for streamable containers (WebM/Ogg), also
+piped into an ffmpeg `StreamDecoder`. By the end of the song the recording is
+already on the host and almost fully decoded.
+
+A chunk whose offset doesn't match what was received is rejected with the
+current count, so the client resumes from there. Re-sent bytes that were
+already received are ignored.
+"""
+
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+
+from common.audio_buffer import StreamDecoder, decode_audio, have_ffmpeg, sniff_suffix
+
+logger = logging.getLogger("Uploads")
+
+# Containers ffmpeg can decode front to back from a pipe (MP4 may keep its index at the end)
+STREAM_DECODE_SUFFIXES = {".webm", ".ogg"}
+
+
+class UploadOffsetError(Exception):
+    """A chunk doesn't continue the upload; `received` is where it should start."""
+
+    def __init__(self, received):
+        super().__init__(f"Upload continues at byte {received}")
+        self.received = received
+
+
+class UploadTooLargeError(Exception):
+    pass
+
+
+class UploadSession:
+    def __init__(self, upload_id, spool_dir, max_bytes, stream_decode=True):
+        self.id = upload_id
+        self.received = 0
+        self.updated_at = time.time()
+        self.spool_path = None
+        self._spool_dir = spool_dir
+        self._max_bytes = max_bytes
+        self._stream_decode = stream_decode
+        self._decoder = None
+        self._lock = threading.Lock()
+
+    def append(self, offset: int, data: bytes) -> int:
+        """Appends the bytes at `offset` (blocking). Returns the total received."""
+        with self._lock:
+            if offset > self.received:
+                raise UploadOffsetError(self.received)
+            # Drop the part of a retried chunk we already have
+            data = data[self.received - offset:]
+            if not data:
+                return self.received
+            if self.received + len(data) > self._max_bytes:
+                raise UploadTooLargeError(f"Upload exceeds {self._max_bytes} bytes")
+
+            if self.spool_path is None:
+                # 1. First chunk: the container decides the suffix and whether we can decode as we go
+                suffix = sniff_suffix(data)
+                self.spool_path = os.path.join(self._spool_dir, f"{self.id}{suffix}")
+                if self._stream_decode and suffix in STREAM_DECODE_SUFFIXES and have_ffmpeg():
+                    self._decoder = StreamDecoder()
+
+            with open(self.spool_path, "ab") as f:
+                f.write(data)
+            if self._decoder is not None:
+                try:
+                    self._decoder.feed(data)
+                except (BrokenPipeError, OSError) as e:
+                    # finish() decodes the spool file instead
+                    logger.warning(f"Upload {self.id}: streaming decode stopped ({e})")
+                    self._decoder.abort()
+                    self._decoder = None
+
+            self.received += len(data)
+            self.updated_at = time.time()
+            return self.received
+
+    def finish(self):
+        """Returns the decoded recording as (y, sr) (blocking)."""
+        with self._lock:
+            if self.spool_path is None:
+                raise ValueError(f"Upload {self.id} is empty")
+            if self._decoder is not None:
+                decoder, self._decoder = self._decoder, None
+                try:
+                    return decoder.finish()
+                except RuntimeError as e:
+                    logger.warning(f"Upload {self.id}: {e}; decoding the spooled file")
+            return decode_audio(self.read_bytes())
+
+    def read_bytes(self) -> bytes:
+        with open(self.spool_path, "rb") as f:
+            return f.read()
+
+    def discard(self):
+        with self._lock:
+            if self._decoder is not None:
+                self._decoder.abort()
+                self._decoder = None
+            if self.spool_path and os.path.exists(self.spool_path):
+                os.remove(self.spool_path)
+
+
+class UploadStore:
+    """In-progress uploads of this host process; idle ones expire after `ttl` seconds."""
+
+    def __init__(self, spool_dir=None, ttl=3600, max_bytes=200 * 1024 * 1024, stream_decode=True):
+        self.spool_dir = spool_dir or os.path.join(tempfile.gettempdir(), "karaoke_uploads")
+        os.makedirs(self.spool_dir, exist_ok=True)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.stream_decode = stream_decode
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def create(self) -> UploadSession:
+        self.expire()
+        session = UploadSession(uuid.uuid4().hex, self.spool_dir, self.max_bytes, self.stream_decode)
+        with self._lock:
+            self._sessions[session.id] = session
+        return session
+
+    def get(self, upload_id):
+        with self._lock:
+            return self._sessions.get(upload_id)
+
+    def pop(self, upload_id):
+        """Removes the session from the store; the caller discards it when done."""
+        with self._lock:
+            return self._sessions.pop(upload_id, None)
+
+    def expire(self):
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            stale = [s for s in self._sessions.values() if s.updated_at < cutoff]
+            for session in stale:
+                del self._sessions[session.id]
+        for session in stale:
+            logger.info(f"Upload {session.id} expired after {self.ttl}s idle")
+            session.discard()
@@ -0,0 +1,104 @@
+"""
+Post-download processing of song videos.
+
+`make_faststart` writes a copy with the MP4 index (moov atom) in front of the
+media data, `abc123.mp4` -> `abc123.faststart.mp4`, so a browser can start
+playing after the first range request instead of fetching most of the file
+first. It is a stream copy (no re-encode), needed only for files that
+`is_faststart` finds laid out the other way. The original is never rewritten:
+its URL may already be cached as immutable (see common.media).
+
+`make_rendition` transcodes a capped-bitrate copy next to the original,
+e.g. `abc123.mp4` -> `abc123.low.mp4`, for screens on slow venue Wi-Fi. The
+client picks a rendition from the `renditions` map that play_song returns.
+"""
+
+import logging
+import os
+import shutil
+import struct
+import subprocess
+
+logger = logging.getLogger("VideoProcessing")
+
+# name -> encoding ladder rung; maxrate/bufsize cap the bitrate, not just target it
+RENDITIONS = {
+    "low": {"height": 480, "video_kbps": 800, "audio_kbps": 96},
+}
+
+
+def have_ffmpeg() -> bool:
+    return shutil.which("ffmpeg") is not None
+
+
+def rendition_path(path, name) -> str:
+    """`songs/abc123.mp4`, "low" -> `songs/abc123.low.mp4`."""
+    root, ext = os.path.splitext(str(path))
+    return f"{root}.{name}{ext}"
+
+
+def is_faststart(path) -> bool:
+    """True if the top-level `moov` box comes before `mdat` (or the file isn't an MP4 we can read)."""
+    with open(path, "rb") as f:
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                return True
+            size, box = struct.unpack(">I4s", header)
+            if box == b"moov":
+                return True
+            if box == b"mdat":
+                return False
+            if size == 1:
+                # 64-bit box size follows the type
+                size = struct.unpack(">Q", f.read(8))[0] - 8
+            elif size == 0:
+                return True  # box runs to EOF, no moov after it
+            if size < 8:
+                return True  # not a box structure we understand; leave the file alone
+            f.seek(size - 8, os.SEEK_CUR)
+
+
+def _run_ffmpeg(args, out_path, final_path):
+    """Runs ffmpeg into `out_path`, then atomically moves it to `final_path`."""
+    cmd = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-y", *args, "-f", "mp4", out_path]
+    result = subprocess.run(cmd, capture_output=True)
+    if result.returncode != 0:
+        if os.path.exists(out_path):
+            os.remove(out_path)
+        raise RuntimeError(f"ffmpeg failed: {result.stderr.decode(errors='replace').strip()}")
+    os.replace(out_path, final_path)
+
+
+def faststart_path(path) -> str:
+    """`songs/abc123.mp4` -> `songs/abc123.faststart.mp4`."""
+    return rendition_path(path, "faststart")
+
+
+def make_faststart(path) -> str:
+    """Writes a faststart copy of `path` next to it unless it exists. Returns its path."""
+    out = faststart_path(path)
+    if os.path.exists(out):
+        return out
+    _run_ffmpeg(["-i", str(path), "-map", "0", "-c", "copy", "-movflags", "+faststart"], f"{out}.part", out)
+    return out
+
+
+def make_rendition(path, name="low") -> str:
+    """Transcodes the `name` rung of RENDITIONS next to `path` unless it exists. Returns its path."""
+    out = rendition_path(path, name)
+    if os.path.exists(out):
+        return out
+    rung = RENDITIONS[name]
+    v, a = rung["video_kbps"], rung["audio_kbps"]
+    _run_ffmpeg([
+        "-i", str(path),
+        # Never upscale; -2 keeps the width even, as H.264 requires
+        "-vf", f"scale=-2:'min({rung['height']},ih)',setsar=1",
+        # 4:2:0 Main profile: what every browser's hardware decoder plays
+        "-c:v", "libx264", "-preset", "veryfast", "-profile:v", "main", "-pix_fmt", "yuv420p",
+        "-b:v", f"{v}k", "-maxrate", f"{v}k", "-bufsize", f"{2 * v}k",
+        "-c:a", "aac", "-b:a", f"{a}k",
+        "-movflags", "+faststart",
+    ], f"{out}.part", out)
+    return out
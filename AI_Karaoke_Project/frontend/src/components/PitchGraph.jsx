@@ -0,0 +1,64 @@
+import React, { useEffect, useRef } from 'react';
+import { PITCH_HISTORY_SECONDS as WINDOW_SECONDS } from '../utils/pitchStream';
+import './PitchGraph.css';
+
+const MIDI_RANGE = 18; // semitones shown around the current pitch
+
+// Live pitch line: the singer (magenta) against the reference melody (cyan).
+// `pointsRef.current` is an array of /ws/pitch results, appended by the parent
+// without re-rendering; the canvas redraws on every animation frame.
+const PitchGraph = ({ pointsRef }) => {
+    const canvasRef = useRef(null);
+
+    useEffect(() => {
+        let frameId;
+        let center = 60;
+
+        const draw = () => {
+            const canvas = canvasRef.current;
+            if (!canvas) return;
+            const ctx = canvas.getContext('2d');
+            const { width, height } = canvas;
+            ctx.clearRect(0, 0, width, height);
+
+            const points = pointsRef.current;
+            const last = points[points.length - 1];
+            if (last && last.t !== null) {
+                // Follow the singer (or the melody) smoothly
+                const focus = last.midi ?? last.target;
+                if (focus !== null && focus !== undefined) center += (focus - center) * 0.1;
+
+                const x = (t) => width - ((last.t - t) / WINDOW_SECONDS) * width;
+                const y = (midi) => height / 2 - ((midi - center) / MIDI_RANGE) * height;
+
+                const line = (key, color, lineWidth) => {
+                    ctx.strokeStyle = color;
+                    ctx.lineWidth = lineWidth;
+                    ctx.beginPath();
+                    let drawing = false;
+                    for (const p of points) {
+                        if (p[key] === null || p.t === null) { drawing = false; continue; }
+                        if (drawing) ctx.lineTo(x(p.t), y(p[key]));
+                        else ctx.moveTo(x(p.t), y(p[key]));
+                        drawing = true;
+                    }
+                    ctx.stroke();
+                };
+                line('target', 'rgba(0, 255, 255, 0.6)', 8);
+                line('midi', '#ff00ff', 3);
+
+                ctx.fillStyle = '#fff';
+                ctx.font = '16px sans-serif';
+                const label = last.note ? `${last.note}${last.cents_off !== null ? ` (${last.cents_off > 0 ? '+' : ''}${Math.round(last.cents_off)}¢)` : ''}` : '—';
+                ctx.fillText(label, 10, 22);
+            }
+            frameId = requestAnimationFrame(draw);
+        };
+        frameId = requestAnimationFrame(draw);
+        return () => cancelAnimationFrame(frameId);
+    }, [pointsRef]);
+
+    return <canvas ref={canvasRef} className="pitch-graph box-glow" width={640} height={160} />;
+};
+
+export default PitchGraph;
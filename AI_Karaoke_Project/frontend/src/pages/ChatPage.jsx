@@ -73,7 +73,7 @@ const ChatPage = () => {
                                     {msg.actionData && (
                                         <button
                                             className="action-btn"
-                                            onClick={() => navigate('/singing', { state: { autoPlaySong: msg.actionData.track } })}
+                                            onClick={() => navigate('/singing', { state: { autoPlaySong: msg.actionData.track, autoPlayData: msg.actionData } })}
                                         >
                                             <Music size={16} /> Sing "{msg.actionData.track}" Now!
                                         </button>
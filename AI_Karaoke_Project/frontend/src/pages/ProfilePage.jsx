@@ -1,9 +1,11 @@
 import React, { useState, useEffect } from 'react';
 import { User, Save } from 'lucide-react';
 import './ProfilePage.css';
+import { VIDEO_QUALITIES, VIDEO_QUALITY_KEY } from '../utils/videoQuality';
 
 const ProfilePage = () => {
     const [name, setName] = useState('');
+    const [videoQuality, setVideoQuality] = useState(() => localStorage.getItem(VIDEO_QUALITY_KEY) || 'auto');
     const [saved, setSaved] = useState(false);
 
     useEffect(() => {
@@ -14,6 +16,7 @@ const ProfilePage = () => {
     const handleSave = () => {
         if (name.trim()) {
             localStorage.setItem('karaoke_user_name', name.trim());
+            localStorage.setItem(VIDEO_QUALITY_KEY, videoQuality);
             setSaved(true);
             setTimeout(() => setSaved(false), 2000);
         }
@@ -35,6 +38,17 @@ const ProfilePage = () => {
                     />
                 </div>
 
+                <div className="input-group">
+                    <label>Video Quality</label>
+                    <select value={videoQuality} onChange={(e) => setVideoQuality(e.target.value)}>
+                        {VIDEO_QUALITIES.map((quality) => (
+                            <option key={quality} value={quality}>
+                                {quality === 'auto' ? 'Auto (by connection)' : quality === 'low' ? 'Low (480p)' : 'Original'}
+                            </option>
+                        ))}
+                    </select>
+                </div>
+
                 <button className="save-btn" onClick={handleSave}>
                     <Save size={18} />
                     Save Profile
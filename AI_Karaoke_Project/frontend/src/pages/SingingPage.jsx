@@ -1,9 +1,18 @@
-import React, { useState, useRef, useEffect } from 'react';
+import React, { useState, useRef, useEffect, useCallback } from 'react';
 import { useLocation } from 'react-router-dom';
 import axios from 'axios';
 import { Search, Play, Square, Mic, Volume2, Eye, EyeOff, Minus, Plus } from 'lucide-react';
 import './SingingPage.css';
 import LoadingOverlay from '../components/LoadingOverlay';
+import PitchGraph from '../components/PitchGraph';
+import { PITCH_HISTORY_SECONDS, startPitchStream } from '../utils/pitchStream';
+import { ChunkedUpload, recorderOptions, recordingFileName } from '../utils/chunkedUpload';
+import { pickVideoUrl } from '../utils/videoQuality';
+import { createLibrarySuggester } from '../utils/librarySearch';
+import { EMPTY_TIMELINE, lineAt, toTimeline } from '../utils/timeline';
+
+// Words sung more than this many seconds after their expected onset are marked late
+const LATE_WORD_SECONDS = 0.5;
 
 const SingingPage = ({ mode = 'casual' }) => {
     // States: 'search', 'playing', 'evaluation', 'battle_setup', 'battle_intermission', 'battle_reveal'
@@ -17,8 +26,12 @@ const SingingPage = ({ mode = 'casual' }) => {
 
     // Data
     const [query, setQuery] = useState('');
+    // Already-downloaded songs matching what's typed; activeSuggestion is the keyboard highlight
+    const [suggestions, setSuggestions] = useState([]);
+    const [activeSuggestion, setActiveSuggestion] = useState(-1);
+    const [suggest] = useState(() => createLibrarySuggester(setSuggestions));
     const [songData, setSongData] = useState(null);
-    const [lyrics, setLyrics] = useState([]);
+    const [lyrics, setLyrics] = useState(EMPTY_TIMELINE);
     const [isLoadingSong, setIsLoadingSong] = useState(false);
 
     // Playback State
@@ -65,28 +78,32 @@ const SingingPage = ({ mode = 'casual' }) => {
         fetchPersonalities();
     }, []);
 
-    const fetchAndPlaySong = async (searchQuery) => {
+    // `audio` is the play_song result, `lyricsData` its bundled lyrics
+    const startSong = useCallback((audio, lyricsData) => {
+        setSongData({
+            title: audio.track,
+            artist: "Unknown", // Backend doesn't return artist explicitly yet
+            file_path: audio.file_path,
+            is_sing_king: audio.is_sing_king
+        });
+
+        setVideoUrl(pickVideoUrl(audio));
+        setLyrics(toTimeline(lyricsData));
+        setViewState('playing');
+    }, []);
+
+    const fetchAndPlaySong = useCallback(async (searchQuery) => {
         try {
             // Reset
             setSongData(null);
-            setLyrics([]);
+            setLyrics(EMPTY_TIMELINE);
             setVideoUrl('');
 
             // Call Host Agent
             setIsLoadingSong(true);
             const res = await axios.post('/api/play_song', { query: searchQuery });
             const { audio, lyrics: lyricsData } = res.data;
-
-            setSongData({
-                title: audio.track,
-                artist: "Unknown", // Backend doesn't return artist explicitly yet
-                file_path: audio.file_path,
-                is_sing_king: audio.is_sing_king
-            });
-
-            setVideoUrl(audio.url);
-            setLyrics(lyricsData.lyrics || []);
-            setViewState('playing');
+            startSong(audio, lyricsData);
 
         } catch (err) {
             console.error(err);
@@ -94,20 +111,26 @@ const SingingPage = ({ mode = 'casual' }) => {
         } finally {
             setIsLoadingSong(false);
         }
-    };
+    }, [startSong]);
 
     // Auto-Play Effect
     useEffect(() => {
         if (location.state?.autoPlaySong) {
             const songToPlay = location.state.autoPlaySong;
+            const resolved = location.state.autoPlayData;
             setQuery(songToPlay);
             // Clear state so it doesn't loop if we go back (though react router state usually persists)
             // Ideally we'd replace history but for now just running it is fine.
-            fetchAndPlaySong(songToPlay);
+            if (resolved?.url && resolved.lyrics) {
+                // The chat already resolved the song and its lyrics
+                startSong(resolved, resolved.lyrics);
+            } else {
+                fetchAndPlaySong(songToPlay);
+            }
             // Clear the state from history to prevent replay on refresh? requires navigate replace.
             window.history.replaceState({}, document.title);
         }
-    }, [location.state]); // Depend on location.state
+    }, [location.state, startSong, fetchAndPlaySong]);
 
     const handleCreatePersona = async () => {
         if (!newPersonaName || !newPersonaDesc) {
@@ -162,10 +185,43 @@ const SingingPage = ({ mode = 'casual' }) => {
     // Search Handler
     const handleSearch = async (e) => {
         e.preventDefault();
+        if (activeSuggestion >= 0 && suggestions[activeSuggestion]) {
+            await pickSuggestion(suggestions[activeSuggestion]);
+            return;
+        }
         if (!query.trim()) return;
+        setSuggestions([]);
         await fetchAndPlaySong(query);
     };
 
+    const handleQueryChange = (e) => {
+        setQuery(e.target.value);
+        setActiveSuggestion(-1);
+        suggest(e.target.value);
+    };
+
+    // The library title resolves to the downloaded song without searching
+    const pickSuggestion = async (song) => {
+        setSuggestions([]);
+        setActiveSuggestion(-1);
+        setQuery(song.title);
+        await fetchAndPlaySong(song.title);
+    };
+
+    const handleQueryKeyDown = (e) => {
+        if (!suggestions.length) return;
+        if (e.key === 'ArrowDown') {
+            e.preventDefault();
+            setActiveSuggestion((i) => (i + 1) % suggestions.length);
+        } else if (e.key === 'ArrowUp') {
+            e.preventDefault();
+            setActiveSuggestion((i) => (i <= 0 ? suggestions.length - 1 : i - 1));
+        } else if (e.key === 'Escape') {
+            setSuggestions([]);
+            setActiveSuggestion(-1);
+        }
+    };
+
     // Video Time Update
     const onTimeUpdate = () => {
         if (videoRef.current) {
@@ -174,16 +230,8 @@ const SingingPage = ({ mode = 'casual' }) => {
     };
 
     const getActiveLineIndex = () => {
-        // Find the last line where timestamp <= currentTime + offset
-        let activeIdx = -1;
-        for (let i = 0; i < lyrics.length; i++) {
-            const time = lyrics[i].timestamp !== undefined ? lyrics[i].timestamp : lyrics[i].start_time;
-            if (time + offset <= currentTime) {
-                activeIdx = i;
-            } else {
-                break;
-            }
-        }
+        // Find the last line where timestamp <= currentTime - offset
+        const activeIdx = lineAt(lyrics, currentTime - offset);
         // Debug Log
         if (Math.random() < 0.05 || !isPlaying) { // Don't spam too much unless paused
             console.log(`[SyncDebug] Time: ${currentTime.toFixed(2)}, Offset: ${offset}, ActiveIdx: ${activeIdx}`);
@@ -227,25 +275,64 @@ const SingingPage = ({ mode = 'casual' }) => {
 
     const mediaRecorderRef = useRef(null);
     const audioChunksRef = useRef([]);
+    const uploadRef = useRef(null);
+    const pitchPointsRef = useRef([]);
+    const stopPitchRef = useRef(null);
+    // The song being played, read when recording starts (not a dependency: a new
+    // songData object mustn't restart the recording)
+    const songDataRef = useRef(null);
+    useEffect(() => {
+        songDataRef.current = songData;
+    }, [songData]);
+
+    const startLivePitch = useCallback(async (stream) => {
+        const filePath = songDataRef.current?.file_path;
+        pitchPointsRef.current = [];
+        try {
+            stopPitchRef.current = await startPitchStream({
+                stream,
+                song: filePath ? filePath.split(/[\\/]/).pop() : '',
+                getSongTime: () => (videoRef.current ? videoRef.current.currentTime : 0),
+                onPitch: (point) => {
+                    const points = pitchPointsRef.current;
+                    points.push(point);
+                    while (points.length && point.t - points[0].t > PITCH_HISTORY_SECONDS) points.shift();
+                },
+            });
+        } catch (err) {
+            // Live pitch is a nice-to-have; recording and scoring work without it
+            console.warn("Live pitch unavailable", err);
+        }
+    }, []);
 
-    const startRecording = async () => {
+    const startRecording = useCallback(async () => {
         try {
             const stream = await navigator.mediaDevices.getUserMedia({ audio: true });
-            mediaRecorderRef.current = new MediaRecorder(stream);
+            // Compressed (Opus) recording, uploaded chunk by chunk while the song plays
+            mediaRecorderRef.current = new MediaRecorder(stream, recorderOptions());
             audioChunksRef.current = [];
+            uploadRef.current = new ChunkedUpload();
 
             mediaRecorderRef.current.ondataavailable = (event) => {
-                if (event.data.size > 0) audioChunksRef.current.push(event.data);
+                if (event.data.size > 0) {
+                    audioChunksRef.current.push(event.data);
+                    uploadRef.current.push(event.data);
+                }
             };
 
             mediaRecorderRef.current.start(1000); // Collect chunks every second
+            startLivePitch(stream);
         } catch (err) {
             console.error("Mic access denied", err);
             alert("Microphone access is required for scoring!");
         }
-    };
+    }, [startLivePitch]);
 
     const stopRecording = () => {
+        if (stopPitchRef.current) {
+            stopPitchRef.current();
+            stopPitchRef.current = null;
+        }
         return new Promise((resolve) => {
             if (!mediaRecorderRef.current || mediaRecorderRef.current.state === 'inactive') {
                 resolve();
@@ -296,7 +383,7 @@ const SingingPage = ({ mode = 'casual' }) => {
                 // mediaRecorderRef.current.stop(); // Don't stop on unmount if we want to process?
             }
         };
-    }, [viewState]);
+    }, [viewState, startRecording]);
 
     const finishSong = async () => {
         if (videoRef.current) videoRef.current.pause();
@@ -306,14 +393,27 @@ const SingingPage = ({ mode = 'casual' }) => {
 
         setIsSubmitting(true);
 
-        const audioBlob = new Blob(audioChunksRef.current, { type: 'audio/wav' });
+        const mimeType = mediaRecorderRef.current?.mimeType || '';
+        const audioBlob = new Blob(audioChunksRef.current, { type: mimeType });
         console.log("Final Blob Size:", audioBlob.size);
+        // Normally all but the last chunk is already on the host
+        const uploadId = uploadRef.current ? await uploadRef.current.finish() : null;
+
+        // Use battle names if in battle mode
+        const userName = mode === 'competition'
+            ? (currentTurn === 'p1' ? battlePlayers.p1 : battlePlayers.p2)
+            : (localStorage.getItem('karaoke_user_name') || 'Anonymous');
 
         const formData = new FormData();
-        formData.append('audio_file', audioBlob, 'performance.wav');
+        if (uploadId) {
+            formData.append('upload_id', uploadId);
+        } else {
+            formData.append('audio_file', audioBlob, recordingFileName(mimeType));
+        }
         formData.append('personality', judgePersonality);
         formData.append('reference_lyrics', JSON.stringify(lyrics)); // Pass lyrics for better sync check
         formData.append('offset', offset.toString()); // Pass sync offset
+        formData.append('user_name', userName); // Indexes the take if the host archives performances
         if (songData && songData.file_path) {
             formData.append('reference_audio_path', songData.file_path);
         }
@@ -344,11 +444,6 @@ const SingingPage = ({ mode = 'casual' }) => {
             }
 
             // Save Score to Leaderboard (Always separate entries for history)
-            // Use battle names if in battle mode
-            const userName = mode === 'competition'
-                ? (currentTurn === 'p1' ? battlePlayers.p1 : battlePlayers.p2)
-                : (localStorage.getItem('karaoke_user_name') || 'Anonymous');
-
             if (score > 0) {
                 await axios.post('/api/save_score', {
                     user_name: userName,
@@ -486,10 +581,26 @@ const SingingPage = ({ mode = 'casual' }) => {
                         type="text"
                         placeholder={isLoadingSong ? "Fetching song..." : "Enter song title..."}
                         value={query}
-                        onChange={(e) => setQuery(e.target.value)}
+                        onChange={handleQueryChange}
+                        onKeyDown={handleQueryKeyDown}
                         disabled={isLoadingSong}
+                        autoComplete="off"
                     />
                     <button type="submit">GO</button>
+                    {suggestions.length > 0 && !isLoadingSong && (
+                        <ul className="search-suggestions">
+                            {suggestions.map((song, i) => (
+                                <li
+                                    key={song.id}
+                                    className={i === activeSuggestion ? 'active' : ''}
+                                    onMouseDown={(e) => { e.preventDefault(); pickSuggestion(song); }}
+                                >
+                                    <span className="suggestion-title">{song.title}</span>
+                                    <span className="suggestion-tag">Ready</span>
+                                </li>
+                            ))}
+                        </ul>
+                    )}
                 </form>
 
                 <div className="judge-toggle-container">
@@ -571,6 +682,14 @@ const SingingPage = ({ mode = 'casual' }) => {
         else if (score > 7000) grade = 'B';
         else if (score > 6000) grade = 'C';
 
+        // Onset error (s) per reference word; lyrics_diff lists reference words in the
+        // same order, plus 'extra' entries that have no reference slot.
+        const wordErrors = evaluation?.word_timing?.error || [];
+        let refWordIdx = 0;
+        const diffTiming = (evaluation?.lyrics_diff || []).map(wordObj =>
+            wordObj.status === 'extra' ? null : wordErrors[refWordIdx++] ?? null
+        );
+
         return (
             <div className="evaluation-container">
                 <h1 className="text-glow-gold">Performance Report</h1>
@@ -641,8 +760,9 @@ const SingingPage = ({ mode = 'casual' }) => {
                             {evaluation.lyrics_diff.map((wordObj, idx) => (
                                 <span
                                     key={idx}
-                                    className={`diff-word diff-${wordObj.status}`}
-                                    title={wordObj.status === 'wrong' ? `Heard: "${wordObj.heard}"` : ''}
+                                    className={`diff-word diff-${wordObj.status}${diffTiming[idx] > LATE_WORD_SECONDS ? ' diff-late' : ''}`}
+                                    title={wordObj.status === 'wrong' ? `Heard: "${wordObj.heard}"`
+                                        : diffTiming[idx] > LATE_WORD_SECONDS ? `Late by ${diffTiming[idx].toFixed(1)}s` : ''}
                                 >
                                     {wordObj.word}{' '}
                                 </span>
@@ -668,6 +788,9 @@ const SingingPage = ({ mode = 'casual' }) => {
                             <div className="legend-item">
                                 <span className="diff-word diff-extra">Extra</span>
                             </div>
+                            <div className="legend-item">
+                                <span className="diff-word diff-matched diff-late">Late</span>
+                            </div>
                         </div>
                     </div>
                 )}
@@ -701,17 +824,19 @@ const SingingPage = ({ mode = 'casual' }) => {
                 </div>
             </div>
 
+            <PitchGraph pointsRef={pitchPointsRef} />
+
             <div className="main-stage">
                 <div className="lyrics-display" ref={lyricsContainerRef}>
-                    {lyrics.length === 0 ? (
+                    {lyrics.t.length === 0 ? (
                         <p className="no-lyrics">Instrumental / No Lyrics Found</p>
                     ) : (
-                        lyrics.map((line, idx) => (
+                        lyrics.text.map((text, idx) => (
                             <p
                                 key={idx}
                                 className={`lyric-line ${idx === params.activeLineIndex ? 'active text-glow-magenta' : ''}`}
                             >
-                                {line.text}
+                                {text}
                             </p>
                         ))
                     )}
@@ -0,0 +1,84 @@
+// Uploads the performance while it is being recorded: each MediaRecorder chunk
+// is sent to /api/uploads/<id> as soon as it exists, so when the song ends only
+// the last second or so is left to send. Failed sends are retried from the
+// offset the host reports (see common/uploads.py).
+import axios from 'axios';
+
+const MAX_RETRIES = 5;
+const RETRY_DELAY_MS = 1000;
+
+// Opus at 64 kbps is ~20x smaller than 16-bit 44.1 kHz PCM and plenty for scoring
+const RECORDER_BITRATE = 64000;
+const RECORDER_MIME_TYPES = ['audio/webm;codecs=opus', 'audio/ogg;codecs=opus', 'audio/mp4'];
+
+export function recorderOptions() {
+    const mimeType = RECORDER_MIME_TYPES.find((type) => window.MediaRecorder?.isTypeSupported?.(type));
+    return mimeType ? { mimeType, audioBitsPerSecond: RECORDER_BITRATE } : {};
+}
+
+// File name for a one-shot upload of a recording with this MIME type
+export function recordingFileName(mimeType = '') {
+    if (mimeType.includes('ogg')) return 'performance.ogg';
+    if (mimeType.includes('mp4')) return 'performance.m4a';
+    if (mimeType.includes('wav')) return 'performance.wav';
+    return 'performance.webm';
+}
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+export class ChunkedUpload {
+    constructor() {
+        this.uploadId = null;
+        this.blobs = [];
+        this.sent = 0;
+        this.failed = false;
+        this.created = axios.post('/api/uploads').then((res) => {
+            this.uploadId = res.data.upload_id;
+        });
+        this.queue = Promise.resolve();
+    }
+
+    push(blob) {
+        this.blobs.push(blob);
+        // One send at a time, in order
+        this.queue = this.queue.then(() => this.flush()).catch((err) => {
+            console.warn('Chunked upload failed; the recording will be sent in one piece', err);
+            this.failed = true;
+        });
+    }
+
+    async flush() {
+        if (this.failed) return;
+        await this.created;
+        const recording = new Blob(this.blobs);
+        let retries = 0;
+        while (this.sent < recording.size) {
+            try {
+                const res = await axios.put(`/api/uploads/${this.uploadId}?offset=${this.sent}`,
+                    recording.slice(this.sent), { headers: { 'Content-Type': 'application/octet-stream' } });
+                this.sent = res.data.received;
+            } catch (err) {
+                if (err.response?.status === 409) {
+                    // The host has a different amount than we think: continue from there
+                    this.sent = err.response.data.received;
+                } else if (++retries > MAX_RETRIES) {
+                    throw err;
+                } else {
+                    await sleep(RETRY_DELAY_MS * retries);
+                }
+            }
+        }
+    }
+
+    // Resolves to the upload id once everything is on the host, or null if the upload failed
+    async finish() {
+        await this.queue;
+        if (this.failed) return null;
+        try {
+            await this.created;
+        } catch {
+            return null;
+        }
+        return this.uploadId;
+    }
+}
@@ -0,0 +1,29 @@
+// Autocomplete from songs that are already downloaded (GET /api/library/search,
+// see common/song_index.py). A song picked here plays without a YouTube search.
+import axios from 'axios';
+
+const DEBOUNCE_MS = 80;
+export const MAX_SUGGESTIONS = 6;
+
+// Returns suggest(query): looks the query up after a short pause in typing and
+// calls onResults with the matches. Responses to older queries are dropped.
+export function createLibrarySuggester(onResults) {
+    let timer = null;
+    let latest = 0;
+    return (query) => {
+        clearTimeout(timer);
+        const id = ++latest;
+        if (!query.trim()) {
+            onResults([]);
+            return;
+        }
+        timer = setTimeout(async () => {
+            try {
+                const res = await axios.get('/api/library/search', { params: { q: query, limit: MAX_SUGGESTIONS } });
+                if (id === latest) onResults(res.data.results || []);
+            } catch {
+                if (id === latest) onResults([]);
+            }
+        }, DEBOUNCE_MS);
+    };
+}
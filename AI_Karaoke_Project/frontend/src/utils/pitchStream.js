@@ -0,0 +1,67 @@
+// Streams microphone audio to the host's /ws/pitch endpoint for live pitch feedback.
+// Each message: float64 song position (s, little-endian) + float32 mono samples.
+
+const CHUNK_SIZE = 1024; // samples per message (~21 ms at 48 kHz)
+
+// How much pitch history the live graph keeps (seconds)
+export const PITCH_HISTORY_SECONDS = 6;
+
+// AudioWorklet that cuts the mic stream into fixed-size chunks
+const WORKLET_SOURCE = `
+class ChunkProcessor extends AudioWorkletProcessor {
+    constructor() {
+        super();
+        this.buffer = new Float32Array(${CHUNK_SIZE});
+        this.filled = 0;
+    }
+    process(inputs) {
+        const channel = inputs[0][0];
+        if (channel) {
+            for (let i = 0; i < channel.length; i++) {
+                this.buffer[this.filled++] = channel[i];
+                if (this.filled === this.buffer.length) {
+                    this.port.postMessage(this.buffer.slice(0));
+                    this.filled = 0;
+                }
+            }
+        }
+        return true;
+    }
+}
+registerProcessor('chunk-processor', ChunkProcessor);
+`;
+
+export async function startPitchStream({ stream, song, getSongTime, onPitch }) {
+    const ctx = new AudioContext();
+    const moduleUrl = URL.createObjectURL(new Blob([WORKLET_SOURCE], { type: 'application/javascript' }));
+    await ctx.audioWorklet.addModule(moduleUrl);
+    URL.revokeObjectURL(moduleUrl);
+
+    const source = ctx.createMediaStreamSource(stream);
+    const node = new AudioWorkletNode(ctx, 'chunk-processor');
+    source.connect(node);
+
+    const protocol = window.location.protocol === 'https:' ? 'wss' : 'ws';
+    const params = new URLSearchParams({ song: song || '', sample_rate: String(ctx.sampleRate) });
+    const ws = new WebSocket(`${protocol}://${window.location.host}/ws/pitch?${params}`);
+    ws.onmessage = (event) => onPitch(JSON.parse(event.data));
+
+    node.port.onmessage = (event) => {
+        if (ws.readyState !== WebSocket.OPEN) return;
+        // Drop chunks rather than queueing them if the connection falls behind
+        if (ws.bufferedAmount > CHUNK_SIZE * 4 * 8) return;
+        const samples = event.data;
+        const message = new ArrayBuffer(8 + samples.byteLength);
+        new DataView(message).setFloat64(0, getSongTime(), true);
+        new Float32Array(message, 8).set(samples);
+        ws.send(message);
+    };
+
+    return () => {
+        node.port.onmessage = null;
+        source.disconnect();
+        node.disconnect();
+        ws.close();
+        ctx.close();
+    };
+}
@@ -0,0 +1,27 @@
+// Compact lyric timeline, as returned by the Lyrics Agent (see common/timeline.py):
+// {t: [line starts], end: [line ends], text: [lines], words?: [[word onsets] | null]}.
+
+export const EMPTY_TIMELINE = { t: [], end: [], text: [] };
+
+// Timeline from a lyrics result: {timeline} or the older {lyrics: [{timestamp, text}]}
+export function toTimeline(lyricsData) {
+    if (lyricsData?.timeline?.t) return lyricsData.timeline;
+    const lines = [...(lyricsData?.lyrics || [])]
+        .map((line) => ({ t: line.timestamp ?? line.start_time ?? 0, text: line.text || '' }))
+        .sort((a, b) => a.t - b.t);
+    if (!lines.length) return EMPTY_TIMELINE;
+    const t = lines.map((line) => line.t);
+    return { t, end: [...t.slice(1), t[t.length - 1] + 5], text: lines.map((line) => line.text) };
+}
+
+// Index of the last line started at `time`, or -1 before the first: O(log n) per timeupdate
+export function lineAt(timeline, time) {
+    let lo = 0;
+    let hi = timeline.t.length;
+    while (lo < hi) {
+        const mid = (lo + hi) >> 1;
+        if (timeline.t[mid] <= time) lo = mid + 1;
+        else hi = mid;
+    }
+    return lo - 1;
+}
@@ -0,0 +1,23 @@
+// Chooses which rendition of a song video to play (play_song returns
+// `renditions`: {original: url, low: url, ...}; lower ones only once transcoded).
+
+export const VIDEO_QUALITY_KEY = 'karaoke_video_quality';
+export const VIDEO_QUALITIES = ['auto', 'original', 'low'];
+
+// Below this estimated bandwidth (Mbit/s) 'auto' prefers the low rendition
+const LOW_BANDWIDTH_MBPS = 4;
+
+function isSlowConnection() {
+    const connection = navigator.connection;
+    if (!connection) return false;
+    return connection.saveData
+        || ['slow-2g', '2g', '3g'].includes(connection.effectiveType)
+        || (connection.downlink > 0 && connection.downlink < LOW_BANDWIDTH_MBPS);
+}
+
+export function pickVideoUrl(audio) {
+    const renditions = audio.renditions || {};
+    const preference = localStorage.getItem(VIDEO_QUALITY_KEY) || 'auto';
+    if (preference !== 'auto') return renditions[preference] || audio.url;
+    return (isSlowConnection() && renditions.low) || audio.url;
+}
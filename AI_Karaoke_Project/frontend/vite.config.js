@@ -1,6 +1,9 @@
 import { defineConfig } from 'vite'
 import react from '@vitejs/plugin-react'
 
+// Song media can be served by a separate process (host_agent/media_server.py)
+const mediaTarget = process.env.KARAOKE_MEDIA_TARGET || 'http://localhost:8000'
+
 // https://vite.dev/config/
 export default defineConfig({
   plugins: [react()],
@@ -12,9 +15,14 @@ export default defineConfig({
         secure: false,
       },
       '/songs': {
-        target: 'http://localhost:8000',
+        target: mediaTarget,
         changeOrigin: true,
         secure: false,
+      },
+      '/ws': {
+        target: 'ws://localhost:8000',
+        ws: true,
+        changeOrigin: true,
       }
     }
   }
@@ -3,7 +3,9 @@ import logging
 import os
 import json
 import sys
+import time
 from contextlib import AsyncExitStack
+from datetime import datetime
 from typing import Optional
 from pathlib import Path
 from dotenv import load_dotenv
@@ -11,6 +13,21 @@ from openai import AsyncOpenAI
 from mcp import ClientSession, StdioServerParameters
 from mcp.client.stdio import stdio_client
 
+# Make the shared `common` package importable when run as a script
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common import tracing
+from common.archive import PerformanceArchive
+from common.audio_buffer import SharedAudio, decode_audio, sniff_suffix
+from common.media import create_media_app
+from common.melody import load_melody, melody_path
+from common.metrics import Registry, split_timing
+from common.pitch_tracker import MAX_SAMPLE_RATE, MIN_SAMPLE_RATE, PitchTracker, parse_chunk
+from common.song_index import LibrarySearch
+from common.song_library import load_lyrics, normalize_query, save_lyrics
+from common.timeline import as_timeline
+from common.startup_profile import start_background_warmup
+from common.uploads import UploadOffsetError, UploadStore, UploadTooLargeError
+
 # Load environment variables
 env_path = Path(__file__).parent.parent / ".env"
 load_dotenv(dotenv_path=env_path)
@@ -19,6 +36,69 @@ load_dotenv(dotenv_path=env_path)
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("AgenticHost")
 
+tracing.configure("host")
+
+# Hand uploads to the evaluator as a decoded shared-memory buffer instead of a
+# temp file path (set KARAOKE_SHARED_AUDIO=0 to fall back to file handoff)
+SHARED_AUDIO_ENABLED = os.getenv("KARAOKE_SHARED_AUDIO", "1") != "0"
+
+# Keep every scored performance (compressed audio + evaluation) under this
+# directory; unset = don't archive. Oldest takes are dropped past the size limit.
+ARCHIVE_DIR = os.getenv("KARAOKE_ARCHIVE_DIR")
+ARCHIVE_MAX_MB = float(os.getenv("KARAOKE_ARCHIVE_MAX_MB", "2048"))
+ARCHIVE_FORMAT = os.getenv("KARAOKE_ARCHIVE_FORMAT", "opus")
+
+# Serve /songs from this process (set 0 when host_agent/media_server.py or a proxy
+# serves them); KARAOKE_MEDIA_ACCEL=nginx|sendfile hands transfers to the proxy
+SERVE_MEDIA = os.getenv("KARAOKE_SERVE_MEDIA", "1") != "0"
+MEDIA_ACCEL = os.getenv("KARAOKE_MEDIA_ACCEL") or None
+
+# Chunked uploads: cap per recording and how long an idle upload is kept
+UPLOAD_MAX_MB = float(os.getenv("KARAOKE_UPLOAD_MAX_MB", "200"))
+UPLOAD_TTL_SECONDS = int(os.getenv("KARAOKE_UPLOAD_TTL", "3600"))
+# If play_song hasn't answered after this many seconds it is downloading; start the lyrics search meanwhile
+LYRICS_PREFETCH_AFTER = float(os.getenv("KARAOKE_LYRICS_PREFETCH_AFTER", "0.3"))
+
+# === METRICS (exposed at /metrics) ===
+METRICS = Registry()
+TOOL_LATENCY = METRICS.histogram(
+    "karaoke_tool_latency_seconds", "Host-side round trip of MCP tool calls.", ("agent", "tool"))
+AGENT_TOOL_LATENCY = METRICS.histogram(
+    "karaoke_agent_tool_seconds", "Tool execution time reported by the agent.", ("agent", "tool"))
+STAGE_LATENCY = METRICS.histogram(
+    "karaoke_stage_seconds", "Per-stage time inside agent tools (load, yin, chroma, dtw, stt, ...).",
+    ("agent", "tool", "stage"))
+TOOL_ERRORS = METRICS.counter(
+    "karaoke_tool_errors_total", "MCP tool calls that raised or were blocked.", ("tool", "reason"))
+TOOL_INFLIGHT = METRICS.gauge(
+    "karaoke_tool_inflight", "Tool calls waiting on or running in each agent (queue depth).", ("agent",))
+CACHE_HITS = METRICS.counter(
+    "karaoke_cache_hits_total", "Cache hits reported by agents.", ("agent", "cache"))
+CACHE_MISSES = METRICS.counter(
+    "karaoke_cache_misses_total", "Cache misses reported by agents.", ("agent", "cache"))
+HTTP_LATENCY = METRICS.histogram(
+    "karaoke_http_request_seconds", "API request latency by route.", ("method", "route", "status"))
+PITCH_FRAME_LATENCY = METRICS.histogram(
+    "karaoke_pitch_frame_seconds", "Server-side time to track one live pitch chunk.",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1))
+
+def record_agent_timing(agent: str, timing: dict):
+    """Feeds the `_timing` envelope returned by an instrumented agent tool into the metrics."""
+    tool = timing.get("tool", "unknown")
+    AGENT_TOOL_LATENCY.observe(timing.get("duration_ms", 0.0) / 1000.0, agent=agent, tool=tool)
+    for stage_name, ms in (timing.get("stages_ms") or {}).items():
+        STAGE_LATENCY.observe(ms / 1000.0, agent=agent, tool=tool, stage=stage_name)
+    for cache_name, stats in (timing.get("caches") or {}).items():
+        CACHE_HITS.set_total(stats.get("hits", 0), agent=agent, cache=cache_name)
+        CACHE_MISSES.set_total(stats.get("misses", 0), agent=agent, cache=cache_name)
+
+def discard_task(task):
+    """Cancels a task whose result is no longer wanted, without 'exception was never retrieved' noise."""
+    if task is None:
+        return
+    task.cancel()
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
 class KaraokeHost:
     def __init__(self):
         self.api_key = os.getenv("OPENAI_API_KEY")
@@ -32,14 +112,20 @@ class KaraokeHost:
         self.sessions = {}
         self.tools = []
         self.tool_map = {}
+        self.traced_tools = set()
         self.security_policy = SecurityPolicy()
+        # song file name -> running lyrics lookup, so concurrent plays of a song share one
+        self._lyrics_lookups = {}
 
     async def connect_to_server(self, name: str, script_path: str):
         """Connects to an MCP server running as a python script."""
+        t0 = time.perf_counter()
+        env = os.environ.copy()
+        env["KARAOKE_SERVICE_NAME"] = f"{name}-agent"
         server_params = StdioServerParameters(
             command=sys.executable,
             args=[script_path],
-            env=os.environ.copy()
+            env=env
         )
         
         transport = await self.exit_stack.enter_async_context(stdio_client(server_params))
@@ -51,17 +137,23 @@ class KaraokeHost:
         # List tools
         tools_result = await session.list_tools()
         for tool in tools_result.tools:
+            # `traceparent` is filled in by the host, not something the LLM should see
+            parameters = dict(tool.inputSchema)
+            properties = dict(parameters.get("properties", {}))
+            if properties.pop(tracing.TRACEPARENT_ARG, None) is not None:
+                self.traced_tools.add(tool.name)
+            parameters["properties"] = properties
             self.tools.append({
                 "type": "function",
                 "function": {
                     "name": tool.name,
                     "description": tool.description,
-                    "parameters": tool.inputSchema
+                    "parameters": parameters
                 }
             })
             self.tool_map[tool.name] = name
         
-        logger.info(f"Connected to {name} MCP Server. Found tools: {[t.name for t in tools_result.tools]}")
+        logger.info(f"Connected to {name} MCP Server in {time.perf_counter() - t0:.2f}s. Found tools: {[t.name for t in tools_result.tools]}")
 
     async def start(self):
         """Starts connections to all agents."""
@@ -86,7 +178,7 @@ class KaraokeHost:
             return "Error: OpenAI API key not configured.", None
 
         messages = [
-            {"role": "system", "content": "You are the AI Karaoke Host. You help users pick songs, play them, and get evaluated. Use the available tools to fulfill the user's request. Always be enthusiastic! \n\nRULES:\n1. When a user asks to sing a song, you MUST use the 'play_song' tool immediately.\n2. If a user asks to create a new judge personality (e.g. 'create a gangster judge'), use the 'create_persona' tool. Ask for a description if not provided.\n3. Do not just say you will do it, actually call the tool."}
+            {"role": "system", "content": "You are the AI Karaoke Host. You help users pick songs, play them, and get evaluated. Use the available tools to fulfill the user's request. Always be enthusiastic! \n\nRULES:\n1. When a user asks to sing a song, you MUST use the 'play_song' tool immediately.\n2. If a user asks to create a new judge personality (e.g. 'create a gangster judge'), use the 'create_persona' tool. Ask for a description if not provided.\n3. If a user asks which songs are available or can't remember a title, use the 'search_library' tool to suggest songs that are already downloaded.\n4. Do not just say you will do it, actually call the tool."}
         ]
         
         if history:
@@ -98,12 +190,13 @@ class KaraokeHost:
         messages.append({"role": "user", "content": user_input})
 
         # 1. Call LLM with tools
-        response = await self.client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=messages,
-            tools=self.tools,
-            tool_choice="auto"
-        )
+        with tracing.start_span("llm:host_chat", kind="CLIENT"):
+            response = await self.client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=messages,
+                tools=self.tools,
+                tool_choice="auto"
+            )
 
         response_message = response.choices[0].message
         tool_calls = response_message.tool_calls
@@ -124,9 +217,7 @@ class KaraokeHost:
                 
                 if session_name and session_name in self.sessions:
                     try:
-                        session = self.sessions[session_name]
-                        result = await session.call_tool(function_name, arguments=function_args)
-                        tool_result = result.content[0].text
+                        tool_result = await self._call_agent(session_name, function_name, function_args)
                     except Exception as e:
                         tool_result = f"Error calling tool: {e}"
                 else:
@@ -146,6 +237,8 @@ class KaraokeHost:
                         try:
                             data = json.loads(tool_result)
                             if "url" in data:
+                                # Bundle the lyrics so the singing page starts without another lookup
+                                data["lyrics"] = await self.song_lyrics(data, function_args.get("query", ""))
                                 action = {"type": "play_audio", "payload": data}
                         except Exception as e:
                             logger.error(f"Failed to parse play_song result for action: {e}")
@@ -159,34 +252,150 @@ class KaraokeHost:
                     })
 
             # 2. Get final response
-            final_response = await self.client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=messages
-            )
+            with tracing.start_span("llm:host_chat_final", kind="CLIENT"):
+                final_response = await self.client.chat.completions.create(
+                    model="gpt-4o-mini",
+                    messages=messages
+                )
             return final_response.choices[0].message.content, action
         
         return response_message.content, None
 
+    async def play_song_with_lyrics(self, query: str):
+        """
+        Calls play_song and returns (audio_data, lyrics_data), or (None, None) if the
+        audio agent returned nothing. Lyrics come from the song's stored file when it
+        has one. For a song that has to be downloaded, a search for the query runs
+        during the download (the fallback if the title finds nothing).
+        """
+        audio_task = asyncio.create_task(self.call_tool("play_song", {"query": query}))
+        prefetch = None
+        done, _ = await asyncio.wait({audio_task}, timeout=LYRICS_PREFETCH_AFTER)
+        if not done:
+            prefetch = asyncio.create_task(self.call_tool("search_lyrics", {"query": query}))
+
+        try:
+            audio_result_str = await audio_task
+        except BaseException:
+            discard_task(prefetch)
+            raise
+        if not audio_result_str:
+            discard_task(prefetch)
+            return None, None
+        try:
+            audio_data = json.loads(audio_result_str)
+        except json.JSONDecodeError:
+            # Fallback if it returns raw string url or something (unlikely if consistent)
+            audio_data = {"url": audio_result_str, "track": query, "status": "unknown"}
+        return audio_data, await self.song_lyrics(audio_data, query, prefetch)
+
+    async def song_lyrics(self, audio_data: dict, query: str, prefetch=None) -> dict:
+        """
+        Lyrics for the song play_song resolved, searched by its title (`track`), then by `query`.
+        The first lookup is stored next to the song file (see common.song_library), so
+        each song is searched once. `prefetch` is an already running search_lyrics call
+        for `query`; it is cancelled if its answer isn't needed.
+        """
+        file_path = audio_data.get("file_path")
+        if not file_path:
+            return await self._lookup_lyrics(audio_data.get("track"), query, None, prefetch)
+
+        # Path(...).name keeps the lookup inside SONGS_DIR
+        song_path = SONGS_DIR / Path(file_path).name
+        stored = await asyncio.to_thread(load_lyrics, song_path)
+        (CACHE_HITS if stored is not None else CACHE_MISSES).inc(agent="host", cache="song_lyrics")
+        if stored is not None:
+            discard_task(prefetch)
+            return stored
+
+        task = self._lyrics_lookups.get(song_path.name)
+        if task is None:
+            task = asyncio.create_task(self._lookup_lyrics(audio_data.get("track"), query, song_path, prefetch))
+            self._lyrics_lookups[song_path.name] = task
+            task.add_done_callback(lambda _: self._lyrics_lookups.pop(song_path.name, None))
+        else:
+            # Another request is already looking this song up
+            discard_task(prefetch)
+        return await asyncio.shield(task)
+
+    async def _search_lyrics(self, search) -> dict:
+        """Parsed search_lyrics result for a query, or for an already running call; {} if empty."""
+        if isinstance(search, str):
+            search = self.call_tool("search_lyrics", {"query": search})
+        result_str = await search
+        if not result_str:
+            return {}
+        try:
+            lyrics = json.loads(result_str)
+        except json.JSONDecodeError:
+            return {"error": "Invalid lyrics json"}
+        return lyrics
+
+    async def _lookup_lyrics(self, title, query: str, song_path, prefetch=None) -> dict:
+        # 1. The resolved title names the song better than what was typed ("hello" -> "Adele - Hello")
+        fallback = prefetch or query
+        title_query = normalize_query(title)
+        lyrics = {}
+        if title_query and title_query != normalize_query(query):
+            try:
+                lyrics = await self._search_lyrics(title_query)
+            except BaseException:
+                discard_task(prefetch)
+                raise
+        # 2. Then the query itself
+        if as_timeline(lyrics) and not lyrics.get("error"):
+            discard_task(prefetch)
+        else:
+            lyrics = await self._search_lyrics(fallback)
+        # Misses aren't stored: a later play searches again
+        if song_path is not None and as_timeline(lyrics) and not lyrics.get("error"):
+            await asyncio.to_thread(save_lyrics, song_path, lyrics)
+        return lyrics
+
+    async def _call_agent(self, session_name: str, tool_name: str, args: dict) -> str:
+        """Calls a tool on an agent session, recording latency, queue depth and agent timings."""
+        session = self.sessions[session_name]
+        TOOL_INFLIGHT.inc(agent=session_name)
+        t0 = time.perf_counter()
+        try:
+            with tracing.start_span(f"mcp:{tool_name}", kind="CLIENT", agent=session_name) as span:
+                if tool_name in self.traced_tools:
+                    args = {**args, tracing.TRACEPARENT_ARG: span.traceparent}
+                result = await session.call_tool(tool_name, arguments=args)
+        except Exception:
+            TOOL_ERRORS.inc(tool=tool_name, reason="exception")
+            raise
+        finally:
+            TOOL_INFLIGHT.dec(agent=session_name)
+            TOOL_LATENCY.observe(time.perf_counter() - t0, agent=session_name, tool=tool_name)
+
+        text, timing = split_timing(result.content[0].text)
+        if timing:
+            record_agent_timing(session_name, timing)
+            logger.info(f"{tool_name} took {timing.get('duration_ms')}ms in {session_name} "
+                        f"(host round trip {(time.perf_counter() - t0) * 1000:.0f}ms) stages={timing.get('stages_ms')}")
+        return text
+
     async def call_tool(self, tool_name: str, args: dict):
         """Calls a specific tool on the connected agents."""
         
         # --- SECURITY CHECK ---
         if not self.security_policy.is_allowed(tool_name, args):
              logger.warning(f"SECURITY BLOCKED: Tool '{tool_name}' blocked by policy.")
+             TOOL_ERRORS.inc(tool=tool_name, reason="blocked")
              return "Error: Security Policy Violation. Action blocked."
         # ----------------------
 
         session_name = self.tool_map.get(tool_name)
         if session_name and session_name in self.sessions:
             try:
-                session = self.sessions[session_name]
-                result = await session.call_tool(tool_name, arguments=args)
-                return result.content[0].text
+                return await self._call_agent(session_name, tool_name, args)
             except Exception as e:
                 logger.error(f"Error calling tool {tool_name}: {e}")
                 pass
         else:
             logger.error(f"Tool {tool_name} not found in map or session not connected.")
+            TOOL_ERRORS.inc(tool=tool_name, reason="not_found")
         return None
 
     async def cleanup(self):
@@ -202,6 +411,7 @@ class SecurityPolicy:
         self.allowed_tools = {
             "play_song",
             "stop_song",
+            "search_library",
             "search_lyrics",
             "evaluate_singing",
             "evaluate_performance",
@@ -228,11 +438,10 @@ class SecurityPolicy:
                      
         return True
 
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, WebSocket, WebSocketDisconnect
 from pydantic import BaseModel
-from fastapi.staticfiles import StaticFiles
 from fastapi.requests import Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse
 
 # ... (Previous imports remain, ensure they are there)
 
@@ -245,7 +454,12 @@ BASE_DIR = Path(__file__).parent
 SONGS_DIR = Path(__file__).parent.parent / "audio_playback_agent" / "songs"
 if not SONGS_DIR.exists():
     SONGS_DIR.mkdir(parents=True, exist_ok=True)
-app.mount("/songs", StaticFiles(directory=SONGS_DIR), name="songs")
+if SERVE_MEDIA:
+    # Range requests, strong ETags and immutable caching (see common.media)
+    app.mount("/songs", create_media_app(SONGS_DIR, accel=MEDIA_ACCEL), name="songs")
+
+# Autocomplete reads the Audio Agent's library.json directly: no MCP round trip per keystroke
+library_search = LibrarySearch(SONGS_DIR)
 
 class ChatRequest(BaseModel):
     message: str
@@ -282,12 +496,23 @@ def save_leaderboard(data):
 
 # Global Host Instance
 host_agent = None
+performance_archive = None
+upload_store = UploadStore(ttl=UPLOAD_TTL_SECONDS, max_bytes=int(UPLOAD_MAX_MB * 1024 * 1024))
 
 @app.on_event("startup")
 async def startup_event():
-    global host_agent
+    global host_agent, performance_archive
     host_agent = KaraokeHost()
     await host_agent.start()
+    if ARCHIVE_DIR:
+        performance_archive = PerformanceArchive(ARCHIVE_DIR, ARCHIVE_MAX_MB * 1024 * 1024, ARCHIVE_FORMAT)
+        logger.info(f"Archiving performances to {ARCHIVE_DIR} ({ARCHIVE_FORMAT}, max {ARCHIVE_MAX_MB:.0f} MB)")
+    # Library autocomplete needs numpy and rapidfuzz and a built index; prepare both off the request path
+    warmup_modules = ["numpy", "rapidfuzz.fuzz"]
+    if SHARED_AUDIO_ENABLED or performance_archive:
+        # Upload decoding / archive encoding need librosa in the host process
+        warmup_modules += ["librosa", "soundfile"]
+    start_background_warmup(warmup_modules, callback=library_search.index)
     logger.info("Agentic Host started and connected.")
 
 @app.on_event("shutdown")
@@ -295,6 +520,30 @@ async def shutdown_event():
     global host_agent
     if host_agent:
         await host_agent.cleanup()
+    if performance_archive:
+        # Let queued archive writes finish
+        await asyncio.to_thread(performance_archive.close)
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    t0 = time.perf_counter()
+    # Root span of the request's trace (continues an incoming traceparent header if any)
+    with tracing.start_span(f"{request.method} {request.url.path}", kind="SERVER",
+                            traceparent=request.headers.get("traceparent")) as span:
+        response = await call_next(request)
+        span.set_tag("http.status_code", response.status_code)
+    # Label by route template (not raw path) to keep cardinality bounded
+    route = request.scope.get("route")
+    route_path = getattr(route, "path", None) or ("/songs" if request.url.path.startswith("/songs") else "other")
+    HTTP_LATENCY.observe(time.perf_counter() - t0, method=request.method, route=route_path,
+                         status=response.status_code)
+    response.headers["X-Trace-Id"] = span.trace_id
+    return response
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus text exposition of host and agent latency metrics."""
+    return PlainTextResponse(METRICS.render_prometheus(), media_type="text/plain; version=0.0.4")
 
 @app.get("/")
 async def read_root():
@@ -312,10 +561,17 @@ async def chat(request: ChatRequest):
     return ChatResponse(response=response_text, action=action)
 
 @app.get("/api/lyrics")
-async def get_lyrics(query: str):
+async def get_lyrics(query: str, song: str = ""):
+    """Lyrics for a query; with `song` (a play_song file name) the song's stored lyrics are used."""
     if not host_agent:
         raise HTTPException(status_code=503, detail="Host not initialized")
-    
+
+    if song:
+        result = await host_agent.song_lyrics({"file_path": song}, query)
+        if not result:
+            raise HTTPException(status_code=404, detail="Lyrics not found")
+        return result
+
     # Call the lyrics tool
     # The tool name is 'search_lyrics' (defined in lyrics_display_agent/mcp_server.py)
     result_json = await host_agent.call_tool("search_lyrics", {"query": query})
@@ -351,27 +607,10 @@ async def play_song(request: SongRequest):
     logger.info(f"MCP Host received play request for: {query}")
 
     try:
-        # 1. Call Audio Agent via MCP
-        # Ensure tool name matches what audio mcp server exposes: 'play_song'
-        # The logs showed available tools: ['play_song', 'stop_song']
-        audio_result_str = await host_agent.call_tool("play_song", {"query": query})
-        if not audio_result_str:
+        # Audio Agent via MCP, plus the song's lyrics (stored after the first lookup)
+        audio_data, lyrics_data = await host_agent.play_song_with_lyrics(query)
+        if audio_data is None:
              raise HTTPException(status_code=500, detail="Audio agent returned no data")
-        
-        try:
-             audio_data = json.loads(audio_result_str)
-        except json.JSONDecodeError:
-             # Fallback if it returns raw string url or something (unlikely if consistent)
-             audio_data = {"url": audio_result_str, "track": query, "status": "unknown"}
-
-        # 2. Call Lyrics Agent via MCP
-        lyrics_result_str = await host_agent.call_tool("search_lyrics", {"query": query})
-        lyrics_data = {}
-        if lyrics_result_str:
-            try:
-                lyrics_data = json.loads(lyrics_result_str)
-            except json.JSONDecodeError:
-                lyrics_data = {"lyrics": [], "error": "Invalid lyrics json"}
 
         return {
             "status": "success",
@@ -379,10 +618,58 @@ async def play_song(request: SongRequest):
             "lyrics": lyrics_data
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error in play_song: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.websocket("/ws/pitch")
+async def pitch_stream(websocket: WebSocket, song: str = "", sample_rate: int = 48000):
+    """
+    Live pitch feedback while singing. Query: ?song=<song file name>&sample_rate=<mic rate>.
+    Each binary message is one mic chunk (see common.pitch_tracker.parse_chunk);
+    each reply is {"t", "f0", "midi", "note", "target", "cents_off"}.
+    Malformed messages are skipped.
+    """
+    await websocket.accept()
+    if not MIN_SAMPLE_RATE <= sample_rate <= MAX_SAMPLE_RATE:
+        # 1008 = policy violation
+        await websocket.close(code=1008, reason=f"sample_rate must be {MIN_SAMPLE_RATE}-{MAX_SAMPLE_RATE}")
+        return
+    melody = None
+    if song:
+        # Path(...).name keeps the lookup inside SONGS_DIR
+        melody = await asyncio.to_thread(load_melody, melody_path(SONGS_DIR / Path(song).name))
+    logger.info(f"Pitch stream opened (song={song or '-'}, sr={sample_rate}, melody={'yes' if melody else 'no'})")
+    tracker = PitchTracker(sample_rate, melody=melody)
+    bad_chunks = 0
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            t0 = time.perf_counter()
+            try:
+                song_time, samples = parse_chunk(message.get("bytes") or b"")
+            except ValueError as e:
+                if not bad_chunks:
+                    logger.warning(f"Skipping malformed pitch chunks: {e}")
+                bad_chunks += 1
+                continue
+            result = tracker.push(samples, song_time)
+            PITCH_FRAME_LATENCY.observe(time.perf_counter() - t0)
+            await websocket.send_json(result)
+    except WebSocketDisconnect:
+        pass
+    logger.info(f"Pitch stream closed ({bad_chunks} malformed chunks skipped)")
+
+@app.get("/api/library/search")
+async def search_library(q: str = "", limit: int = 8):
+    """Already-downloaded songs matching a partial or misspelled title (see common.song_index)."""
+    limit = max(1, min(limit, 25))
+    return {"query": q, "results": library_search.search(q, limit)}
+
 @app.post("/api/stop_song")
 async def stop_song():
     if not host_agent:
@@ -392,28 +679,108 @@ async def stop_song():
     await host_agent.call_tool("stop_song", {})
     return {"status": "stopped"}
 
+def _upload_session(upload_id: str):
+    session = upload_store.get(upload_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Upload not found (expired or already submitted)")
+    return session
+
+@app.post("/api/uploads")
+async def create_upload():
+    """Starts a chunked recording upload (see common.uploads)."""
+    session = upload_store.create()
+    return {"upload_id": session.id, "received": 0}
+
+@app.get("/api/uploads/{upload_id}")
+async def upload_status(upload_id: str):
+    """How many bytes have arrived, i.e. where a resumed upload continues."""
+    return {"upload_id": upload_id, "received": _upload_session(upload_id).received}
+
+@app.put("/api/uploads/{upload_id}")
+async def upload_chunk(upload_id: str, request: Request, offset: int = 0):
+    """Appends the request body at byte `offset`; 409 with the received count if that's not where the upload is."""
+    session = _upload_session(upload_id)
+    data = await request.body()
+    try:
+        received = await asyncio.to_thread(session.append, offset, data)
+    except UploadOffsetError as e:
+        return JSONResponse(status_code=409, content={"upload_id": upload_id, "received": e.received})
+    except UploadTooLargeError as e:
+        upload_store.pop(upload_id)
+        await asyncio.to_thread(session.discard)
+        raise HTTPException(status_code=413, detail=str(e))
+    return {"upload_id": upload_id, "received": received}
+
 @app.post("/api/submit_performance")
 async def submit_performance(
-    audio_file: UploadFile = File(...),
+    audio_file: UploadFile = File(None),
     personality: str = Form(...),
     reference_lyrics: str = Form(None),
     reference_audio_path: str = Form(None),
-    offset: float = Form(0.0)
+    offset: float = Form(0.0),
+    user_name: str = Form(None),
+    upload_id: str = Form(None)
 ):
+    """The recording is either `audio_file` or a finished chunked upload (`upload_id`)."""
     if not host_agent:
         raise HTTPException(status_code=503, detail="Host not initialized")
+    upload = None
+    if upload_id:
+        upload = upload_store.pop(upload_id)
+        if upload is None:
+            raise HTTPException(status_code=404, detail="Upload not found (expired or already submitted)")
+        if upload.spool_path is None:
+            # Nothing to evaluate or judge (the microphone never delivered a chunk)
+            await asyncio.to_thread(upload.discard)
+            raise HTTPException(status_code=400, detail="Upload is empty")
+    elif audio_file is None:
+        raise HTTPException(status_code=400, detail="Send audio_file or upload_id")
     
-    # 1. Save audio to temp file
+    # 1. Decode the upload once into shared memory (fallback: save to temp file)
     import tempfile
-    import shutil
     
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp:
-        shutil.copyfileobj(audio_file.file, tmp)
-        tmp_path = tmp.name
+    audio_bytes = await audio_file.read() if upload is None else None
+    if upload is None and not audio_bytes:
+        raise HTTPException(status_code=400, detail="audio_file is empty")
+    shared_audio = None
+    tmp_path = None
+    # What the archive gets: the decoded samples if we have them, else the upload itself
+    archive_audio = audio_bytes
+    if SHARED_AUDIO_ENABLED:
+        try:
+            with tracing.start_span("decode_upload"):
+                if upload is not None:
+                    # Mostly decoded already, while the chunks were arriving
+                    y, sr = await asyncio.to_thread(upload.finish)
+                else:
+                    y, sr = await asyncio.to_thread(decode_audio, audio_bytes)
+            shared_audio = SharedAudio(y, sr)
+            archive_audio = (y, sr)
+            del y
+        except Exception as e:
+            logger.warning(f"Shared audio handoff unavailable, using temp file: {e}")
+
+    if shared_audio is None:
+        if upload is not None:
+            # The spooled upload already is a file with the right suffix
+            tmp_path = upload.spool_path
+            if performance_archive is not None:
+                archive_audio = await asyncio.to_thread(upload.read_bytes)
+        else:
+            with tracing.start_span("upload_to_disk"), tempfile.NamedTemporaryFile(
+                    delete=False, suffix=sniff_suffix(audio_bytes)) as tmp:
+                tmp.write(audio_bytes)
+                tmp_path = tmp.name
+    del audio_bytes
+    if performance_archive is None:
+        archive_audio = None
     
     try:
         # 2. Call Singing Evaluator
-        eval_args = {"audio_path": tmp_path, "offset": offset}
+        if shared_audio is not None:
+            eval_args = {"audio_buffer": shared_audio.descriptor, "offset": offset}
+        else:
+            eval_args = {"audio_path": tmp_path, "offset": offset}
         if reference_lyrics:
             eval_args["reference_lyrics_json"] = reference_lyrics
         if reference_audio_path:
@@ -424,10 +791,12 @@ async def submit_performance(
              raise HTTPException(status_code=500, detail="Evaluator failed")
         
         evaluation = json.loads(eval_result_json)
+        # Raw STT words only matter for re-scoring an archived take
+        transcript_words = evaluation.pop("transcript_words", None)
         
-        # 3. Call Judge
+        # 3. Call Judge (per-word timing columns are for the frontend, not the prompt)
         judge_args = {
-            "evaluation_data_json": json.dumps(evaluation),
+            "evaluation_data_json": json.dumps({k: v for k, v in evaluation.items() if k != "word_timing"}),
             "personality": personality
         }
         judge_result_str = await host_agent.call_tool("evaluate_performance", judge_args)
@@ -441,6 +810,25 @@ async def submit_performance(
             except json.JSONDecodeError:
                 judge_feedback_text = judge_result_str
 
+        # 4. Archive in the background (encoding and disk I/O happen off the request path)
+        if archive_audio is not None and "error" not in evaluation:
+            try:
+                lyrics_data = json.loads(reference_lyrics) if reference_lyrics else None
+            except json.JSONDecodeError:
+                lyrics_data = None
+            performance_archive.submit(archive_audio, {
+                "user_name": user_name,
+                "song_id": Path(reference_audio_path).stem if reference_audio_path else None,
+                "reference_audio_path": reference_audio_path,
+                "offset": offset,
+                "personality": personality,
+                "lyrics": lyrics_data,
+                "transcript": evaluation.get("transcribed_text"),
+                "transcript_words": transcript_words,
+                "evaluation": evaluation,
+                "feedback": judge_feedback_text,
+            })
+
         return {
             "evaluation": evaluation,
             "feedback": judge_feedback_text
@@ -451,9 +839,48 @@ async def submit_performance(
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         # Cleanup
-        if os.path.exists(tmp_path):
+        if shared_audio is not None:
+            shared_audio.close()
+        if upload is not None:
+            upload.discard()
+        elif tmp_path and os.path.exists(tmp_path):
             os.remove(tmp_path)
 
+@app.get("/api/performances")
+async def list_performances(user: str = None, song: str = None, since: str = None, until: str = None,
+                            limit: int = 50):
+    """Archived performances, newest first. `since`/`until` are ISO dates or datetimes."""
+    if not performance_archive:
+        raise HTTPException(status_code=404, detail="Performance archive is disabled")
+    try:
+        since_ts = datetime.fromisoformat(since).timestamp() if since else None
+        until_ts = datetime.fromisoformat(until).timestamp() if until else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid date: {e}")
+    rows = await asyncio.to_thread(performance_archive.find, user, song, since_ts, until_ts, min(limit, 500))
+    return {"performances": rows}
+
+def _archived(perf_id: str) -> dict:
+    if not performance_archive:
+        raise HTTPException(status_code=404, detail="Performance archive is disabled")
+    row = performance_archive.get(perf_id)
+    if not row:
+        raise HTTPException(status_code=404, detail="Performance not found")
+    return row
+
+@app.get("/api/performances/{perf_id}")
+async def get_performance(perf_id: str):
+    """Stored evaluation and metadata of one archived performance."""
+    row = _archived(perf_id)
+    with open(performance_archive.path(row["meta_file"])) as f:
+        return json.load(f)
+
+@app.get("/api/performances/{perf_id}/audio")
+async def get_performance_audio(perf_id: str):
+    """The archived recording, for replay."""
+    row = _archived(perf_id)
+    return FileResponse(performance_archive.path(row["audio_file"]))
+
 @app.get("/api/personalities")
 async def list_personalities():
     """Lists all available judge personalities."""
@@ -0,0 +1,43 @@
+"""
+Standalone song media server.
+
+Serves the song library (same responses as the host's /songs mount, see
+common.media) from its own process, so video streaming never shares an event
+loop with the API. Route /songs/ to it in the front proxy (or the Vite dev
+proxy, see frontend/vite.config.js) and start the host with KARAOKE_SERVE_MEDIA=0.
+
+Usage:
+    python host_agent/media_server.py --port 8001
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# Make the shared `common` package importable when run as a script
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common.media import ACCEL_MODES, create_media_app
+
+SONGS_DIR = Path(__file__).resolve().parent.parent / "audio_playback_agent" / "songs"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the song library with range requests and caching.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--songs-dir", default=str(SONGS_DIR))
+    parser.add_argument("--accel", choices=ACCEL_MODES, help="Hand transfers to nginx / mod_xsendfile.")
+    parser.add_argument("--accel-prefix", default="/internal-songs/", help="Internal nginx location for --accel nginx.")
+    args = parser.parse_args()
+
+    import uvicorn
+    from starlette.applications import Starlette
+    from starlette.routing import Mount
+
+    # Same URLs as the host: /songs/<name>
+    media = create_media_app(args.songs_dir, accel=args.accel, accel_prefix=args.accel_prefix)
+    uvicorn.run(Starlette(routes=[Mount("/songs", app=media)]), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,16 @@
 import logging
 import os
+import sys
 import json
+import threading
 from pathlib import Path
+
+# Make the shared `common` package importable when run as a script
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common.metrics import instrument_tool, stage
+from common.startup_profile import mark_ready, start_background_warmup, timed_import
+
 from dotenv import load_dotenv
-from openai import OpenAI
 from mcp.server.fastmcp import FastMCP
 
 # === ENVIRONMENT & CONFIG ===
@@ -16,13 +23,21 @@ PROMPTS_DIR = Path(__file__).parent / "personality_prompts"
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("JudgeMCP")
 
-# === INITIALIZE CLIENT ===
+# === CLIENT (created lazily, the openai import is slow) ===
 api_key = os.getenv("OPENAI_API_KEY")
-client = None
+_client = None
+_client_lock = threading.Lock()
 if not api_key:
     logger.warning("Missing OPENAI_API_KEY in .env file. Running in MOCK mode.")
-else:
-    client = OpenAI(api_key=api_key)
+
+def get_client():
+    """Returns the OpenAI client, or None in MOCK mode."""
+    global _client
+    if _client is None and api_key:
+        with _client_lock:
+            if _client is None:
+                _client = timed_import("openai").OpenAI(api_key=api_key)
+    return _client
 
 # Initialize FastMCP Server
 mcp = FastMCP("Judge Agent")
@@ -46,24 +61,27 @@ def load_prompt(personality: str, feedback_type: str) -> str:
 
 def run_llm(prompt: str) -> str:
     """Send the prompt to OpenAI and return the feedback text."""
+    client = get_client()
     if not client:
         return "[MOCK FEEDBACK] The API key is missing, so here is a placeholder response. Your singing was... interesting! (Mock mode)"
         
     try:
-        response = client.chat.completions.create(
-            model=MODEL,
-            messages=[
-                {"role": "system", "content": "You are the Karaoke Judge Agent."},
-                {"role": "user", "content": prompt},
-            ],
-            temperature=0.8,
-        )
+        with stage("llm"):
+            response = client.chat.completions.create(
+                model=MODEL,
+                messages=[
+                    {"role": "system", "content": "You are the Karaoke Judge Agent."},
+                    {"role": "user", "content": prompt},
+                ],
+                temperature=0.8,
+            )
         return response.choices[0].message.content.strip()
     except Exception as e:
         logger.error(f"OpenAI API Error: {e}")
         return f"Error generating feedback: {str(e)}"
 
 @mcp.tool()
+@instrument_tool
 def evaluate_performance(evaluation_data_json: str, personality: str = "strict_judge") -> str:
     """
     Generates personality-based singing feedback based on evaluation data.
@@ -98,6 +116,7 @@ def evaluate_performance(evaluation_data_json: str, personality: str = "strict_j
         return json.dumps({"error": str(e)})
 
 @mcp.tool()
+@instrument_tool
 def create_persona(name: str, description: str) -> str:
     """
     Creates a new judge personality by generating a system prompt.
@@ -110,6 +129,7 @@ def create_persona(name: str, description: str) -> str:
     Returns:
         Status message.
     """
+    client = get_client()
     if not client:
         return "Error: OpenAI API key missing."
         
@@ -125,11 +145,12 @@ def create_persona(name: str, description: str) -> str:
         Return ONLY the prompt text, nothing else.
         """
         
-        response = client.chat.completions.create(
-            model=MODEL,
-            messages=[{"role": "user", "content": meta_prompt}],
-            temperature=0.7
-        )
+        with stage("llm"):
+            response = client.chat.completions.create(
+                model=MODEL,
+                messages=[{"role": "user", "content": meta_prompt}],
+                temperature=0.7
+            )
         
         generated_prompt = response.choices[0].message.content.strip()
         
@@ -155,4 +176,6 @@ def create_persona(name: str, description: str) -> str:
         return json.dumps({"error": str(e)})
 
 if __name__ == "__main__":
+    mark_ready()
+    start_background_warmup(["openai"], callback=get_client)
     mcp.run()
@@ -0,0 +1,114 @@
+"""
+OpenAI-compatible stub for load testing (chat completions + Whisper transcription).
+
+Point every process at it with:
+    OPENAI_BASE_URL=http://localhost:8900/v1 OPENAI_API_KEY=fake
+
+Behaviour:
+- Chat with `tools`: if the last user message asks to sing/play something, it
+  answers with a `play_song` tool call (query = the rest of the message);
+  otherwise, and after tool results, it answers with a short text.
+- Chat without tools (judge feedback, persona generation): canned text.
+- Transcription: echoes the `prompt` field (the reference lyrics the evaluator
+  sends), i.e. a "perfect" singer; `verbose_json` adds evenly spaced word timestamps.
+Simulated latencies are configurable so capacity estimates stay realistic.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, Request
+
+app = FastAPI(title="Fake OpenAI")
+
+LATENCY = {"chat": (0.4, 0.15), "transcription": (1.5, 0.5)}  # (mean, jitter) seconds
+
+SING_PATTERN = re.compile(r"\b(?:sing|play)\b\s+(.+)", re.IGNORECASE)
+
+
+async def _simulate(kind):
+    mean, jitter = LATENCY[kind]
+    await asyncio.sleep(max(0.0, random.uniform(mean - jitter, mean + jitter)))
+
+
+def _completion(message, model):
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": message,
+            "finish_reason": "tool_calls" if message.get("tool_calls") else "stop",
+        }],
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+    }
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    await _simulate("chat")
+    model = body.get("model", "fake")
+    messages = body.get("messages", [])
+    tool_names = {t["function"]["name"] for t in body.get("tools") or []}
+
+    last = messages[-1] if messages else {}
+    if "play_song" in tool_names and last.get("role") == "user":
+        match = SING_PATTERN.search(last.get("content") or "")
+        if match:
+            return _completion({
+                "role": "assistant",
+                "content": None,
+                "tool_calls": [{
+                    "id": f"call_{uuid.uuid4().hex[:12]}",
+                    "type": "function",
+                    "function": {"name": "play_song", "arguments": json.dumps({"query": match.group(1)})},
+                }],
+            }, model)
+
+    if last.get("role") == "tool":
+        text = "Your song is ready! Hit Sing Now and give it everything!"
+    elif tool_names:
+        text = "Hi! I'm your karaoke host. Tell me what you want to sing!"
+    else:
+        text = "Solid pitch, decent rhythm, and you remembered most of the words. Not bad!"
+    return _completion({"role": "assistant", "content": text}, model)
+
+
+@app.post("/v1/audio/transcriptions")
+async def transcriptions(request: Request):
+    form = await request.form()
+    upload = form.get("file")
+    if upload is not None:
+        await upload.read()
+    await _simulate("transcription")
+    text = str(form.get("prompt") or "")
+    if form.get("response_format") != "verbose_json":
+        return {"text": text}
+    # Word timestamps: one word every 0.6s from the start of the recording
+    words = [{"word": w, "start": round(i * 0.6, 2), "end": round((i + 1) * 0.6, 2)}
+             for i, w in enumerate(text.split())]
+    return {"text": text, "language": "english", "duration": len(words) * 0.6, "words": words}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI-compatible stub server.")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--chat-latency", type=float, default=LATENCY["chat"][0])
+    parser.add_argument("--stt-latency", type=float, default=LATENCY["transcription"][0])
+    args = parser.parse_args()
+    LATENCY["chat"] = (args.chat_latency, args.chat_latency * 0.4)
+    LATENCY["transcription"] = (args.stt_latency, args.stt_latency * 0.3)
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Load generator for the Agentic Karaoke Host.
+
+Each simulated singer replays what the frontend does for one song:
+    chat ("I want to sing ...") -> play_song -> submit_performance -> save_score
+with a little think time in between. Reports throughput and latency
+percentiles per endpoint.
+
+Run the host in fake-services mode first (see README "Load testing"), then:
+    python loadtest/load_generator.py --users 20 --duration 120
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import httpx
+import numpy as np
+
+PERFORMANCES_DIR = Path(__file__).resolve().parent / "performances"
+
+SONG_REQUESTS = ["Neon Skyline", "midnight static", "Paper Hearts by the band", "golden hour drive",
+                 "satelite love", "Echoes in the Rain", "velvet thunder karaoke", "runaway tonite"]
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    async def timed(self, name, coro):
+        t0 = time.perf_counter()
+        try:
+            response = await coro
+            response.raise_for_status()
+            return response
+        except Exception:
+            self.errors[name] += 1
+            return None
+        finally:
+            self.latencies[name].append(time.perf_counter() - t0)
+
+    def report(self, wall_seconds):
+        print(f"\n{'endpoint':<28}{'reqs':>7}{'err':>6}{'req/s':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for name, values in sorted(self.latencies.items()):
+            ms = np.array(values) * 1000
+            print(f"{name:<28}{len(values):>7}{self.errors[name]:>6}{len(values) / wall_seconds:>8.2f}"
+                  f"{np.percentile(ms, 50):>10.0f}{np.percentile(ms, 95):>10.0f}{np.percentile(ms, 99):>10.0f}")
+
+    def as_dict(self, wall_seconds):
+        return {
+            name: {
+                "requests": len(values),
+                "errors": self.errors[name],
+                "rps": round(len(values) / wall_seconds, 3),
+                "p50_ms": round(float(np.percentile(values, 50)) * 1000, 1),
+                "p95_ms": round(float(np.percentile(values, 95)) * 1000, 1),
+                "p99_ms": round(float(np.percentile(values, 99)) * 1000, 1),
+            }
+            for name, values in self.latencies.items()
+        }
+
+
+def load_performances():
+    performances = []
+    for wav in sorted(PERFORMANCES_DIR.glob("performance_*.wav")):
+        meta = json.loads(wav.with_suffix(".json").read_text())
+        performances.append((wav.read_bytes(), meta))
+    if not performances:
+        raise SystemExit("No performances found. Run loadtest/seed_library.py first.")
+    return performances
+
+
+async def singer(user_id, client, stats, performances, deadline, think_time):
+    rng = random.Random(user_id)
+    while time.perf_counter() < deadline:
+        song = rng.choice(SONG_REQUESTS)
+
+        await stats.timed("POST /api/chat", client.post(
+            "/api/chat", json={"message": f"I want to sing {song}", "history": []}))
+        await asyncio.sleep(rng.uniform(0, think_time))
+
+        res = await stats.timed("POST /api/play_song", client.post("/api/play_song", json={"query": song}))
+        if res is None:
+            continue
+        audio = res.json().get("audio", {})
+        await asyncio.sleep(rng.uniform(0, think_time))
+
+        wav_bytes, meta = rng.choice(performances)
+        data = {
+            "personality": rng.choice(["strict_judge", "supportive_grandma", "gen_alpha"]),
+            "reference_lyrics": json.dumps(meta["lyrics"]),
+            "offset": str(meta["offset"]),
+        }
+        if audio.get("file_path"):
+            data["reference_audio_path"] = audio["file_path"]
+        res = await stats.timed("POST /api/submit_performance", client.post(
+            "/api/submit_performance", data=data,
+            files={"audio_file": ("performance.wav", wav_bytes, "audio/wav")}))
+        if res is None:
+            continue
+
+        score = int(res.json().get("evaluation", {}).get("overall_score", 0) * 10000)
+        await stats.timed("POST /api/save_score", client.post("/api/save_score", json={
+            "user_name": f"loadtest_{user_id}", "score": score, "mode": "casual", "song": song}))
+        await asyncio.sleep(rng.uniform(0, think_time))
+
+
+async def run(args):
+    performances = load_performances()
+    stats = Stats()
+    limits = httpx.Limits(max_connections=args.users * 2)
+    async with httpx.AsyncClient(base_url=args.host, timeout=args.timeout, limits=limits) as client:
+        t0 = time.perf_counter()
+        deadline = t0 + args.duration
+        await asyncio.gather(*[
+            singer(i, client, stats, performances, deadline, args.think_time) for i in range(args.users)
+        ])
+        wall = time.perf_counter() - t0
+
+    print(f"\n{args.users} singers for {wall:.0f}s against {args.host}")
+    stats.report(wall)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"users": args.users, "wall_seconds": wall, "endpoints": stats.as_dict(wall)}, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate concurrent singers against the karaoke host.")
+    parser.add_argument("--host", default="http://localhost:8000")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds to keep starting new songs.")
+    parser.add_argument("--think-time", type=float, default=2.0, help="Max random pause between steps (s).")
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--json", help="Write per-endpoint results to this file.")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Seeds the song library with synthetic songs for KARAOKE_FAKE_SERVICES=1 mode.
+
+Writes `<id>.mp4` (audio-only, if ffmpeg is available) or `<id>.wav` files and
+their melody contours (`<id>.melody.npz`) into audio_playback_agent/songs, plus
+`fake_library.json`, which the Audio Agent uses to resolve every query offline. Also writes a few synthetic performances to
+loadtest/performances/ for the load generator to upload.
+
+Usage:
+    python loadtest/seed_library.py --songs 8 --performances 4
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_DIR))
+sys.path.insert(0, str(PROJECT_DIR / "benchmarks"))
+
+from common.melody import ensure_melody  # noqa: E402
+from common.offline_mode import FAKE_LIBRARY_FILE  # noqa: E402
+from synthetic_audio import make_case  # noqa: E402
+
+SONGS_DIR = PROJECT_DIR / "audio_playback_agent" / "songs"
+PERFORMANCES_DIR = Path(__file__).resolve().parent / "performances"
+
+TITLES = ["Neon Skyline", "Midnight Static", "Paper Hearts", "Golden Hour Drive",
+          "Satellite Love", "Echoes in the Rain", "Velvet Thunder", "Runaway Tonight",
+          "Glass Ocean", "Summer Signal", "Lonely Disco", "Firefly Parade"]
+
+
+def _to_mp4(wav_path, mp4_path):
+    result = subprocess.run(
+        ["ffmpeg", "-y", "-loglevel", "error", "-i", wav_path, "-c:a", "aac", "-b:a", "128k",
+         "-movflags", "+faststart", mp4_path],
+        capture_output=True)
+    return result.returncode == 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed a synthetic song library for load testing.")
+    parser.add_argument("--songs", type=int, default=8)
+    parser.add_argument("--song-seconds", type=float, default=120.0)
+    parser.add_argument("--performances", type=int, default=4)
+    parser.add_argument("--performance-seconds", type=float, default=30.0)
+    args = parser.parse_args()
+
+    SONGS_DIR.mkdir(parents=True, exist_ok=True)
+    PERFORMANCES_DIR.mkdir(parents=True, exist_ok=True)
+    have_ffmpeg = shutil.which("ffmpeg") is not None
+
+    library = []
+    with tempfile.TemporaryDirectory(prefix="karaoke_seed_") as tmp_dir:
+        for i in range(args.songs):
+            case = make_case(os.path.join(tmp_dir, f"song{i}"), args.song_seconds, seed=i)
+            song_id = f"fake{i:04d}"
+            mp4_path = SONGS_DIR / f"{song_id}.mp4"
+            if have_ffmpeg and _to_mp4(case["reference_path"], str(mp4_path)):
+                filename = mp4_path.name
+            else:
+                filename = f"{song_id}.wav"
+                shutil.copy(case["reference_path"], SONGS_DIR / filename)
+            ensure_melody(str(SONGS_DIR / filename))
+            title = f"{TITLES[i % len(TITLES)]} (Karaoke Version)"
+            library.append({"id": song_id, "title": title, "file": filename})
+            print(f"Seeded {filename}: {title}")
+
+        for i in range(args.performances):
+            case = make_case(os.path.join(tmp_dir, f"perf{i}"), args.performance_seconds, seed=100 + i)
+            target = PERFORMANCES_DIR / f"performance_{i}.wav"
+            shutil.copy(case["performance_path"], target)
+            with open(PERFORMANCES_DIR / f"performance_{i}.json", "w") as f:
+                json.dump({"offset": case["offset"], "lyrics": case["lyrics"]}, f)
+            print(f"Wrote {target}")
+
+    with open(SONGS_DIR / FAKE_LIBRARY_FILE, "w") as f:
+        json.dump(library, f, indent=2)
+    print(f"Library index written to {SONGS_DIR / FAKE_LIBRARY_FILE}")
+
+
+if __name__ == "__main__":
+    main()
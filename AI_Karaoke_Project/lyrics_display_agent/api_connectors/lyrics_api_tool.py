@@ -1,11 +1,18 @@
 import requests
 
+from common.http_client import pooled_session
+
 class LyricsAPIConnector:
-    def __init__(self, api_url):
+    def __init__(self, api_url, rate=2, session=None):
         self.api_url = api_url
+        # Pooled keep-alive connections, a timeout on every request, `rate` requests/s
+        self.session = session or pooled_session(rate=rate)
 
     def fetch_lyrics(self, song_title, artist_name):
-        response = requests.get(self.api_url, params={'title': song_title, 'artist': artist_name})
+        try:
+            response = self.session.get(self.api_url, params={'title': song_title, 'artist': artist_name})
+        except requests.RequestException:
+            return 'Error fetching lyrics'
         if response.status_code == 200:
             return response.json().get('lyrics', 'Lyrics not found')
         else:
@@ -14,4 +21,4 @@ class LyricsAPIConnector:
 # Example usage:
 # connector = LyricsAPIConnector('https://api.lyrics.ovh/v1')
 # lyrics = connector.fetch_lyrics('Shape of You', 'Ed Sheeran')
-# print(lyrics)
\ No newline at end of file
+# print(lyrics)
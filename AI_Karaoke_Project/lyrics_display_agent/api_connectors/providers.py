@@ -0,0 +1,189 @@
+"""
+Lyrics providers behind one client layer (see common.http_client).
+
+`search(query)` asks every synced-lyrics provider at once (Musixmatch, LRCLIB,
+NetEase, Megalobiz, through syncedlyrics' provider classes) and returns the
+first LRC that parses to at least MIN_SYNCED_LINES lines. A plain-text answer
+is kept as the fallback. Genius joins in only if no lyrics of any kind have
+arrived after GENIUS_AFTER seconds, or once every provider has answered without
+any. The whole lookup gives up after SEARCH_TIMEOUT seconds. A slow or dead
+provider therefore costs at most that. syncedlyrics.search tries providers one
+after another, each with its own timeouts, and that time adds up.
+
+Each provider has its own pooled session: keep-alive connections, a (connect,
+read) timeout per request, and a token bucket of PROVIDER_RATE requests/s. A
+provider that is out of tokens is skipped for the lookup (RateLimited), not
+waited on. Each lookup runs its providers on threads of its own, so concurrent
+lookups don't wait for each other.
+"""
+
+import contextvars
+import logging
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from common.http_client import adopt
+from common.lrc import parse_lrc
+from common.metrics import stage
+from common.startup_profile import timed_import
+
+logger = logging.getLogger("LyricsProviders")
+
+# Synced-lyrics providers to ask, by syncedlyrics class name
+SYNCED_PROVIDERS = [name.strip().lower() for name in
+                    os.getenv("LYRICS_PROVIDERS", "musixmatch,lrclib,netease,megalobiz").split(",") if name.strip()]
+# Upper bound on one lookup, whatever the providers do
+SEARCH_TIMEOUT = float(os.getenv("LYRICS_SEARCH_TIMEOUT", "6.0"))
+# Genius (plain text, one more API call) is asked when nothing has arrived by then
+GENIUS_AFTER = float(os.getenv("LYRICS_GENIUS_AFTER", "1.5"))
+# Requests per second per provider (bursts of PROVIDER_BURST); 0 disables the limit
+PROVIDER_RATE = float(os.getenv("LYRICS_PROVIDER_RATE", "2"))
+PROVIDER_BURST = 5
+# (connect, read) seconds for each provider request
+HTTP_TIMEOUT = (3.05, float(os.getenv("LYRICS_HTTP_TIMEOUT", "4")))
+# Fewer synced lines than this is a stub (title line, "instrumental"), not lyrics
+MIN_SYNCED_LINES = 3
+
+GENIUS_ACCESS_TOKEN = os.getenv("GENIUS_ACCESS_TOKEN")
+
+_clients = None
+_genius = None
+_lock = threading.Lock()
+
+
+def _session_for(client_session):
+    return adopt(client_session, rate=PROVIDER_RATE, burst=PROVIDER_BURST, timeout=HTTP_TIMEOUT)
+
+
+def synced_clients() -> dict:
+    """name -> syncedlyrics provider instance, created once, sessions replaced by pooled ones."""
+    global _clients
+    if _clients is None:
+        with _lock:
+            if _clients is None:
+                classes = timed_import("syncedlyrics.providers")
+                factories = {
+                    # Word-by-word (enhanced LRC) when Musixmatch has it; common.lrc reads the word tags
+                    "musixmatch": lambda: classes.Musixmatch(enhanced=True),
+                    "lrclib": classes.Lrclib,
+                    "netease": classes.NetEase,
+                    "megalobiz": classes.Megalobiz,
+                }
+                clients = {}
+                for name in SYNCED_PROVIDERS:
+                    if name not in factories:
+                        logger.warning(f"Unknown lyrics provider '{name}' ignored")
+                        continue
+                    client = factories[name]()
+                    client.session = _session_for(client.session)
+                    clients[name] = client
+                _clients = clients
+    return _clients
+
+
+def get_genius():
+    """Returns the Genius client, or None if no token is configured."""
+    global _genius
+    if _genius is None and GENIUS_ACCESS_TOKEN:
+        with _lock:
+            if _genius is None:
+                # No retries or sleeps between requests: the token bucket paces it
+                genius = timed_import("lyricsgenius").Genius(GENIUS_ACCESS_TOKEN, timeout=HTTP_TIMEOUT,
+                                                              sleep_time=0, retries=0)
+                genius._session = _session_for(genius._session)
+                _genius = genius
+    return _genius
+
+
+def warm_up():
+    synced_clients()
+    get_genius()
+
+
+def _lookup_synced(name, query):
+    lyrics = synced_clients()[name].get_lrc(query)
+    if not lyrics:
+        return None
+    if lyrics.synced and len(parse_lrc(lyrics.synced)["t"]) >= MIN_SYNCED_LINES:
+        return {"provider": name, "lrc": lyrics.synced}
+    if lyrics.unsynced and lyrics.unsynced.strip():
+        return {"provider": name, "text": lyrics.unsynced}
+    return None
+
+
+def _lookup_genius(query):
+    song = get_genius().search_song(query, get_full_info=False)
+    if not song or not song.lyrics:
+        return None
+    return {"provider": "genius", "text": song.lyrics, "title": song.title, "id": str(song.id)}
+
+
+def _submit(pool, name, fn, *args):
+    # Run in a copy of the caller's context so the provider's stage lands in the tool's timings and trace
+    ctx = contextvars.copy_context()
+
+    def _run():
+        with stage(name):
+            return fn(*args)
+    return pool.submit(ctx.run, _run)
+
+
+def search(query: str):
+    """
+    First synced result ({"provider", "lrc"}), else a plain-text one ({"provider",
+    "text", "title"?, "id"?}), else None. Returns within about SEARCH_TIMEOUT seconds.
+    """
+    t0 = time.monotonic()
+    deadline = t0 + SEARCH_TIMEOUT
+    # A thread per provider for this lookup alone: it never queues behind another
+    # lookup's providers, which may still be running after that lookup gave up on them
+    clients = synced_clients()
+    pool = ThreadPoolExecutor(max_workers=len(clients) + 1, thread_name_prefix="lyrics-provider")
+    try:
+        return _search(pool, query, clients, t0, deadline)
+    finally:
+        # Abandoned requests finish in the background, bounded by HTTP_TIMEOUT each
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _search(pool, query, clients, t0, deadline):
+    pending = {_submit(pool, name, _lookup_synced, name, query): name for name in clients}
+    genius_pending = get_genius() is not None
+    fallback = None
+
+    while True:
+        now = time.monotonic()
+        # 1. Genius is the last resort: only when no provider has produced anything in time
+        if genius_pending and fallback is None and (not pending or now - t0 >= GENIUS_AFTER):
+            pending[_submit(pool, "genius", _lookup_genius, query)] = "genius"
+            genius_pending = False
+        if not pending or now >= deadline:
+            break
+
+        # 2. Wait for the next answer (or the moment Genius should start)
+        timeout = deadline - now
+        if genius_pending and fallback is None:
+            timeout = min(timeout, max(0.0, t0 + GENIUS_AFTER - now))
+        done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+        # 3. First good synced answer wins; the rest finish unobserved
+        for future in done:
+            name = pending.pop(future)
+            try:
+                result = future.result()
+            except Exception as e:
+                logger.warning(f"{name} lookup failed: {e}")
+                continue
+            if result and "lrc" in result:
+                logger.info(f"Synced lyrics from {name} in {time.monotonic() - t0:.2f}s")
+                return result
+            if result and fallback is None:
+                fallback = result
+
+    if pending:
+        logger.warning(f"Lyrics lookup stopped after {SEARCH_TIMEOUT}s; no answer from {sorted(pending.values())}")
+    if fallback:
+        logger.info(f"Plain-text lyrics from {fallback['provider']} in {time.monotonic() - t0:.2f}s")
+    return fallback
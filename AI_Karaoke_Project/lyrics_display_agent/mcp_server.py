@@ -1,16 +1,27 @@
 import logging
-import os
 import re
+import sys
 import json
+from pathlib import Path
 from typing import List, Optional, Dict, Any
+
+# Make the shared `common` package importable when run as a script
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common.lrc import parse_lrc
+from common.metrics import instrument_tool
+from common.offline_mode import FAKE_SERVICES, fake_lrc
+from common.startup_profile import mark_ready, start_background_warmup
+from common.timeline import from_lines
+
 from mcp.server.fastmcp import FastMCP
-import lyricsgenius
-import syncedlyrics
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+# Reads its settings from the environment on import
+from api_connectors import providers  # noqa: E402
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("LyricsMCP")
@@ -18,31 +29,9 @@ logger = logging.getLogger("LyricsMCP")
 # Initialize FastMCP Server
 mcp = FastMCP("Lyrics Agent")
 
-# Initialize Genius Client
-GENIUS_ACCESS_TOKEN = os.getenv("GENIUS_ACCESS_TOKEN")
-genius = None
-if GENIUS_ACCESS_TOKEN:
-    genius = lyricsgenius.Genius(GENIUS_ACCESS_TOKEN)
-else:
+if not providers.GENIUS_ACCESS_TOKEN:
     logger.warning("GENIUS_ACCESS_TOKEN not found. Text-only fallback will be limited.")
 
-def parse_lrc(lrc_text: str) -> List[Dict[str, Any]]:
-    """Parses LRC format strings: [mm:ss.xx] Lyric text"""
-    lines = lrc_text.split('\n')
-    parsed = []
-    regex = re.compile(r'\[(\d+):(\d+(?:\.\d+)?)\](.*)')
-    
-    for line in lines:
-        match = regex.match(line.strip())
-        if match:
-            minutes = int(match.group(1))
-            seconds = float(match.group(2))
-            text = match.group(3).strip()
-            total_seconds = minutes * 60 + seconds
-            if text:
-                parsed.append({"timestamp": total_seconds, "text": text})
-    return parsed
-
 def parse_genius_lyrics(lyrics_text: str) -> List[Dict[str, Any]]:
     """Parses raw Genius lyrics (text only). Assigns dummy timestamps."""
     lines = lyrics_text.split('\n')
@@ -56,62 +45,55 @@ def parse_genius_lyrics(lyrics_text: str) -> List[Dict[str, Any]]:
     return parsed
 
 @mcp.tool()
+@instrument_tool
 def search_lyrics(query: str) -> str:
     """
     Searches for lyrics for a given song query.
-    First tries to find synced lyrics (LRC), then falls back to Genius (text only).
+    Asks the synced-lyrics providers concurrently and takes the first synced (LRC)
+    result; falls back to plain text (a provider's or Genius'). Bounded by
+    LYRICS_SEARCH_TIMEOUT (see api_connectors/providers.py).
     
     Args:
         query: Song title and artist (e.g. "Bohemian Rhapsody Queen")
         
     Returns:
-        JSON string containing song title, id, and list of lyric lines with timestamps.
+        JSON string containing song title, id, synced flag and the lyrics as a compact
+        timeline: {"t": [line starts], "end": [line ends], "text": [lines]} (see common.timeline),
+        plus "words" (word onsets) when the LRC has enhanced word tags.
     """
-    try:
-        logger.info(f"Searching syncedlyrics for: {query}")
-        lrc_content = syncedlyrics.search(query)
-        
-        if lrc_content:
-            logger.info("Found synced lyrics!")
-            parsed_lyrics = parse_lrc(lrc_content)
-            song_id = re.sub(r'\W+', '_', query.lower())
-            
-            result = {
-                "song_id": song_id,
-                "title": query.title(),
-                "lyrics": parsed_lyrics,
-                "synced": True
-            }
-            return json.dumps(result)
-            
-    except Exception as e:
-        logger.error(f"Syncedlyrics search failed: {e}")
+    if FAKE_SERVICES:
+        found = {"provider": "fake", "lrc": fake_lrc(query)}
+    else:
+        try:
+            logger.info(f"Searching lyrics providers for: {query}")
+            found = providers.search(query)
+        except Exception as e:
+            logger.error(f"Lyrics search failed: {e}")
+            return json.dumps({"error": str(e)})
 
-    # Fallback to Genius
-    if not genius:
-        return json.dumps({"error": "Genius API token not configured and no synced lyrics found."})
+    if not found:
+        if providers.get_genius() is None:
+            return json.dumps({"error": "Genius API token not configured and no synced lyrics found."})
+        return json.dumps({"error": "Song not found on Genius or SyncedLyrics"})
 
-    try:
-        logger.info(f"Searching Genius for: {query}")
-        song = genius.search_song(query)
-        if not song:
-            return json.dumps({"error": "Song not found on Genius or SyncedLyrics"})
-        
-        parsed_lyrics = parse_genius_lyrics(song.lyrics)
-        song_data = song.to_dict()
-        song_id = str(song_data.get('id', 'unknown'))
-        
+    if "lrc" in found:
         result = {
-            "song_id": song_id,
-            "title": song.title,
-            "lyrics": parsed_lyrics,
+            "song_id": re.sub(r'\W+', '_', query.lower()),
+            "title": query.title(),
+            "timeline": parse_lrc(found["lrc"]),
+            "synced": True
+        }
+    else:
+        result = {
+            "song_id": found.get("id") or re.sub(r'\W+', '_', query.lower()),
+            "title": found.get("title") or query.title(),
+            "timeline": from_lines(parse_genius_lyrics(found["text"])),
             "synced": False
         }
-        return json.dumps(result)
-        
-    except Exception as e:
-        logger.error(f"Genius search failed: {e}")
-        return json.dumps({"error": str(e)})
+    result["source"] = found["provider"]
+    return json.dumps(result)
 
 if __name__ == "__main__":
+    mark_ready()
+    start_background_warmup(["syncedlyrics", "lyricsgenius"], callback=providers.warm_up)
     mcp.run()
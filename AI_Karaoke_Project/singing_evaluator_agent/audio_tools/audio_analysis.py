@@ -1,58 +1,126 @@
-import librosa
 import numpy as np
 import os
 import logging
-from rapidfuzz import fuzz
-from openai import OpenAI
-from dotenv import load_dotenv
-from fastdtw import fastdtw
-from scipy.spatial.distance import euclidean
+import threading
+import tempfile
+import time
 import difflib
+import io
 import re
+from dotenv import load_dotenv
+from common.melody import load_melody, melody_path
+from common.metrics import stage
+from common.startup_profile import lazy_module, record_startup_stage, timed_import
+from common.timeline import DEFAULT_LAST_LINE_SECONDS, MIN_LINE_SECONDS, as_timeline, to_lines, window
+
+# Heavy libraries are imported on first use (or by the agent's warm-up thread)
+# so the evaluator answers the MCP handshake without waiting for them.
+librosa = lazy_module("librosa")
+sf = lazy_module("soundfile")
+fuzz = lazy_module("rapidfuzz.fuzz")
+process = lazy_module("rapidfuzz.process")
+_fastdtw = lazy_module("fastdtw")
+_distance = lazy_module("scipy.spatial.distance")
+
+# Modules the warm-up thread should pre-load after startup
+HEAVY_MODULES = ["librosa", "soundfile", "rapidfuzz.fuzz", "rapidfuzz.process", "fastdtw", "scipy.spatial.distance", "openai"]
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 load_dotenv()
-client = OpenAI()
 
-import soundfile as sf
+# Whisper works on 16 kHz mono internally; sending more is wasted upload time
+STT_SAMPLE_RATE = 16000
+
+# Rate the recording is analysed at (YIN, CQT/chroma, DTW, VAD). Vocal pitch and
+# chroma need far less than the 44.1/48 kHz browsers record at. 0 = native rate.
+ANALYSIS_SAMPLE_RATE = int(os.getenv("EVALUATOR_SAMPLE_RATE", "22050"))
+
+# librosa's defaults are tuned for 22.05 kHz; hops are scaled to keep the same
+# time resolution (~23 ms) at other rates.
+_BASE_SR = 22050
+_BASE_HOP = 512
+_BASE_FRAME = 2048
+
+def hop_for(sr):
+    """Hop length giving ~23 ms frames at `sr` (multiple of 64, as the multirate CQT requires)."""
+    return max(64, int(round(_BASE_HOP * sr / _BASE_SR / 64)) * 64)
+
+def frame_for(sr):
+    return max(4 * hop_for(sr), int(round(_BASE_FRAME * sr / _BASE_SR)))
+
+_client = None
+_client_lock = threading.Lock()
 
-def transcribe_audio(audio_path, prompt=""):
+def get_openai_client():
+    """Creates the OpenAI client on first use (the openai import is slow)."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = timed_import("openai").OpenAI()
+    return _client
+
+def encode_for_stt(y, sr):
+    """
+    Normalizes the decoded recording and encodes it as 16 kHz / 16-bit mono WAV
+    bytes in memory (no temp file), ready to upload to the STT backend.
+    """
+    y_norm = librosa.util.normalize(y)
+    if sr != STT_SAMPLE_RATE:
+        y_norm = librosa.resample(y_norm, orig_sr=sr, target_sr=STT_SAMPLE_RATE)
+    buf = io.BytesIO()
+    sf.write(buf, y_norm, STT_SAMPLE_RATE, format="WAV", subtype="PCM_16")
+    return buf.getvalue()
+
+def transcribe_audio(audio_path, prompt="", audio=None):
     """
     Transcribes audio using OpenAI Whisper.
     Normalizes audio first to boost volume.
+    `audio` = (y, sr) reuses an already decoded recording instead of loading audio_path.
+    """
+    return transcribe_with_words(audio_path, prompt=prompt, audio=audio, word_timestamps=False)[0]
+
+def transcribe_with_words(audio_path, prompt="", audio=None, word_timestamps=True):
+    """
+    Like transcribe_audio, but also returns word timestamps when the STT backend
+    provides them: (text, [{"word", "start", "end"}, ...]).
     """
     try:
-        if not os.path.exists(audio_path):
+        if audio is None and not os.path.exists(audio_path):
              logger.error(f"Audio file not found: {audio_path}")
-             return ""
-        
-        # Load and Normalize
-        y, sr = librosa.load(audio_path, sr=None)
-        y_norm = librosa.util.normalize(y)
+             return "", []
         
-        # Save to temp file
-        temp_path = audio_path.replace(".wav", "_norm.wav")
-        sf.write(temp_path, y_norm, sr)
+        # Load (only if not decoded already), Normalize and encode in memory
+        with stage("stt_prepare"):
+            if audio is not None:
+                y, sr = audio
+            else:
+                y, sr = librosa.load(audio_path, sr=STT_SAMPLE_RATE)
+            wav_bytes = encode_for_stt(y, sr)
 
-        with open(temp_path, "rb") as audio_file:
-            transcript = client.audio.transcriptions.create(
+        extra = {"response_format": "verbose_json", "timestamp_granularities": ["word"]} if word_timestamps else {}
+        with stage("stt"):
+            transcript = get_openai_client().audio.transcriptions.create(
                 model="whisper-1", 
-                file=audio_file,
+                file=("performance.wav", wav_bytes, "audio/wav"),
                 language="en",
-                prompt=prompt[:500] 
+                prompt=prompt[:500],
+                **extra
             )
-        
-        # Cleanup
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
-            
-        return transcript.text
+
+        words = []
+        for w in getattr(transcript, "words", None) or []:
+            if isinstance(w, dict):
+                words.append({"word": w.get("word", ""), "start": float(w.get("start", 0)), "end": float(w.get("end", 0))})
+            else:
+                words.append({"word": w.word, "start": float(w.start), "end": float(w.end)})
+        return transcript.text, words
     except Exception as e:
         logger.error(f"Whisper STT failed: {e}")
-        return ""
+        return "", []
 
 def calculate_lyrics_accuracy(transcribed_text, reference_lyrics_data):
     """
@@ -70,64 +138,92 @@ def calculate_lyrics_accuracy(transcribed_text, reference_lyrics_data):
     ratio = fuzz.ratio(transcribed_text.lower(), ref_text.lower())
     return ratio / 100.0
 
-def calculate_timing_score(y, sr, reference_lyrics):
+# A line counts as "on time" if singing starts within this many seconds of it
+TIMING_TOLERANCE = 0.35
+
+def _singing_time_before(t, starts, ends, cum_lengths):
     """
-    Calculates timing score by comparing voice activity with reference lyrics timestamps.
+    Total voiced time in [0, t) for sorted, disjoint intervals (vectorized over t).
+    cum_lengths[k] = total length of the first k intervals.
     """
-    if not reference_lyrics:
-        return 0.0
+    k = np.searchsorted(ends, t, side="right")          # intervals ending before t
+    partial = np.zeros_like(t, dtype=np.float64)
+    inside = k < len(starts)
+    kk = np.minimum(k, len(starts) - 1)
+    partial[inside] = np.clip(t[inside] - starts[kk[inside]], 0.0, None)
+    return cum_lengths[k] + partial
+
+def calculate_line_timing(y, sr, reference_lyrics):
+    """
+    Calculates timing score by comparing voice activity with reference lyrics timestamps,
+    plus per-line onset offsets (negative = early, positive = late).
+    Uses a sorted-interval sweep: O((lines + intervals) log intervals).
+    Returns (score, line_timing).
+    """
+    timeline = as_timeline(reference_lyrics)
+    if not timeline:
+        return 0.0, []
+
+    # 1. Detect Voice Activity (VAD) -> sorted, disjoint intervals
+    intervals = librosa.effects.split(y, top_db=20, frame_length=frame_for(sr), hop_length=hop_for(sr))
+    singing = librosa.samples_to_time(intervals, sr=sr).reshape(-1, 2)
+    starts, ends = singing[:, 0], singing[:, 1]
+    cum_lengths = np.concatenate([[0.0], np.cumsum(ends - starts)])
+
+    line_starts = np.array(timeline["t"], dtype=float)
+
+    # 2. Target duration per line: from the line's end time (exact for enhanced LRC,
+    # otherwise estimated from its word count, bounded by the gap to the next line)
+    time_gap = np.append(np.diff(line_starts), DEFAULT_LAST_LINE_SECONDS)
+    target_duration = np.maximum(MIN_LINE_SECONDS, np.array(timeline["end"], dtype=float) - line_starts)
+
+    # Window: allow slightly early start (-1.5s) and a buffer after the line
+    window_start = line_starts - 1.5
+    window_end = line_starts + np.maximum(time_gap, target_duration) + 1.0
+
+    # 3. Overlap = voiced time before window end minus voiced time before window start
+    if len(starts):
+        overlap = (_singing_time_before(window_end, starts, ends, cum_lengths)
+                   - _singing_time_before(window_start, starts, ends, cum_lengths))
+    else:
+        overlap = np.zeros_like(line_starts)
+
+    # Cap overlap
+    total_overlap_duration = float(np.sum(np.minimum(overlap, target_duration * 1.5)))
+    total_lyric_duration = float(np.sum(target_duration))
 
-    # 1. Detect Voice Activity (VAD)
-    intervals = librosa.effects.split(y, top_db=20)
-    singing_intervals = librosa.samples_to_time(intervals, sr=sr)
-    
-    # 2. Calculate Overlap
-    total_overlap_duration = 0.0
-    total_lyric_duration = 0.0
-    
-    sorted_lyrics = sorted(reference_lyrics, key=lambda x: x.get('timestamp', x.get('start_time', 0)))
-    
-    for i, lyric in enumerate(sorted_lyrics):
-        start = float(lyric.get('timestamp', lyric.get('start_time', 0)))
-        
-        # Infer end time
-        if i < len(sorted_lyrics) - 1:
-            next_start = float(sorted_lyrics[i+1].get('timestamp', sorted_lyrics[i+1].get('start_time', 0)))
-            time_gap = next_start - start
-        else:
-            time_gap = 5.0
-            
-        words = lyric.get('text', '').split()
-        num_words = len(words) if words else 1
-        estimated_duration = num_words * 0.6 
-        target_duration = min(time_gap, estimated_duration)
-        target_duration = max(0.5, target_duration)
-            
-        total_lyric_duration += target_duration
-        
-        # Window: allow slightly early start (-1.5s)
-        window_start = start - 1.5 
-        window_end = start + max(time_gap, target_duration) + 1.0 # Buffer
-        
-        overlap_found = 0.0
-        for sing_start, sing_end in singing_intervals:
-             # Check overlap
-            o_start = max(window_start, sing_start)
-            o_end = min(window_end, sing_end)
-            
-            if o_end > o_start:
-                overlap_found += (o_end - o_start)
-                
-        # Cap overlap
-        total_overlap_duration += min(overlap_found, target_duration * 1.5)
-    
     if total_lyric_duration > 0:
         score = min(1.0, total_overlap_duration / total_lyric_duration)
         if score > 0.1: score = min(1.0, score + 0.1)
     else:
         score = 0.0
-        
-    return score
+
+    # 4. Per-line onset: the first voiced interval still running at the window start.
+    # One that began before the window and carries on through much of the line is
+    # singing straight on from the previous line, so the line started on time. One that
+    # stops earlier is the previous line's tail; the onset is the next interval.
+    first = np.searchsorted(ends, window_start, side="right")
+    line_timing = []
+    for i, start in enumerate(line_starts):
+        k = first[i]
+        if k < len(starts) and starts[k] < window_start[i] and ends[k] < start + 0.5 * target_duration[i]:
+            k += 1
+        if k >= len(starts) or starts[k] >= window_end[i]:
+            line_timing.append({"line": i, "timestamp": round(float(start), 2), "offset": None, "status": "missed"})
+            continue
+        onset = starts[k] if starts[k] >= window_start[i] else start
+        offset = float(onset - start)
+        status = "early" if offset < -TIMING_TOLERANCE else "late" if offset > TIMING_TOLERANCE else "on_time"
+        line_timing.append({"line": i, "timestamp": round(float(start), 2), "offset": round(offset, 2),
+                            "status": status})
+
+    return score, line_timing
+
+def calculate_timing_score(y, sr, reference_lyrics):
+    """
+    Calculates timing score by comparing voice activity with reference lyrics timestamps.
+    """
+    return calculate_line_timing(y, sr, reference_lyrics)[0]
 
 def calculate_dtw_score(y_user, sr_user, reference_audio_path):
     """
@@ -140,18 +236,22 @@ def calculate_dtw_score(y_user, sr_user, reference_audio_path):
     try:
         # Load reference audio (resample to match user)
         # Load only first 60s to save compute if needed, or full song
-        y_ref, _ = librosa.load(reference_audio_path, sr=sr_user, duration=60) 
+        with stage("reference_load"):
+            y_ref, _ = librosa.load(reference_audio_path, sr=sr_user, duration=60)
         
         # Extract Chroma Features (Pitch Class Profile)
-        chroma_user = librosa.feature.chroma_cqt(y=y_user, sr=sr_user)
-        chroma_ref = librosa.feature.chroma_cqt(y=y_ref, sr=sr_user)
+        with stage("chroma"):
+            hop = hop_for(sr_user)
+            chroma_user = librosa.feature.chroma_cqt(y=y_user, sr=sr_user, hop_length=hop)
+            chroma_ref = librosa.feature.chroma_cqt(y=y_ref, sr=sr_user, hop_length=hop)
         
         # Transpose for fastdtw (needs [n_samples, n_features])
         chroma_user = chroma_user.T
         chroma_ref = chroma_ref.T
         
         # Compute DTW
-        distance, path = fastdtw(chroma_user, chroma_ref, dist=euclidean)
+        with stage("dtw"):
+            distance, path = _fastdtw.fastdtw(chroma_user, chroma_ref, dist=_distance.euclidean)
         
         # Normalize distance
         avg_dist = distance / len(path)
@@ -166,6 +266,87 @@ def calculate_dtw_score(y_user, sr_user, reference_audio_path):
         logger.error(f"DTW analysis failed: {e}")
         return 0.0
 
+# How far ahead (in words) the aligner looks for a match on either side
+ALIGN_LOOKAHEAD = 4
+
+def expected_word_onsets(reference_lyrics):
+    """
+    Expected onset of every reference word: the word's own time when the lyrics
+    have word-level timing (enhanced LRC), otherwise words spread evenly over the
+    line's sung duration (start to end, as in the timing score).
+    Words are the tokens analyze_lyrics_diff compares (normalize_text(text).split()),
+    so entries line up with its output; punctuation-only tokens ("-", "&") are dropped,
+    together with their word times.
+    Returns (words, line_index, onsets) in lyric order.
+    """
+    timeline = as_timeline(reference_lyrics)
+    if not timeline:
+        return [], [], []
+    word_times = timeline.get("words") or [None] * len(timeline["t"])
+    words, lines, onsets = [], [], []
+    for i, (start, end, text, line_onsets) in enumerate(zip(timeline["t"], timeline["end"], timeline["text"],
+                                                            word_times)):
+        tokens = text.split()
+        kept = [j for j, token in enumerate(tokens) if normalize_text(token)]
+        if not kept:
+            continue
+        line_words = [tokens[j] for j in kept]
+        if line_onsets and len(line_onsets) == len(tokens):
+            line_onsets = [line_onsets[j] for j in kept]
+        else:
+            step = max(MIN_LINE_SECONDS, end - start) / len(line_words)
+            line_onsets = [start + j * step for j in range(len(line_words))]
+        words.extend(line_words)
+        lines.extend([i] * len(line_words))
+        onsets.extend(line_onsets)
+    return words, lines, onsets
+
+def align_words(transcript_words, reference_lyrics):
+    """
+    Aligns STT words (with timestamps) to the reference lyric words in a single
+    greedy two-pointer pass with a bounded lookahead, so cost is linear in the
+    number of words. Returns columnar arrays (one entry per reference word):
+        {"word": [...], "line": [...], "expected": [...], "actual": [...], "error": [...]}
+    `actual`/`error` are None for words that were not heard; error > 0 means late.
+    """
+    ref_words, ref_lines, expected = expected_word_onsets(reference_lyrics or [])
+    actual = [None] * len(ref_words)
+    ref_norm = [normalize_text(w) for w in ref_words]
+    heard = [(normalize_text(w["word"]).strip(), w["start"]) for w in transcript_words or []]
+    heard = [(w, t) for w, t in heard if w]
+
+    def same(a, b):
+        return a == b or fuzz.ratio(a, b) > 65
+
+    i = j = 0
+    while i < len(ref_norm) and j < len(heard):
+        if same(ref_norm[i], heard[j][0]):
+            actual[i] = heard[j][1]
+            i += 1
+            j += 1
+            continue
+        # Look a few words ahead on both sides; take the nearest resync point
+        skip_heard = next((k for k in range(1, ALIGN_LOOKAHEAD + 1)
+                           if j + k < len(heard) and same(ref_norm[i], heard[j + k][0])), None)
+        skip_ref = next((k for k in range(1, ALIGN_LOOKAHEAD + 1)
+                         if i + k < len(ref_norm) and same(ref_norm[i + k], heard[j][0])), None)
+        if skip_heard is not None and (skip_ref is None or skip_heard <= skip_ref):
+            j += skip_heard       # extra words were sung
+        elif skip_ref is not None:
+            i += skip_ref         # reference words were skipped
+        else:
+            actual[i] = heard[j][1]   # substitution: sung at this point, just misheard
+            i += 1
+            j += 1
+
+    return {
+        "word": ref_words,
+        "line": ref_lines,
+        "expected": [round(t, 2) for t in expected],
+        "actual": [None if t is None else round(t, 2) for t in actual],
+        "error": [None if a is None else round(a - e, 2) for a, e in zip(actual, expected)],
+    }
+
 def normalize_text(text):
     """
     Normalizes text for comparison.
@@ -173,30 +354,42 @@ def normalize_text(text):
     text = re.sub(r'[^\w\s]', '', text.lower())
     return text
 
-def analyze_lyrics_diff(transcribed_text, reference_lyrics_data):
+# A replaced word still counts as sung correctly above this fuzz.ratio
+WORD_MATCH_THRESHOLD = 65
+# Heard words up to this many seconds after the next line starts still belong to the current line
+LINE_LATE_ALLOWANCE = 1.0
+# Without timestamps, each line's estimated share of heard words extends this many words into the next
+ESTIMATE_SLACK_WORDS = 2
+
+def _starts_line(word, ref_words):
+    """True if `word` looks like one of the first few words of a lyric line."""
+    return any(word == w or fuzz.ratio(word, w) > WORD_MATCH_THRESHOLD for w in ref_words[:ALIGN_LOOKAHEAD])
+
+def _diff_line(ref_words, ref_display_words, trans_words, next_ref_words, diff_result, pending):
     """
-    Compares transcribed text with reference lyrics word by word.
-    Returns a list of words with status: 'matched', 'missing', 'extra', 'wrong'.
+    Diffs one lyric line against the words heard for it, appending to diff_result.
+    Replaced words that need fuzzy scoring are appended as placeholders and queued
+    in `pending` as (index, ref_word, heard_word) so they can be scored in one batch.
+    Heard words after the line's last exact match, from the first one that looks
+    like the start of the next line (`next_ref_words`), are not used here but
+    returned, to be diffed with that line.
     """
-    if not reference_lyrics_data:
-        return []
-    
-    ref_text = " ".join([l.get('text', '') for l in reference_lyrics_data])
-    
-    ref_norm = normalize_text(ref_text)
-    trans_norm = normalize_text(transcribed_text) if transcribed_text else ""
-    
-    ref_words = ref_norm.split()
-    trans_words = trans_norm.split()
-    
-    ref_display_words = ref_text.split()
-    if len(ref_display_words) != len(ref_words):
-        ref_display_words = ref_words
+    opcodes = difflib.SequenceMatcher(None, ref_words, trans_words).get_opcodes()
+    carry = []
+    last_equal = max((k for k, op in enumerate(opcodes) if op[0] == 'equal'), default=-1)
+    j_tail = opcodes[last_equal][4] if last_equal >= 0 else 0
+    j_carry = next((j for j in range(j_tail, min(len(trans_words), j_tail + ALIGN_LOOKAHEAD))
+                    if _starts_line(trans_words[j], next_ref_words)), None)
+    if j_carry is not None:
+        carry = trans_words[j_carry:]
+        trans_words = trans_words[:j_carry]
+        opcodes = difflib.SequenceMatcher(None, ref_words, trans_words).get_opcodes()
 
-    matcher = difflib.SequenceMatcher(None, ref_words, trans_words)
-    diff_result = []
-    
-    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+    def fuzzy(word, heard_word):
+        diff_result.append({"word": word})
+        pending.append((len(diff_result) - 1, word, heard_word))
+
+    for tag, i1, i2, j1, j2 in opcodes:
         if tag == 'equal':
             for k in range(i1, i2):
                 diff_result.append({"word": ref_display_words[k], "status": "matched"})
@@ -213,17 +406,13 @@ def analyze_lyrics_diff(transcribed_text, reference_lyrics_data):
                 for k in range(n_missing, n_ref):
                     heard_idx = k - n_missing
                     heard_word = heard_chunk[heard_idx] if heard_idx < n_heard else ""
-                    if heard_word and fuzz.ratio(ref_chunk[k], heard_word) > 65:
-                        diff_result.append({"word": ref_chunk[k], "status": "matched"})
+                    if heard_word:
+                        fuzzy(ref_chunk[k], heard_word)
                     else:
                         diff_result.append({"word": ref_chunk[k], "status": "wrong", "heard": heard_word})
             else:
                 for k, word in enumerate(ref_chunk):
-                    heard_word = heard_chunk[k]
-                    if fuzz.ratio(word, heard_word) > 65:
-                        diff_result.append({"word": word, "status": "matched"})
-                    else:
-                        diff_result.append({"word": word, "status": "wrong", "heard": heard_word})
+                    fuzzy(word, heard_chunk[k])
                 
         elif tag == 'delete':
             for k in range(i1, i2):
@@ -231,7 +420,93 @@ def analyze_lyrics_diff(transcribed_text, reference_lyrics_data):
         elif tag == 'insert':
             for word in trans_words[j1:j2]:
                 diff_result.append({"word": word, "status": "extra"})
-                
+    return carry
+
+def _heard_words_by_line(transcript_words, line_starts):
+    """
+    Splits timestamped heard words into one chunk per lyric line: a word goes to
+    the last line that started before it (allowing LINE_LATE_ALLOWANCE of lateness).
+    """
+    chunks = [[] for _ in line_starts]
+    timed = [(w, float(tw["start"])) for tw in transcript_words for w in normalize_text(tw["word"]).split()]
+    line = 0
+    for word, start in timed:
+        while line + 1 < len(line_starts) and start >= line_starts[line + 1] + LINE_LATE_ALLOWANCE:
+            line += 1
+        chunks[line].append(word)
+    return chunks
+
+def _heard_words_by_estimate(trans_words, line_starts, line_ends):
+    """
+    Splits untimed heard words into one chunk per lyric line, assuming they were
+    sung at an even pace over the lines' sung spans (start to end, pauses between
+    lines skipped): each line gets a share proportional to its sung duration.
+    Each boundary is pushed ESTIMATE_SLACK_WORDS later: _diff_line moves surplus
+    words that start the next line on to it, but cannot pull back words given to
+    the next line too early.
+    """
+    chunks = [[] for _ in line_starts]
+    durations = [max(MIN_LINE_SECONDS, end - start) for start, end in zip(line_starts, line_ends)]
+    total = sum(durations)
+    if not trans_words or total <= 0:
+        return chunks
+    per_word = total / len(trans_words)
+    boundaries = np.cumsum(durations) + ESTIMATE_SLACK_WORDS * per_word
+    line = 0
+    for j, word in enumerate(trans_words):
+        position = (j + 0.5) * per_word
+        while line + 1 < len(chunks) and position >= boundaries[line]:
+            line += 1
+        chunks[line].append(word)
+    return chunks
+
+def analyze_lyrics_diff(transcribed_text, reference_lyrics_data, transcript_words=None):
+    """
+    Compares transcribed text with reference lyrics word by word.
+    Returns a list of words with status: 'matched', 'missing', 'extra', 'wrong'.
+    Lines are diffed one at a time against the words heard during them, so cost
+    stays linear in song length even for long, repetitive lyrics. Heard words are
+    placed by their timestamps (`transcript_words`) when available, otherwise by
+    an even-pace estimate over the lines' sung spans.
+    """
+    if not reference_lyrics_data:
+        return []
+
+    lines = sorted(reference_lyrics_data, key=lambda x: x.get('timestamp', x.get('start_time', 0)))
+    line_starts = [float(l.get('timestamp', l.get('start_time', 0))) for l in lines]
+
+    ref_lines, display_lines = [], []
+    for l in lines:
+        text = l.get('text', '')
+        ref_words = normalize_text(text).split()
+        display_words = text.split()
+        ref_lines.append(ref_words)
+        display_lines.append(display_words if len(display_words) == len(ref_words) else ref_words)
+
+    trans_words = normalize_text(transcribed_text).split() if transcribed_text else []
+
+    if transcript_words:
+        chunks = _heard_words_by_line(transcript_words, line_starts)
+    else:
+        chunks = _heard_words_by_estimate(trans_words, line_starts, as_timeline(lines)["end"])
+
+    diff_result = []
+    pending = []
+    carry = []
+    for i, (ref_words, display_words) in enumerate(zip(ref_lines, display_lines)):
+        next_ref_words = ref_lines[i + 1] if i + 1 < len(ref_lines) else []
+        carry = _diff_line(ref_words, display_words, carry + chunks[i], next_ref_words, diff_result, pending)
+
+    # Score all replaced word pairs in one batch
+    if pending:
+        scores = process.cpdist([p[1] for p in pending], [p[2] for p in pending], scorer=fuzz.ratio)
+        for (idx, word, heard_word), score in zip(pending, scores):
+            if score > WORD_MATCH_THRESHOLD:
+                diff_result[idx]["status"] = "matched"
+            else:
+                diff_result[idx]["status"] = "wrong"
+                diff_result[idx]["heard"] = heard_word
+
     return diff_result
 
 def analyze_pitch_detail(y_user, sr_user, reference_audio_path):
@@ -245,55 +520,60 @@ def analyze_pitch_detail(y_user, sr_user, reference_audio_path):
     try:
         # Load reference (limit duration to match user ~ roughly)
         user_duration = librosa.get_duration(y=y_user, sr=sr_user)
-        y_ref, _ = librosa.load(reference_audio_path, sr=sr_user, duration=user_duration + 5)
+        with stage("reference_load"):
+            y_ref, _ = librosa.load(reference_audio_path, sr=sr_user, duration=user_duration + 5)
         
         # Extract Chroma (12 bins: C, C#, D...)
-        chroma_user = librosa.feature.chroma_cqt(y=y_user, sr=sr_user)
-        chroma_ref = librosa.feature.chroma_cqt(y=y_ref, sr=sr_user)
+        with stage("chroma"):
+            hop = hop_for(sr_user)
+            chroma_user = librosa.feature.chroma_cqt(y=y_user, sr=sr_user, hop_length=hop)
+            chroma_ref = librosa.feature.chroma_cqt(y=y_ref, sr=sr_user, hop_length=hop)
         
         # Align using DTW on Chroma
         # Transpose for fastdtw [frames, features]
-        dist, path = fastdtw(chroma_user.T, chroma_ref.T, dist=euclidean)
+        with stage("dtw"):
+            dist, path = _fastdtw.fastdtw(chroma_user.T, chroma_ref.T, dist=_distance.euclidean)
         
         high_count = 0
         low_count = 0
         perfect_count = 0
         total_frames = 0
         
-        for idx_user, idx_ref in path:
-            # Compare DOMINANT note in each frame
-            # (Which note 0-11 has highest energy)
-            # Threshold energy to ignore silence
-            if np.max(chroma_user[:, idx_user]) < 0.1:
-                continue
+        with stage("pitch_compare"):
+            for idx_user, idx_ref in path:
+                # Compare DOMINANT note in each frame
+                # (Which note 0-11 has highest energy)
+                # Threshold energy to ignore silence
+                if np.max(chroma_user[:, idx_user]) < 0.1:
+                    continue
                 
-            note_user = np.argmax(chroma_user[:, idx_user])
-            note_ref = np.argmax(chroma_ref[:, idx_ref])
+                note_user = np.argmax(chroma_user[:, idx_user])
+                note_ref = np.argmax(chroma_ref[:, idx_ref])
             
-            total_frames += 1
+                total_frames += 1
             
-            diff = abs(note_user - note_ref)
-            # Handle wrapping
-            if diff > 6: diff = 12 - diff
+                diff = abs(note_user - note_ref)
+                # Handle wrapping
+                if diff > 6: diff = 12 - diff
             
-            # Allow Consonant Intervals (0=Unison, 3/4=3rds, 5=4th, 7=5th -> wrap to 5)
-            # diff is 0 to 6.
-            # 0: Unison
-            # 1: Minor 2nd (Dissonant)
-            # 2: Major 2nd (Ok-ish)
-            # 3: Minor 3rd (Consonant)
-            # 4: Major 3rd (Consonant)
-            # 5: Perfect 4th (Consonant)
-            # 6: Tritone (Dissonant) - Wait, 7 semitones (5th) -> 12-7=5. So diff 5 covers 4th and 5th.
+                # Allow Consonant Intervals (0=Unison, 3/4=3rds, 5=4th, 7=5th -> wrap to 5)
+                # diff is 0 to 6.
+                # 0: Unison
+                # 1: Minor 2nd (Dissonant)
+                # 2: Major 2nd (Ok-ish)
+                # 3: Minor 3rd (Consonant)
+                # 4: Major 3rd (Consonant)
+                # 5: Perfect 4th (Consonant)
+                # 6: Tritone (Dissonant) - Wait, 7 semitones (5th) -> 12-7=5. So diff 5 covers 4th and 5th.
             
-            if diff == 0:
-                perfect_count += 1
-            elif diff in [3, 4, 5]: # Allow 3rds, 4ths, 5ths as "Harmony" (Good)
-                perfect_count += 1 # Count as perfect for scoring
-            elif diff == 2:
-                high_count += 1 # Close
-            else:
-                low_count += 1
+                if diff == 0:
+                    perfect_count += 1
+                elif diff in [3, 4, 5]: # Allow 3rds, 4ths, 5ths as "Harmony" (Good)
+                    perfect_count += 1 # Count as perfect for scoring
+                elif diff == 2:
+                    high_count += 1 # Close
+                else:
+                    low_count += 1
                     
         if total_frames == 0:
             return {"high": 0, "low": 0, "perfect": 0}
@@ -308,15 +588,74 @@ def analyze_pitch_detail(y_user, sr_user, reference_audio_path):
         logger.error(f"Detailed pitch analysis failed: {e}")
         return {"high": 0, "low": 0, "perfect": 0}
 
-def analyze_audio(audio_path, reference_lyrics=None, reference_audio_path=None, offset=0.0):
+# Singer and melody may be this far apart in time and still be compared
+PITCH_TIME_TOLERANCE = 0.1
+# Frames quieter than this (dB below the loudest frame) count as not singing
+VOICING_DB = -25.0
+
+def analyze_pitch_contour(f0, y_user, sr_user, hop, melody, offset=0.0):
+    """
+    Pitch breakdown against the song's reference melody contour, with the same
+    buckets as analyze_pitch_detail. `f0` is the singer's YIN track (hop `hop`).
+    Frames where both the singer and the melody are voiced are compared
+    octave-folded, taking the closest target within +-PITCH_TIME_TOLERANCE.
+    """
+    n = len(f0)
+    # Recording time -> song time
+    times = librosa.frames_to_time(np.arange(n), sr=sr_user, hop_length=hop) + offset
+    rms = librosa.feature.rms(y=y_user, frame_length=frame_for(sr_user), hop_length=hop)[0][:n]
+    singing = np.isfinite(f0) & (librosa.amplitude_to_db(rms, ref=np.max) > VOICING_DB)
+    if not np.any(singing):
+        return {"high": 0, "low": 0, "perfect": 0, "reference": "melody"}
+
+    user_midi = librosa.hz_to_midi(f0[singing])
+    k = int(round(PITCH_TIME_TOLERANCE / melody.hop_seconds))
+    shifts = np.arange(-k, k + 1) * melody.hop_seconds
+    targets = melody.at(times[singing][:, None] + shifts[None, :])
+
+    # Semitones off, folded to the nearest octave; closest target in the window
+    diff = np.abs((user_midi[:, None] - targets + 6.0) % 12.0 - 6.0)
+    compared = ~np.all(np.isnan(targets), axis=1)
+    if not np.any(compared):
+        return {"high": 0, "low": 0, "perfect": 0, "reference": "melody"}
+    error = np.nanmin(diff[compared], axis=1)
+
+    total = len(error)
+    return {
+        "high": round(float(np.sum((error > 0.5) & (error <= 1.5))) / total, 2),  # close
+        "low": round(float(np.sum(error > 1.5)) / total, 2),                       # off
+        "perfect": round(float(np.sum(error <= 0.5)) / total, 2),
+        "reference": "melody",
+    }
+
+def analyze_audio(audio_path, reference_lyrics=None, reference_audio_path=None, offset=0.0, transcript=None,
+                  audio=None, analysis_sr=None, transcript_words=None):
     """
     Analyzes an audio file to extract pitch, rhythm, and other metrics.
+    `reference_lyrics` is a lyric timeline (common.timeline) or a list of
+    {"timestamp", "text"} lines.
+    If `transcript` is given, it is used instead of calling Whisper
+    (`transcript_words` then supplies its word timestamps, if known).
+    If `audio` = (y, sr) is given (e.g. a shared-memory buffer), audio_path is not read.
+    `analysis_sr` overrides ANALYSIS_SAMPLE_RATE (0 = analyse at the native rate).
     """
     try:
-        y, sr = librosa.load(audio_path, sr=None)
+        target_sr = ANALYSIS_SAMPLE_RATE if analysis_sr is None else analysis_sr
+        if audio is not None:
+            y, sr = audio
+            if target_sr and sr != target_sr:
+                with stage("resample"):
+                    y = librosa.resample(y, orig_sr=sr, target_sr=target_sr)
+                sr = target_sr
+        else:
+            with stage("load"):
+                y, sr = librosa.load(audio_path, sr=target_sr or None)
+        hop = hop_for(sr)
         
         # 1. Pitch Analysis using YIN
-        f0 = librosa.yin(y, fmin=librosa.note_to_hz('C2'), fmax=librosa.note_to_hz('C7'))
+        with stage("yin"):
+            f0 = librosa.yin(y, fmin=librosa.note_to_hz('C2'), fmax=librosa.note_to_hz('C7'),
+                             sr=sr, frame_length=frame_for(sr), hop_length=hop)
         valid_f0 = f0[~np.isnan(f0)]
         
         if len(valid_f0) > 0:
@@ -331,33 +670,30 @@ def analyze_audio(audio_path, reference_lyrics=None, reference_audio_path=None,
         logger.info(f"Audio Duration: {audio_duration:.2f}s, Offset: {offset}s")
         
         relevant_lyrics = []
-        if reference_lyrics:
-            logger.info(f"Total Reference Lyrics: {len(reference_lyrics)}")
-            if len(reference_lyrics) > 0:
-                first_ts = reference_lyrics[0].get('timestamp', reference_lyrics[0].get('start_time', 'N/A'))
-                logger.info(f"First Lyric Timestamp (Original): {first_ts}")
-                
-            for line in reference_lyrics:
-                orig_start = float(line.get('timestamp', line.get('start_time', 0)))
-                # Shift timestamp by offset to match recording time
-                adjusted_start = orig_start - offset
-                
-                # If the line starts within the audio range (with small buffers)
-                if -2.0 < adjusted_start < audio_duration + 5.0: 
-                    # Create copy with adjusted timestamp
-                    new_line = line.copy()
-                    new_line['timestamp'] = adjusted_start
-                    relevant_lyrics.append(new_line)
+        timeline = as_timeline(reference_lyrics)
+        if timeline:
+            logger.info(f"Total Reference Lyrics: {len(timeline['t'])}")
+            logger.info(f"First Lyric Timestamp (Original): {timeline['t'][0]}")
+            # Lines starting within the audio range (with small buffers), shifted by offset to recording time
+            relevant_lyrics = to_lines(window(timeline, offset - 2.0, offset + audio_duration + 5.0, shift=offset))
         
         logger.info(f"Relevant Lyrics Count: {len(relevant_lyrics)}")
         if not relevant_lyrics and reference_lyrics:
              logger.warning("No relevant lyrics found! Checking timestamps vs duration.")
         
-        # Pitch Compatibility (DTW)
-        dtw_score = calculate_dtw_score(y, sr, reference_audio_path)
-        
-        # Detailed Pitch Breakdown
-        pitch_detail = analyze_pitch_detail(y, sr, reference_audio_path)
+        # Reference melody contour (extracted offline by the Audio Agent), if there is one yet
+        melody = load_melody(melody_path(reference_audio_path)) if reference_audio_path else None
+
+        if melody is not None:
+            # Detailed Pitch Breakdown straight from the contour: no reference decode, CQT or DTW
+            with stage("pitch_compare"):
+                pitch_detail = analyze_pitch_contour(f0, y, sr, hop, melody, offset)
+        else:
+            # Pitch Compatibility (DTW)
+            dtw_score = calculate_dtw_score(y, sr, reference_audio_path)
+
+            # Detailed Pitch Breakdown
+            pitch_detail = analyze_pitch_detail(y, sr, reference_audio_path)
         
         # Combined Pitch Score - Use Perfect% from Chroma as main driver if valid
         # because dtw_score is raw distance, pitch_detail is logic-based.
@@ -365,12 +701,14 @@ def analyze_audio(audio_path, reference_lyrics=None, reference_audio_path=None,
         pitch_accuracy_score = (pitch_stability * 0.1) + (chroma_score * 0.9)
 
         # 2. Rhythm/Timing Analysis
-        if relevant_lyrics:
-             # Use relevant_lyrics instead of full reference_lyrics
-            rhythm_score = calculate_timing_score(y, sr, relevant_lyrics)
-        else:
-            tempo, beat_frames = librosa.beat.beat_track(y=y, sr=sr)
-            rhythm_score = 0.8 if tempo > 0 else 0.0
+        line_timing = []
+        with stage("timing"):
+            if relevant_lyrics:
+                 # Use relevant_lyrics instead of full reference_lyrics
+                rhythm_score, line_timing = calculate_line_timing(y, sr, relevant_lyrics)
+            else:
+                tempo, beat_frames = librosa.beat.beat_track(y=y, sr=sr, hop_length=hop)
+                rhythm_score = 0.8 if tempo > 0 else 0.0
         
         # 3. Lyrics Accuracy (STT)
         # Prepare prompt from RELEVANT lyrics
@@ -379,18 +717,27 @@ def analyze_audio(audio_path, reference_lyrics=None, reference_audio_path=None,
              prompt_text = " ".join([l.get('text', '') for l in relevant_lyrics])
              
         # Transcribe with Prompt
-        transcribed_text = transcribe_audio(audio_path, prompt=prompt_text)
-        
-        # Compare with RELEVANT lyrics (not full song)
-        lyrics_score = calculate_lyrics_accuracy(transcribed_text, relevant_lyrics)
+        if transcript is not None:
+            transcribed_text = transcript
+            transcript_words = transcript_words or []
+        else:
+            transcribed_text, transcript_words = transcribe_with_words(audio_path, prompt=prompt_text, audio=(y, sr))
         
-        # Detailed Lyrics Diff
-        lyrics_diff = analyze_lyrics_diff(transcribed_text, relevant_lyrics)
+        with stage("diff"):
+            # Compare with RELEVANT lyrics (not full song)
+            lyrics_score = calculate_lyrics_accuracy(transcribed_text, relevant_lyrics)
+
+            # Detailed Lyrics Diff
+            lyrics_diff = analyze_lyrics_diff(transcribed_text, relevant_lyrics, transcript_words)
+
+        with stage("align"):
+            word_timing = align_words(transcript_words, relevant_lyrics)
         
         logger.info(f"Transcribed: '{transcribed_text}' -> Score: {lyrics_score}")
 
         # 4. Energy/Volume
-        rms = librosa.feature.rms(y=y)
+        with stage("rms"):
+            rms = librosa.feature.rms(y=y, frame_length=frame_for(sr), hop_length=hop)
         avg_rms = float(np.mean(rms))
         vocal_power = "high" if avg_rms > 0.1 else "medium" if avg_rms > 0.05 else "low"
 
@@ -406,6 +753,10 @@ def analyze_audio(audio_path, reference_lyrics=None, reference_audio_path=None,
             "transcribed_text": transcribed_text,
             "pitch_detail": pitch_detail,
             "lyrics_diff": lyrics_diff,
+            "line_timing": line_timing,
+            "word_timing": word_timing,
+            # Raw STT words, so an archived take can be re-scored without calling Whisper again
+            "transcript_words": transcript_words,
             "emotion_detected": "neutral",
             "audio_duration": audio_duration, # Return Duration!
             "average_scores": {
@@ -416,7 +767,9 @@ def analyze_audio(audio_path, reference_lyrics=None, reference_audio_path=None,
             }
         }
         
-        logger.info(f"Audio analysis complete: {result}")
+        logger.info(f"Audio analysis complete: overall={overall_score:.3f} pitch={pitch_accuracy_score:.3f} "
+                    f"rhythm={rhythm_score:.3f} lyrics={lyrics_score:.3f}")
+        logger.debug(f"Full analysis result: {result}")
         return result
 
     except Exception as e:
@@ -430,3 +783,47 @@ def analyze_audio(audio_path, reference_lyrics=None, reference_audio_path=None,
             "transcribed_text": "",
             "error": str(e)
         }
+
+def _synthetic_voice(duration, sr, seed=0):
+    """Harmonic sine sweep with a vibrato and short pauses, roughly voice-like."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(duration * sr)) / sr
+    f0 = 220.0 * 2 ** (np.sin(2 * np.pi * 0.25 * t) * 0.5 + 0.02 * np.sin(2 * np.pi * 5.5 * t))
+    phase = 2 * np.pi * np.cumsum(f0) / sr
+    y = sum(np.sin(k * phase) / k for k in range(1, 5))
+    # Gate into "phrases" so VAD / timing code has intervals to work with
+    y *= (np.sin(2 * np.pi * 0.5 * t) > -0.6)
+    y += 0.005 * rng.standard_normal(len(t))
+    return (0.3 * y / np.max(np.abs(y))).astype(np.float32)
+
+def warm_up(duration=4.0):
+    """
+    Runs the full analysis path once on synthetic audio so librosa's one-time costs
+    (CQT filter banks, resampler setup, numba compilation of beat tracking, ...)
+    are paid at startup instead of on the first real submission.
+    Skips Whisper. Returns the warm-up duration in seconds.
+    """
+    t0 = time.perf_counter()
+    with tempfile.TemporaryDirectory(prefix="evaluator_warmup_") as tmp_dir:
+        # Browser recordings are typically 44.1/48 kHz; a 48 kHz reference also
+        # forces the resampler to initialize.
+        user_path = os.path.join(tmp_dir, "warmup_user.wav")
+        ref_path = os.path.join(tmp_dir, "warmup_ref.wav")
+        sf.write(user_path, _synthetic_voice(duration, 44100), 44100)
+        sf.write(ref_path, _synthetic_voice(duration + 2, 48000, seed=1), 48000)
+
+        lyrics = [
+            {"timestamp": 0.5, "text": "warm up the voice"},
+            {"timestamp": 2.0, "text": "and sing along"},
+        ]
+        # With lyrics: timing score path; a second run without exercises beat tracking
+        analyze_audio(user_path, reference_lyrics=lyrics, reference_audio_path=ref_path,
+                      transcript="warm up the boys and sing")
+        analyze_audio(user_path, transcript="")
+        # STT encoding path (normalize + resample to 16 kHz + WAV encode), without the API call
+        encode_for_stt(_synthetic_voice(1.0, 44100), 44100)
+
+    elapsed = time.perf_counter() - t0
+    record_startup_stage("analysis_warmup", elapsed)
+    logger.info(f"Evaluator warm-up complete in {elapsed:.2f}s")
+    return elapsed
@@ -0,0 +1,281 @@
+"""
+Batch re-scoring of archived performances.
+
+Runs `analyze_audio` over many recordings in parallel (one process per core)
+and writes one row per recording to a CSV (or Parquet, if pyarrow is
+installed) file. Use it after changing the scoring to re-score past
+performances.
+
+Input is either a directory tree of recordings, each with a sidecar JSON file
+(`take1.wav` + `take1.json`, e.g. the performance archive, see common.archive),
+or a JSON Lines manifest with one recording per line. The fields, all optional except `audio` (manifest only):
+    {"id": "take1", "audio": "take1.wav", "song_id": "dQw4w9WgXcQ",
+     "reference_audio_path": "...", "offset": 12.5,
+     "lyrics": {timeline} or [lines] or "lyrics.json",
+     "transcript": "...", "transcript_words": [...]}
+Relative paths are resolved against the manifest's directory. `song_id` is
+looked up in the song library (`--songs-dir`) when there is no (existing)
+`reference_audio_path`. A stored `transcript` is reused
+so re-scoring doesn't call Whisper again. Without one, Whisper is called,
+or an empty transcript is used with `--no-stt`.
+
+Reference features are shared: before scoring starts, each distinct song gets
+its melody contour (`<id>.melody.npz`, see common.melody). Workers then only
+load that small file, and never decode or CQT the backing track per recording.
+
+Runs are resumable. Rows are appended and flushed as they finish, and
+recordings whose id is already in the output are skipped. Re-run the same
+command after an interruption to continue.
+
+Usage:
+    python singing_evaluator_agent/batch_rescore.py archive/ -o rescored.csv
+    python singing_evaluator_agent/batch_rescore.py manifest.jsonl -o rescored.parquet --workers 8
+"""
+
+import os
+
+# One analysis per core: keep BLAS / numba from starting a thread pool in every worker
+for _var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS", "NUMBA_NUM_THREADS"):
+    os.environ.setdefault(_var, "1")
+
+import argparse
+import csv
+import importlib.util
+import json
+import logging
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+# Make the shared `common` package importable when run as a script
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_DIR))
+from common.melody import ensure_melody
+
+logger = logging.getLogger("BatchRescore")
+
+DEFAULT_SONGS_DIR = PROJECT_DIR / "audio_playback_agent" / "songs"
+AUDIO_SUFFIXES = {".wav", ".flac", ".ogg", ".opus", ".webm", ".mp3", ".m4a"}
+# Files in the song library that are not songs
+_NON_SONG_SUFFIXES = {".json", ".npz", ".part", ".tmp"}
+
+COLUMNS = ["id", "audio", "song_id", "offset", "overall_score", "pitch_accuracy_score", "rhythm_score",
+           "lyrics_score", "pitch_perfect", "pitch_high", "pitch_low", "pitch_reference", "vocal_power",
+           "audio_duration", "transcribed_text", "error", "elapsed_s"]
+
+
+# === INPUT ===
+
+def _resolve(path, base_dir):
+    path = Path(path)
+    return path if path.is_absolute() else base_dir / path
+
+
+def _resolve_paths(job, base_dir):
+    job["audio"] = str(_resolve(job["audio"], base_dir))
+    if isinstance(job.get("lyrics"), str):
+        job["lyrics"] = str(_resolve(job["lyrics"], base_dir))
+    if job.get("reference_audio_path"):
+        job["reference_audio_path"] = str(_resolve(job["reference_audio_path"], base_dir))
+    return job
+
+
+def load_jobs(source):
+    """Reads a directory tree (recordings + sidecar JSON) or a JSONL manifest into job dicts."""
+    source = Path(source)
+    jobs = []
+    if source.is_dir():
+        for audio in sorted(p for p in source.rglob("*") if p.suffix.lower() in AUDIO_SUFFIXES):
+            sidecar = audio.with_suffix(".json")
+            meta = json.loads(sidecar.read_text()) if sidecar.exists() else {}
+            # Paths in a sidecar are relative to its own directory
+            jobs.append(_resolve_paths(dict(meta, id=meta.get("id") or audio.stem, audio=str(audio)), audio.parent))
+    else:
+        with open(source) as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    entry.setdefault("id", Path(entry["audio"]).stem)
+                    jobs.append(_resolve_paths(entry, source.parent))
+    return jobs
+
+
+def find_song(song_id, songs_dir):
+    """Path of the downloaded audio for `song_id` in the library, or None."""
+    for path in sorted(Path(songs_dir).glob(f"{song_id}.*")):
+        # `<id>.low.mp4` renditions and `<id>.melody.npz` contours have a longer stem
+        if path.stem == song_id and path.suffix.lower() not in _NON_SONG_SUFFIXES:
+            return str(path)
+    return None
+
+
+def done_ids(output_path):
+    """Ids already present in a (partial) output file."""
+    if not output_path.exists():
+        return set()
+    with open(output_path, newline="") as f:
+        return {row["id"] for row in csv.DictReader(f)}
+
+
+# === WORKER ===
+
+def _init_worker(log_level):
+    logging.basicConfig(level=log_level)
+    logging.getLogger().setLevel(log_level)
+
+
+def score_job(job, no_stt=False):
+    """Scores one recording (runs in a worker process). Returns an output row."""
+    from audio_tools.audio_analysis import analyze_audio
+
+    t0 = time.perf_counter()
+    lyrics = job.get("lyrics")
+    if isinstance(lyrics, str):
+        with open(lyrics) as f:
+            lyrics = json.load(f)
+    transcript = job.get("transcript")
+    if transcript is None and no_stt:
+        transcript = ""
+
+    result = analyze_audio(job["audio"], reference_lyrics=lyrics,
+                           reference_audio_path=job.get("reference_audio_path"),
+                           offset=float(job.get("offset") or 0.0), transcript=transcript,
+                           transcript_words=job.get("transcript_words"))
+
+    pitch = result.get("pitch_detail", {})
+    row = {key: result.get(key) for key in COLUMNS if key in result}
+    row.update(
+        id=job["id"], audio=job["audio"], song_id=job.get("song_id"), offset=job.get("offset", 0.0),
+        pitch_perfect=pitch.get("perfect"), pitch_high=pitch.get("high"), pitch_low=pitch.get("low"),
+        pitch_reference=pitch.get("reference", "chroma") if pitch else None,
+        error=result.get("error"), elapsed_s=round(time.perf_counter() - t0, 3),
+    )
+    return row
+
+
+# === DRIVER ===
+
+def prepare_references(jobs, songs_dir, pool):
+    """Resolves song ids and extracts missing melody contours, once per distinct song."""
+    for job in jobs:
+        reference = job.get("reference_audio_path")
+        if job.get("song_id") and not (reference and os.path.exists(reference)):
+            job["reference_audio_path"] = find_song(job["song_id"], songs_dir)
+            if job["reference_audio_path"] is None:
+                logger.warning(f"{job['id']}: song {job['song_id']} not in {songs_dir}; scoring without reference")
+
+    references = sorted({job["reference_audio_path"] for job in jobs if job.get("reference_audio_path")})
+    futures = {pool.submit(ensure_melody, path): path for path in references}
+    for future in as_completed(futures):
+        try:
+            future.result()
+        except Exception as e:
+            # analyze_audio falls back to chroma DTW against the track itself
+            logger.warning(f"Melody extraction failed for {futures[future]}: {e}")
+    return len(references)
+
+
+def _progress(done, total, t0):
+    elapsed = time.perf_counter() - t0
+    rate = done / elapsed if elapsed > 0 else 0.0
+    eta = (total - done) / rate if rate > 0 else 0.0
+    sys.stderr.write(f"\r[{done}/{total}] {rate:.2f} rec/s, ETA {eta:.0f}s ")
+    sys.stderr.flush()
+
+
+def have_pyarrow() -> bool:
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def write_parquet(csv_path, parquet_path):
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+    pq.write_table(pa_csv.read_csv(csv_path), parquet_path)
+
+
+def error_row(job, error):
+    """Output row for a recording that could not be scored at all."""
+    return {"id": job["id"], "audio": job.get("audio"), "song_id": job.get("song_id"),
+            "offset": job.get("offset", 0.0), "error": error}
+
+
+def run(args):
+    output = Path(args.output)
+    as_parquet = output.suffix.lower() == ".parquet"
+    if as_parquet and not have_pyarrow():
+        raise SystemExit("Parquet output needs pyarrow (pip install pyarrow); or write a .csv")
+    # Parquet can't be appended to: rows go to a CSV checkpoint that is converted at the end
+    csv_path = output.with_name(output.name + ".partial.csv") if as_parquet else output
+
+    jobs = load_jobs(args.source)
+    finished = done_ids(csv_path)
+    pending = [job for job in jobs if job["id"] not in finished]
+    print(f"{len(jobs)} recordings, {len(jobs) - len(pending)} already scored, {len(pending)} to go",
+          file=sys.stderr)
+
+    workers = args.workers or os.cpu_count() or 1
+    log_level = logging.INFO if args.verbose else logging.WARNING
+    failed = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(log_level,)) as pool:
+        if pending:
+            n_songs = prepare_references(pending, args.songs_dir, pool)
+            print(f"Reference contours ready for {n_songs} songs", file=sys.stderr)
+
+        write_header = not csv_path.exists() or csv_path.stat().st_size == 0
+        with open(csv_path, "a", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=COLUMNS, extrasaction="ignore")
+            if write_header:
+                writer.writeheader()
+
+            t0 = time.perf_counter()
+            futures = {pool.submit(score_job, job, args.no_stt): job for job in pending}
+            try:
+                for done, future in enumerate(as_completed(futures), 1):
+                    try:
+                        row = future.result()
+                    except BrokenProcessPool:
+                        # A worker died (e.g. out of memory): every job still queued fails with it
+                        print("\nA worker process crashed; re-run the same command to resume.", file=sys.stderr)
+                        raise SystemExit(1)
+                    except Exception as e:
+                        # Unreadable audio, bad lyrics file, ...: record it and carry on, so a
+                        # resumed run doesn't stop at the same recording again
+                        logger.warning(f"{futures[future]['id']}: {e}")
+                        row = error_row(futures[future], str(e) or type(e).__name__)
+                    failed += bool(row.get("error"))
+                    writer.writerow(row)
+                    f.flush()
+                    _progress(done, len(pending), t0)
+            except KeyboardInterrupt:
+                for future in futures:
+                    future.cancel()
+                print("\nInterrupted; re-run the same command to resume.", file=sys.stderr)
+                raise SystemExit(130)
+    if pending:
+        print(file=sys.stderr)
+
+    if as_parquet:
+        write_parquet(csv_path, output)
+        csv_path.unlink()
+    print(f"Wrote {output} ({failed} errors)", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-score archived performances in parallel.")
+    parser.add_argument("source", help="Directory of recordings with sidecar JSON, or a JSONL manifest.")
+    parser.add_argument("-o", "--output", required=True, help="Output file (.csv, or .parquet with pyarrow).")
+    parser.add_argument("--songs-dir", default=str(DEFAULT_SONGS_DIR), help="Song library to resolve song_id in.")
+    parser.add_argument("--workers", type=int, default=0, help="Worker processes (default: one per core).")
+    parser.add_argument("--no-stt", action="store_true",
+                        help="Don't call Whisper for recordings without a stored transcript.")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Show the evaluator's logs.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+    run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,34 +2,51 @@ import asyncio
 import logging
 import json
 import os
+import sys
 import tempfile
 import base64
+from pathlib import Path
+
+# Make the shared `common` package importable when run as a script
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common.audio_buffer import AttachedAudio
+from common.metrics import instrument_tool
+from common.startup_profile import mark_ready, start_background_warmup
+
 from mcp.server.fastmcp import FastMCP
-from audio_tools.audio_analysis import analyze_audio
+from audio_tools.audio_analysis import analyze_audio, warm_up, HEAVY_MODULES
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("SingingEvaluatorMCP")
 
+# Set EVALUATOR_WARMUP=0 to skip the synthetic warm-up analysis at startup
+WARMUP_ENABLED = os.getenv("EVALUATOR_WARMUP", "1") != "0"
+
 # Initialize FastMCP Server
 mcp = FastMCP("Singing Evaluator")
 
 @mcp.tool()
-def evaluate_singing(audio_path: str, reference_lyrics_json: str = None, reference_audio_path: str = None) -> str:
+@instrument_tool
+def evaluate_singing(audio_path: str = "", reference_lyrics_json: str = None, reference_audio_path: str = None,
+                     offset: float = 0.0, audio_buffer: str = None) -> str:
     """
     Analyzes singing audio to provide pitch and rhythm scores.
     
     Args:
-        audio_path: Path to the WAV audio file.
-        reference_lyrics_json: JSON string of lyrics with timing data.
+        audio_path: Path to the WAV audio file (ignored if audio_buffer is given).
+        reference_lyrics_json: JSON string of lyrics with timing data: a compact timeline
+            ({"t", "end", "text", ...}, see common.timeline) or a list of {"timestamp", "text"} lines.
         reference_audio_path: Path to the original song audio file (for comparison).
+        offset: Sync offset (seconds) between the song and the recording.
+        audio_buffer: Shared-memory descriptor of the already decoded recording (set by the host).
         
     Returns:
         JSON string containing the evaluation results (pitch_score, rhythm_score, etc.)
     """
     try:
         # Verify file exists
-        if not os.path.exists(audio_path):
+        if not audio_buffer and not os.path.exists(audio_path):
             return json.dumps({"error": f"Audio file not found: {audio_path}"})
 
         # Parse lyrics
@@ -41,12 +58,26 @@ def evaluate_singing(audio_path: str, reference_lyrics_json: str = None, referen
                 logger.warning(f"Failed to parse reference_lyrics JSON: {e}")
 
         # Analyze
-        logger.info(f"Analyzing audio file: {audio_path}")
-        result = analyze_audio(
-            audio_path,
-            reference_lyrics=lyrics_data,
-            reference_audio_path=reference_audio_path
-        )
+        if audio_buffer:
+            # Decoded by the host; read it straight from shared memory
+            with AttachedAudio(audio_buffer) as (y, sr):
+                logger.info(f"Analyzing shared audio buffer ({len(y) / sr:.1f}s @ {sr}Hz)")
+                result = analyze_audio(
+                    None,
+                    reference_lyrics=lyrics_data,
+                    reference_audio_path=reference_audio_path,
+                    offset=offset,
+                    audio=(y, sr)
+                )
+                del y
+        else:
+            logger.info(f"Analyzing audio file: {audio_path}")
+            result = analyze_audio(
+                audio_path,
+                reference_lyrics=lyrics_data,
+                reference_audio_path=reference_audio_path,
+                offset=offset
+            )
         
         return json.dumps(result)
 
@@ -55,4 +86,8 @@ def evaluate_singing(audio_path: str, reference_lyrics_json: str = None, referen
         return json.dumps({"error": str(e)})
 
 if __name__ == "__main__":
+    # Serve the handshake right away; librosa & co. load in the background and
+    # a synthetic analysis primes librosa's caches before the first real request
+    mark_ready()
+    start_background_warmup(HEAVY_MODULES, callback=warm_up if WARMUP_ENABLED else None)
     mcp.run()
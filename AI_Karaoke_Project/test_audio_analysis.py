@@ -0,0 +1,179 @@
+import numpy as np
+import pytest
+
+from singing_evaluator_agent.audio_tools.audio_analysis import (TIMING_TOLERANCE, align_words, analyze_lyrics_diff,
+                                                                 calculate_line_timing, expected_word_onsets)
+
+SR = 22050
+
+# Three lines, each sung for 3 s, with a second's pause before the next
+LINES = {"t": [2.0, 6.0, 10.0], "end": [5.0, 9.0, 13.0], "text": ["one two three", "four five six", "seven eight"]}
+
+
+def voice(*spans, duration=16.0):
+    """A tone during each (start, end) span, silence elsewhere."""
+    y = np.zeros(int(duration * SR), dtype=np.float32)
+    for start, end in spans:
+        i, j = int(start * SR), int(end * SR)
+        y[i:j] = 0.5 * np.sin(2 * np.pi * 220.0 * np.arange(j - i) / SR)
+    return y
+
+
+def statuses(line_timing):
+    return [line["status"] for line in line_timing]
+
+
+def test_on_time_singing():
+    score, line_timing = calculate_line_timing(voice((2, 5), (6, 9), (10, 13)), SR, LINES)
+    assert statuses(line_timing) == ["on_time"] * 3
+    assert all(abs(line["offset"]) <= TIMING_TOLERANCE for line in line_timing)
+    assert score > 0.9
+
+
+def test_continuous_singing_is_on_time_not_missed():
+    # No pause between lines: the singing that started with line 0 carries every line
+    score, line_timing = calculate_line_timing(voice((2, 13)), SR, LINES)
+    assert statuses(line_timing) == ["on_time"] * 3
+    assert score > 0.9
+
+
+def test_late_and_early_onsets():
+    _, line_timing = calculate_line_timing(voice((3, 5), (5.2, 9), (10, 13)), SR, LINES)
+    assert statuses(line_timing) == ["late", "early", "on_time"]
+    assert line_timing[0]["offset"] == pytest.approx(1.0, abs=0.1)
+    assert line_timing[1]["offset"] == pytest.approx(-0.8, abs=0.1)
+
+
+def test_previous_lines_tail_is_not_the_next_lines_onset():
+    # Line 0 runs a little long into line 1's early window; line 1 itself starts 1 s late
+    _, line_timing = calculate_line_timing(voice((2, 5.2), (7, 9), (10, 13)), SR, LINES)
+    assert line_timing[1]["status"] == "late"
+    assert line_timing[1]["offset"] == pytest.approx(1.0, abs=0.1)
+
+
+def test_silent_line_is_missed():
+    # Line 1's tail reaches into line 2's early window, but isn't line 2
+    _, line_timing = calculate_line_timing(voice((2, 5), (6, 9)), SR, LINES)
+    assert statuses(line_timing) == ["on_time", "on_time", "missed"]
+    assert line_timing[2]["offset"] is None
+
+
+def test_no_lyrics():
+    assert calculate_line_timing(voice((2, 5)), SR, []) == (0.0, [])
+
+
+# === WORD ALIGNMENT ===
+
+def heard(*words):
+    """Timestamped STT words from (word, start) pairs."""
+    return [{"word": word, "start": start} for word, start in words]
+
+
+def test_expected_onsets_spread_over_the_sung_span():
+    words, lines, onsets = expected_word_onsets({"t": [10.0], "end": [13.0], "text": ["one two three"]})
+    assert words == ["one", "two", "three"]
+    assert lines == [0, 0, 0]
+    assert onsets == pytest.approx([10.0, 11.0, 12.0])
+
+
+def test_expected_onsets_drop_punctuation_tokens_with_their_word_times():
+    timeline = {"t": [10.0, 20.0], "end": [14.0, 23.0], "text": ["rock - and roll", "me & you"],
+                "words": [[10.0, 11.0, 12.0, 13.0], None]}
+    words, lines, onsets = expected_word_onsets(timeline)
+    assert words == ["rock", "and", "roll", "me", "you"]
+    assert lines == [0, 0, 0, 1, 1]
+    # Word-timed line keeps each word's own time; the untimed one spreads its two words
+    assert onsets == pytest.approx([10.0, 12.0, 13.0, 20.0, 21.5])
+
+
+def test_align_words_follows_the_transcript():
+    timeline = {"t": [10.0], "end": [13.0], "text": ["Is this the real life"]}
+    result = align_words(heard(("is", 10.1), ("this", 10.7), ("the", 11.3), ("real", 11.9), ("life", 12.6)),
+                         timeline)
+    assert result["word"] == ["Is", "this", "the", "real", "life"]
+    assert result["actual"] == [10.1, 10.7, 11.3, 11.9, 12.6]
+    assert result["error"] == pytest.approx([0.1, 0.1, 0.1, 0.1, 0.2])
+
+
+def test_align_words_skips_extra_and_missing_words():
+    timeline = {"t": [10.0], "end": [15.0], "text": ["one two three four five"]}
+    # An extra "um", then "three" not sung
+    result = align_words(heard(("one", 10.0), ("um", 10.5), ("two", 11.0), ("four", 13.0), ("five", 14.0)),
+                         timeline)
+    assert result["actual"] == [10.0, 11.0, None, 13.0, 14.0]
+    assert result["error"][2] is None
+
+
+def test_align_words_misheard_word_keeps_its_time():
+    timeline = {"t": [10.0], "end": [13.0], "text": ["one two three"]}
+    result = align_words(heard(("one", 10.0), ("blue", 11.1), ("three", 12.0)), timeline)
+    assert result["actual"] == [10.0, 11.1, 12.0]
+
+
+def test_align_words_keeps_columns_aligned_with_punctuation():
+    timeline = {"t": [10.0], "end": [14.0], "text": ["rock - and roll"], "words": [[10.0, 11.0, 12.0, 13.0]]}
+    result = align_words(heard(("rock", 10.2), ("and", 12.1), ("roll", 13.3)), timeline)
+    assert result["word"] == ["rock", "and", "roll"]
+    assert result["error"] == pytest.approx([0.2, 0.1, 0.3])
+
+
+def test_align_words_without_transcript():
+    result = align_words([], {"t": [1.0], "end": [2.0], "text": ["hi there"]})
+    assert result["actual"] == [None, None]
+
+
+# === LYRICS DIFF ===
+
+SONG = [
+    {"timestamp": 10.0, "text": "Is this the real life"},
+    {"timestamp": 13.0, "text": "Is this just fantasy"},
+    {"timestamp": 16.0, "text": "Caught in a landslide"},
+]
+
+
+def statuses_by_word(diff):
+    return [(entry["word"], entry["status"]) for entry in diff]
+
+
+def test_diff_of_an_exact_transcript():
+    diff = analyze_lyrics_diff("is this the real life is this just fantasy caught in a landslide", SONG)
+    assert [entry["status"] for entry in diff] == ["matched"] * 13
+    # Reference spelling is kept for display
+    assert diff[0]["word"] == "Is"
+
+
+def test_diff_marks_missing_extra_and_wrong_words():
+    diff = analyze_lyrics_diff("is this the real life yeah is this just dream caught in landslide", SONG)
+    result = statuses_by_word(diff)
+    assert ("yeah", "extra") in result
+    assert ("a", "missing") in result
+    assert ("fantasy", "wrong") in result
+    assert next(entry for entry in diff if entry["word"] == "fantasy")["heard"] == "dream"
+
+
+def test_diff_accepts_close_misspellings():
+    diff = analyze_lyrics_diff("is this the reel life", SONG[:1])
+    assert [entry["status"] for entry in diff] == ["matched"] * 5
+
+
+def test_timed_transcript_places_words_in_their_lines():
+    # Line 1 skipped entirely; the timestamps put the rest where it belongs
+    words = [{"word": w, "start": 10.0 + 0.5 * k} for k, w in enumerate("is this the real life".split())]
+    words += [{"word": w, "start": 16.0 + 0.5 * k} for k, w in enumerate("caught in a landslide".split())]
+    diff = analyze_lyrics_diff("", SONG, transcript_words=words)
+    assert [entry["status"] for entry in diff] == ["matched"] * 5 + ["missing"] * 4 + ["matched"] * 4
+
+
+def test_repeated_lines_stay_in_order():
+    chorus = [{"timestamp": 10.0 + 3 * k, "text": text} for k, text in
+              enumerate(["oh baby baby", "how was I supposed to know", "oh baby baby", "I shouldnt have let you go"])]
+    diff = analyze_lyrics_diff("oh baby baby how was i supposed to know oh baby baby i shouldnt have let you go",
+                               chorus)
+    assert [entry["word"] for entry in diff] == " ".join(line["text"] for line in chorus).split()
+    assert all(entry["status"] == "matched" for entry in diff)
+
+
+def test_nothing_heard():
+    diff = analyze_lyrics_diff("", SONG)
+    assert [entry["status"] for entry in diff] == ["missing"] * 13
+    assert analyze_lyrics_diff("anything", []) == []
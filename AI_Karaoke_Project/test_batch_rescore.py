@@ -0,0 +1,57 @@
+import csv
+import importlib.util
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+SCRIPT = Path(__file__).resolve().parent / "singing_evaluator_agent" / "batch_rescore.py"
+
+
+def rescore(*args):
+    return subprocess.run([sys.executable, str(SCRIPT), *map(str, args)], capture_output=True, text=True,
+                          timeout=300)
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    sr = 16000
+    t = np.arange(2 * sr) / sr
+    sf.write(tmp_path / "take.wav", (0.3 * np.sin(2 * np.pi * 220 * t)).astype(np.float32), sr)
+    (tmp_path / "lyrics.json").write_text(json.dumps([{"timestamp": 0.2, "text": "la la la"}]))
+    jobs = [
+        {"id": "broken", "audio": "take.wav", "lyrics": "missing.json", "transcript": ""},
+        {"id": "good", "audio": "take.wav", "lyrics": "lyrics.json", "transcript": "la la la"},
+    ]
+    path = tmp_path / "manifest.jsonl"
+    path.write_text("".join(json.dumps(job) + "\n" for job in jobs))
+    return path
+
+
+def test_a_failing_recording_gets_an_error_row(manifest, tmp_path):
+    output = tmp_path / "out.csv"
+    result = rescore(manifest, "-o", output, "--workers", "1", "--no-stt")
+
+    assert result.returncode == 0, result.stderr
+    with open(output, newline="") as f:
+        rows = {row["id"]: row for row in csv.DictReader(f)}
+    assert "missing.json" in rows["broken"]["error"]
+    assert rows["good"]["error"] == ""
+    assert float(rows["good"]["overall_score"]) >= 0
+
+    # A resumed run skips both: the failure is recorded, not retried forever
+    result = rescore(manifest, "-o", output, "--workers", "1", "--no-stt")
+    assert "0 to go" in result.stderr + result.stdout
+
+
+@pytest.mark.skipif(importlib.util.find_spec("pyarrow") is not None, reason="pyarrow is installed")
+def test_parquet_without_pyarrow_fails_before_scoring(manifest, tmp_path):
+    result = rescore(manifest, "-o", tmp_path / "out.parquet", "--workers", "1", "--no-stt")
+
+    assert result.returncode != 0
+    assert "pyarrow" in result.stderr
+    assert not (tmp_path / "out.parquet.partial.csv").exists()
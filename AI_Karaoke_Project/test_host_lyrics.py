@@ -0,0 +1,109 @@
+import asyncio
+import json
+
+import pytest
+
+import host_agent.agentic_host as agentic_host
+from host_agent.agentic_host import KaraokeHost
+
+LYRICS = {"title": "Hello", "timeline": {"t": [1.0, 4.0], "end": [4.0, 7.0], "text": ["Hello", "It's me"]}}
+
+
+def play_song_result(file_path, title="Adele - Hello (Official Music Video)"):
+    """What the audio agent's play_song tool returns (audio_playback_agent/mcp_server.py)."""
+    return {
+        "status": "success",
+        "track": title,
+        "url": f"/songs/{file_path.name}",
+        "file_path": str(file_path),
+        "is_sing_king": False,
+        "renditions": {"original": f"/songs/{file_path.name}"},
+        "melody_ready": False,
+    }
+
+
+class FakeTools:
+    """call_tool stand-in: records calls, answers search_lyrics from `lyrics_for(query)`."""
+
+    def __init__(self, lyrics_for, play_result=None, delay=0.05):
+        self.lyrics_for = lyrics_for
+        self.play_result = play_result
+        self.delay = delay
+        self.calls = []
+        self.cancelled = []
+
+    async def __call__(self, name, args):
+        self.calls.append((name, args["query"]))
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled.append((name, args["query"]))
+            raise
+        if name == "play_song":
+            return json.dumps(self.play_result) if self.play_result else None
+        result = self.lyrics_for(args["query"])
+        return json.dumps(result) if result is not None else None
+
+
+@pytest.fixture
+def host(tmp_path, monkeypatch):
+    monkeypatch.setattr(agentic_host, "SONGS_DIR", tmp_path)
+    return KaraokeHost()
+
+
+def test_song_lyrics_searches_the_resolved_track_title(host, tmp_path):
+    host.call_tool = tools = FakeTools(lambda query: LYRICS)
+    audio_data = play_song_result(tmp_path / "abc123.mp4")
+
+    lyrics = asyncio.run(host.song_lyrics(audio_data, "hello"))
+
+    assert tools.calls == [("search_lyrics", "adele hello")]
+    assert lyrics == LYRICS
+    # Stored next to the song: the next play doesn't search
+    assert json.loads((tmp_path / "abc123.lyrics.json").read_text()) == LYRICS
+    assert asyncio.run(host.song_lyrics(audio_data, "something else")) == LYRICS
+    assert len(tools.calls) == 1
+
+
+def test_song_lyrics_falls_back_to_the_query(host, tmp_path):
+    host.call_tool = tools = FakeTools(lambda query: LYRICS if query == "hello" else {"error": "not found"})
+
+    lyrics = asyncio.run(host.song_lyrics(play_song_result(tmp_path / "abc123.mp4"), "hello"))
+
+    assert tools.calls == [("search_lyrics", "adele hello"), ("search_lyrics", "hello")]
+    assert lyrics == LYRICS
+
+
+def test_song_lyrics_misses_are_not_stored(host, tmp_path):
+    host.call_tool = FakeTools(lambda query: {"error": "not found"})
+
+    lyrics = asyncio.run(host.song_lyrics(play_song_result(tmp_path / "abc123.mp4"), "hello"))
+
+    assert lyrics.get("error")
+    assert not (tmp_path / "abc123.lyrics.json").exists()
+
+
+def test_play_song_with_lyrics_cancels_prefetch_for_stored_song(host, tmp_path, monkeypatch):
+    monkeypatch.setattr(agentic_host, "LYRICS_PREFETCH_AFTER", 0.01)
+    song = tmp_path / "abc123.mp4"
+    (tmp_path / "abc123.lyrics.json").write_text(json.dumps(LYRICS))
+    host.call_tool = tools = FakeTools(lambda query: LYRICS, play_song_result(song), delay=0.2)
+
+    audio_data, lyrics = asyncio.run(host.play_song_with_lyrics("hello"))
+
+    assert audio_data["track"].startswith("Adele")
+    assert lyrics == LYRICS
+    assert tools.cancelled == [("search_lyrics", "hello")]
+
+
+def test_play_song_with_lyrics_cancels_prefetch_when_play_song_returns_nothing(host, monkeypatch):
+    monkeypatch.setattr(agentic_host, "LYRICS_PREFETCH_AFTER", 0.01)
+    host.call_tool = tools = FakeTools(lambda query: LYRICS, play_result=None, delay=0.2)
+
+    async def play():
+        result = await host.play_song_with_lyrics("hello")
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(play()) == (None, None)
+    assert tools.cancelled == [("search_lyrics", "hello")]
@@ -0,0 +1,60 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import host_agent.agentic_host as agentic_host
+
+
+class RecordingHost:
+    """host_agent stand-in that records tool calls."""
+
+    def __init__(self):
+        self.calls = []
+
+    async def call_tool(self, name, args):
+        self.calls.append(name)
+        return None
+
+
+@pytest.fixture
+def client(monkeypatch):
+    host = RecordingHost()
+    monkeypatch.setattr(agentic_host, "host_agent", host)
+    client = TestClient(agentic_host.app)
+    client.host = host
+    return client
+
+
+def test_chunks_must_continue_the_upload(client):
+    upload_id = client.post("/api/uploads").json()["upload_id"]
+
+    assert client.put(f"/api/uploads/{upload_id}?offset=0", content=b"abcd").json()["received"] == 4
+    # A resent chunk is ignored; a gap is rejected with where to resume
+    assert client.put(f"/api/uploads/{upload_id}?offset=2", content=b"cd").json()["received"] == 4
+    response = client.put(f"/api/uploads/{upload_id}?offset=10", content=b"xyz")
+    assert response.status_code == 409
+    assert response.json()["received"] == 4
+    assert client.get(f"/api/uploads/{upload_id}").json()["received"] == 4
+
+
+def test_empty_upload_is_rejected_before_evaluation(client):
+    upload_id = client.post("/api/uploads").json()["upload_id"]
+
+    response = client.post("/api/submit_performance", data={"personality": "kind_grandma", "upload_id": upload_id})
+
+    assert response.status_code == 400
+    assert client.host.calls == []
+    # The upload is gone either way
+    assert client.get(f"/api/uploads/{upload_id}").status_code == 404
+
+
+def test_empty_audio_file_is_rejected_before_evaluation(client):
+    response = client.post("/api/submit_performance", data={"personality": "kind_grandma"},
+                           files={"audio_file": ("take.webm", b"", "audio/webm")})
+
+    assert response.status_code == 400
+    assert client.host.calls == []
+
+
+def test_unknown_upload_is_404(client):
+    response = client.post("/api/submit_performance", data={"personality": "kind_grandma", "upload_id": "nope"})
+    assert response.status_code == 404
@@ -0,0 +1,72 @@
+import pytest
+
+from common.lrc import parse_lrc, parse_time
+from common.timeline import SECONDS_PER_WORD
+
+
+@pytest.mark.parametrize("tag, seconds", [
+    ("01:02.50", 62.5),
+    ("01:02:50", 62.5),
+    ("01:02", 62.0),
+    ("ti:Song", None),
+])
+def test_parse_time(tag, seconds):
+    assert parse_time(tag) == seconds
+
+
+def test_plain_lines_are_sorted_and_headers_skipped():
+    timeline = parse_lrc("[ar:Queen]\n[ti:Bohemian Rhapsody]\n"
+                         "[00:20.00]Second line here\n[00:10.00]First line\n")
+    assert timeline["t"] == [10.0, 20.0]
+    assert timeline["text"] == ["First line", "Second line here"]
+    assert "words" not in timeline
+
+
+def test_multi_tag_line_is_sung_at_every_time():
+    timeline = parse_lrc("[00:05.00]Verse\n[00:10.00][00:30.00]Chorus line\n[00:20.00]Bridge\n")
+    assert timeline["t"] == [5.0, 10.0, 20.0, 30.0]
+    assert timeline["text"] == ["Verse", "Chorus line", "Bridge", "Chorus line"]
+
+
+def test_line_ends():
+    timeline = parse_lrc("[00:10.00]one two\n[00:12.00]\n[00:20.00]three four five\n[00:21.00]six\n")
+    # A blank stamped line ends the line before it
+    assert timeline["end"][0] == 12.0
+    # Otherwise the estimate, cut off by the next line
+    assert timeline["end"][1] == 21.0
+    assert timeline["end"][2] == pytest.approx(21.0 + SECONDS_PER_WORD)
+    assert timeline["text"] == ["one two", "three four five", "six"]
+
+
+def test_enhanced_word_tags():
+    timeline = parse_lrc("[00:12.00]<00:12.00>Is <00:12.48>this <00:13.10>the <00:13.40>real <00:14.02>life<00:15.10>\n"
+                         "[00:16.00]Plain line\n")
+    assert timeline["text"] == ["Is this the real life", "Plain line"]
+    assert timeline["words"][0] == pytest.approx([12.0, 12.48, 13.1, 13.4, 14.02])
+    assert timeline["words"][1] is None
+    # The trailing tag ends the line
+    assert timeline["end"][0] == pytest.approx(15.1)
+
+
+def test_word_split_across_tags_is_one_word():
+    timeline = parse_lrc("[00:10.00]<00:10.00>Bo<00:10.30>hemian <00:11.00>rhapsody<00:12.00>\n")
+    assert timeline["text"] == ["Bohemian rhapsody"]
+    assert timeline["words"][0] == pytest.approx([10.0, 11.0])
+
+
+def test_enhanced_chorus_keeps_word_timing_per_repeat():
+    timeline = parse_lrc("[00:10.00][00:40.00]<00:10.00>la <00:10.50>la<00:11.00>\n")
+    assert timeline["words"] == [pytest.approx([10.0, 10.5]), pytest.approx([40.0, 40.5])]
+    assert timeline["end"] == pytest.approx([11.0, 41.0])
+
+
+@pytest.mark.parametrize("header, shift", [("[offset:+250]", -0.25), ("[offset:-500]", 0.5), ("", 0.0)])
+def test_offset_header(header, shift):
+    timeline = parse_lrc(f"{header}\n[00:10.00]<00:10.00>Hello <00:10.50>there<00:11.00>\n")
+    assert timeline["t"] == pytest.approx([10.0 + shift])
+    assert timeline["end"] == pytest.approx([11.0 + shift])
+    assert timeline["words"][0] == pytest.approx([10.0 + shift, 10.5 + shift])
+
+
+def test_empty_input():
+    assert parse_lrc("") == {"t": [], "end": [], "text": []}
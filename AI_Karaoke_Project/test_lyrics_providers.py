@@ -0,0 +1,75 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+from lyrics_display_agent.api_connectors import providers
+
+LRC = "[00:01.00]First line\n[00:04.00]Second line\n[00:07.00]Third line\n"
+
+
+class FakeProvider:
+    """syncedlyrics provider stand-in: answers get_lrc after `delay` seconds."""
+
+    def __init__(self, delay, synced=None, unsynced=None):
+        self.delay = delay
+        self.lyrics = SimpleNamespace(synced=synced, unsynced=unsynced)
+
+    def get_lrc(self, query):
+        time.sleep(self.delay)
+        return self.lyrics
+
+
+@pytest.fixture
+def clients(monkeypatch):
+    clients = {}
+    monkeypatch.setattr(providers, "synced_clients", lambda: clients)
+    monkeypatch.setattr(providers, "get_genius", lambda: None)
+    return clients
+
+
+def test_first_synced_answer_wins(clients):
+    clients.update(slow=FakeProvider(1.0, synced=LRC), fast=FakeProvider(0.01, synced=LRC))
+
+    t0 = time.monotonic()
+    result = providers.search("song")
+
+    assert result == {"provider": "fast", "lrc": LRC}
+    assert time.monotonic() - t0 < 0.5
+
+
+def test_plain_text_is_the_fallback(clients):
+    clients.update(plain=FakeProvider(0.01, unsynced="Just words"),
+                   stub=FakeProvider(0.01, synced="[00:01.00]Instrumental\n"))
+
+    assert providers.search("song") == {"provider": "plain", "text": "Just words"}
+
+
+def test_search_gives_up_after_search_timeout(clients, monkeypatch):
+    monkeypatch.setattr(providers, "SEARCH_TIMEOUT", 0.2)
+    clients.update(dead=FakeProvider(1.0, synced=LRC))
+
+    t0 = time.monotonic()
+    assert providers.search("song") is None
+    assert time.monotonic() - t0 < 0.5
+
+
+def test_concurrent_lookups_do_not_starve(clients, monkeypatch):
+    # Four providers that hang past the lookup's deadline and one that answers at once.
+    # Every lookup abandons the hanging ones; later lookups mustn't queue behind them.
+    monkeypatch.setattr(providers, "SEARCH_TIMEOUT", 0.5)
+    for name in ("hang1", "hang2", "hang3", "hang4"):
+        clients[name] = FakeProvider(1.5, synced=LRC)
+    clients["fast"] = FakeProvider(0.05, synced=LRC)
+
+    def timed_search(i):
+        t0 = time.monotonic()
+        return providers.search(f"song {i}"), time.monotonic() - t0
+
+    with ThreadPoolExecutor(max_workers=6) as callers:
+        results = list(callers.map(timed_search, range(6)))
+
+    for result, elapsed in results:
+        assert result == {"provider": "fast", "lrc": LRC}
+        assert elapsed < 0.4
@@ -0,0 +1,84 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from common.media import create_media_app, parse_range
+
+SIZE = 1000
+
+
+@pytest.mark.parametrize("header, span", [
+    ("bytes=0-99", (0, 100)),
+    ("bytes=100-", (100, SIZE)),
+    ("bytes=-100", (SIZE - 100, SIZE)),
+    ("bytes=-5000", (0, SIZE)),
+    ("bytes=900-5000", (900, SIZE)),
+    ("bytes = 0 - 9", (0, 10)),
+])
+def test_parse_range(header, span):
+    assert parse_range(header, SIZE) == span
+
+
+@pytest.mark.parametrize("header", [
+    "bytes=5-3",         # last < first: invalid, so ignored (RFC 9110)
+    "bytes=0-1,5-9",     # multiple ranges
+    "items=0-9",
+    "bytes=-",
+])
+def test_parse_range_ignores_unusable_headers(header):
+    assert parse_range(header, SIZE) is None
+
+
+@pytest.mark.parametrize("header", ["bytes=1000-", "bytes=5000-6000", "bytes=-0"])
+def test_parse_range_unsatisfiable(header):
+    with pytest.raises(ValueError):
+        parse_range(header, SIZE)
+
+
+@pytest.fixture
+def client(tmp_path):
+    (tmp_path / "abc123.mp4").write_bytes(bytes(range(256)) * 4)
+    (tmp_path / "library.json").write_text("{}")
+    return TestClient(create_media_app(tmp_path))
+
+
+def test_full_file_is_cacheable(client):
+    response = client.get("/abc123.mp4")
+    assert response.status_code == 200
+    assert len(response.content) == 1024
+    assert response.headers["accept-ranges"] == "bytes"
+    assert "immutable" in response.headers["cache-control"]
+
+
+def test_range_request(client):
+    response = client.get("/abc123.mp4", headers={"Range": "bytes=10-19"})
+    assert response.status_code == 206
+    assert response.content == bytes(range(10, 20))
+    assert response.headers["content-range"] == "bytes 10-19/1024"
+
+
+def test_invalid_range_serves_the_whole_file(client):
+    response = client.get("/abc123.mp4", headers={"Range": "bytes=5-3"})
+    assert response.status_code == 200
+    assert len(response.content) == 1024
+
+
+def test_range_past_the_end_is_416(client):
+    response = client.get("/abc123.mp4", headers={"Range": "bytes=2000-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == "bytes */1024"
+
+
+def test_etag_revalidation_and_if_range(client):
+    etag = client.head("/abc123.mp4").headers["etag"]
+
+    assert client.get("/abc123.mp4", headers={"If-None-Match": etag}).status_code == 304
+    # If-Range with the current ETag honours the range, with another one sends everything
+    assert client.get("/abc123.mp4", headers={"Range": "bytes=0-9", "If-Range": etag}).status_code == 206
+    stale = client.get("/abc123.mp4", headers={"Range": "bytes=0-9", "If-Range": '"abc123-old"'})
+    assert stale.status_code == 200
+    assert len(stale.content) == 1024
+
+
+def test_only_media_is_served(client):
+    assert client.get("/library.json").status_code == 404
+    assert client.get("/missing.mp4").status_code == 404
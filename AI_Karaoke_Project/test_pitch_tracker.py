@@ -0,0 +1,85 @@
+import struct
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+import host_agent.agentic_host as agentic_host
+from common.pitch_tracker import PitchTracker, hz_to_midi, note_name, parse_chunk, yin_pitch
+
+SR = 16000
+
+
+def chunk(song_time, samples):
+    return struct.pack("<d", song_time) + np.asarray(samples, dtype="<f4").tobytes()
+
+
+def sine(freq, seconds=0.2, sr=SR, amplitude=0.5):
+    return (amplitude * np.sin(2 * np.pi * freq * np.arange(int(seconds * sr)) / sr)).astype(np.float32)
+
+
+def test_parse_chunk():
+    song_time, samples = parse_chunk(chunk(12.5, [0.25, -0.5]))
+    assert song_time == 12.5
+    assert samples.tolist() == [0.25, -0.5]
+    # A header alone is a valid, empty chunk
+    assert len(parse_chunk(chunk(1.0, []))[1]) == 0
+
+
+@pytest.mark.parametrize("data", [b"", b"1234567", chunk(1.0, [0.5]) + b"\x00", b"\x00" * 9])
+def test_parse_chunk_rejects_malformed_data(data):
+    with pytest.raises(ValueError):
+        parse_chunk(data)
+
+
+@pytest.mark.parametrize("freq", [110.0, 220.0, 440.0, 880.0])
+def test_yin_pitch(freq):
+    assert yin_pitch(sine(freq, 0.1), SR) == pytest.approx(freq, rel=0.01)
+
+
+def test_yin_pitch_noise_is_unvoiced():
+    rng = np.random.default_rng(0)
+    assert yin_pitch(rng.standard_normal(2048), SR) is None
+
+
+def test_note_names():
+    assert note_name(hz_to_midi(440.0)) == "A4"
+    assert note_name(hz_to_midi(261.63)) == "C4"
+
+
+def test_tracker_reports_once_the_frame_is_full():
+    tracker = PitchTracker(SR)
+    samples = sine(220.0, 1.0)
+    first = tracker.push(samples[:256], song_time=1.0)
+    assert first["f0"] is None
+    result = tracker.push(samples[256:], song_time=2.0)
+    assert result["note"] == "A3"
+    assert result["t"] == pytest.approx(2.0 - 0.5 * tracker.frame_length / SR, abs=1e-3)
+
+
+def test_tracker_silence_is_unvoiced():
+    tracker = PitchTracker(SR)
+    assert tracker.push(np.zeros(tracker.frame_length, dtype=np.float32), 1.0)["f0"] is None
+
+
+@pytest.fixture
+def client():
+    return TestClient(agentic_host.app)
+
+
+@pytest.mark.parametrize("sample_rate", [0, 4000, 192000])
+def test_stream_rejects_unsupported_sample_rates(client, sample_rate):
+    with client.websocket_connect(f"/ws/pitch?sample_rate={sample_rate}") as ws:
+        with pytest.raises(WebSocketDisconnect) as excinfo:
+            ws.receive_json()
+    assert excinfo.value.code == 1008
+
+
+def test_stream_skips_malformed_chunks(client):
+    with client.websocket_connect(f"/ws/pitch?sample_rate={SR}") as ws:
+        ws.send_bytes(b"\x01\x02\x03")
+        ws.send_text("not audio")
+        ws.send_bytes(chunk(3.0, sine(440.0, 0.3)))
+        result = ws.receive_json()
+    assert result["note"] == "A4"
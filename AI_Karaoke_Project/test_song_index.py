@@ -0,0 +1,84 @@
+import json
+import os
+
+import pytest
+
+from common.song_index import LibrarySearch, SongIndex, split_title, trigrams
+
+SONGS = [
+    {"id": "queen", "title": "Queen - Bohemian Rhapsody (Karaoke Version)", "file": "queen.mp4",
+     "queries": ["bohemian rhapsody"], "duration": 355},
+    {"id": "adele", "title": "Adele - Hello", "file": "adele.mp4", "queries": ["hello"]},
+    {"id": "abba", "title": "ABBA - Dancing Queen", "file": "abba.mp4", "queries": []},
+    {"id": "toto", "title": "Toto - Africa", "file": "toto.mp4", "queries": ["africa toto"]},
+]
+
+
+def test_trigrams_pad_word_starts():
+    assert trigrams("bo") == {"  b", " bo", "bo "}
+    assert trigrams("") == set()
+
+
+def test_split_title():
+    assert split_title("Queen - Bohemian Rhapsody (Karaoke Version)") == ("bohemian rhapsody", "queen")
+    assert split_title("Hello") == ("hello", "")
+
+
+@pytest.fixture
+def index():
+    return SongIndex(SONGS)
+
+
+@pytest.mark.parametrize("query, best", [
+    ("bohemian", "queen"),
+    ("bohemain rapsody", "queen"),   # typos
+    ("bohem", "queen"),              # prefix while typing
+    ("africa", "toto"),
+    ("dancing", "abba"),
+])
+def test_search_finds_the_song(index, query, best):
+    results = index.search(query)
+    assert results[0]["id"] == best
+
+
+def test_search_result_fields(index):
+    [result] = index.search("hello", limit=1)
+    assert result["song"] == "hello"
+    assert result["artist"] == "adele"
+    assert result["url"] == "/songs/adele.mp4"
+    assert 0 < result["score"] <= 100
+
+
+def test_artist_finds_all_their_songs(index):
+    ids = [result["id"] for result in index.search("queen")]
+    assert set(ids) >= {"queen", "abba"}
+
+
+@pytest.mark.parametrize("query", ["", "karaoke", "zzzz qqqq"])
+def test_no_results(index, query):
+    assert index.search(query) == []
+
+
+def test_library_search_rebuilds_when_the_library_changes(tmp_path):
+    search = LibrarySearch(tmp_path)
+    assert search.search("hello") == []
+
+    def write_library(songs):
+        (tmp_path / "library.json").write_text(json.dumps({"songs": {s["id"]: s for s in songs}}))
+    for song in SONGS:
+        (tmp_path / song["file"]).write_bytes(b"")
+    write_library(SONGS[:1])
+    assert [r["id"] for r in search.search("bohemian")] == ["queen"]
+    assert search.search("hello") == []
+
+    write_library(SONGS)
+    # Make sure the change is visible even on filesystems with coarse mtimes
+    os.utime(tmp_path / "library.json", ns=(1, 1))
+    assert search.search("hello")[0]["id"] == "adele"
+
+
+def test_library_search_skips_songs_without_a_file(tmp_path):
+    (tmp_path / "library.json").write_text(json.dumps({"songs": {s["id"]: s for s in SONGS}}))
+    (tmp_path / "adele.mp4").write_bytes(b"")
+    assert [r["id"] for r in LibrarySearch(tmp_path).search("hello")] == ["adele"]
+    assert LibrarySearch(tmp_path).search("bohemian") == []
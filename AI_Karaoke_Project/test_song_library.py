@@ -0,0 +1,106 @@
+import pytest
+
+import common.song_library as song_library
+from common.song_library import (MATCH_THRESHOLD, SongLibrary, load_lyrics, lyrics_path, match_score,
+                                 normalize_query, save_lyrics)
+
+
+@pytest.mark.parametrize("text, normalized", [
+    ("Bohemian Rhapsody (Karaoke Version)", "bohemian rhapsody"),
+    ("Adele - Hello (Official Music Video)", "adele hello"),
+    ("Don't Stop Me Now", "dont stop me now"),
+    ("Sing King Karaoke", ""),
+    (None, ""),
+])
+def test_normalize_query(text, normalized):
+    assert normalize_query(text) == normalized
+
+
+def score(query, candidate):
+    return match_score(normalize_query(query), normalize_query(candidate))
+
+
+@pytest.mark.parametrize("query, candidate", [
+    ("bohemian rapsody", "Queen - Bohemian Rhapsody"),        # partial title with a typo
+    ("rhapsody bohemian", "Bohemian Rhapsody"),               # word order
+    ("help me rhonda", "The Beach Boys - Help Me, Rhonda"),
+    ("hello", "hello"),
+])
+def test_match_score_accepts(query, candidate):
+    assert score(query, candidate) >= MATCH_THRESHOLD
+
+
+@pytest.mark.parametrize("query, candidate", [
+    # The candidate's words are a subset of the query's: a different song
+    ("Hello Lionel Richie", "hello"),
+    ("help me rhonda", "Help"),
+    # A single word is too generic for a partial match
+    ("hello", "Adele - Hello"),
+    ("stop me now", "Don't Stop Believin'"),
+])
+def test_match_score_rejects(query, candidate):
+    assert score(query, candidate) < MATCH_THRESHOLD
+
+
+@pytest.fixture
+def library(tmp_path):
+    library = SongLibrary(str(tmp_path))
+    for video_id, title, query in [("adele", "Adele - Hello (Official Music Video)", "hello"),
+                                   ("beatles", "The Beatles - Help!", "help"),
+                                   ("queen", "Queen - Bohemian Rhapsody (Official Video)", "bohemian rhapsody")]:
+        (tmp_path / f"{video_id}.mp4").write_bytes(b"")
+        library.record(video_id, f"{video_id}.mp4", query=query, title=title)
+    return library
+
+
+@pytest.mark.parametrize("query, video_id", [
+    ("bohemian rapsody", "queen"),
+    ("queen bohemian rhapsody", "queen"),
+    ("beatles help", "beatles"),
+    ("Hello Lionel Richie", None),
+    ("help me rhonda", None),
+])
+def test_library_match(library, query, video_id):
+    song, _ = library.match(query)
+    assert (song and song["id"]) == video_id
+
+
+def test_library_match_needs_a_margin(library, tmp_path):
+    (tmp_path / "richie.mp4").write_bytes(b"")
+    library.record("richie", "richie.mp4", query="hello", title="Lionel Richie - Hello")
+    song, score = library.match("hello")
+    assert song is None
+    assert score >= MATCH_THRESHOLD
+
+
+def test_songs_without_a_file_are_skipped(library, tmp_path):
+    (tmp_path / "queen.mp4").unlink()
+    assert library.find_by_query("bohemian rhapsody") is None
+    assert library.match("bohemian rhapsody")[0] is None
+    assert library.find_by_query("hello")["id"] == "adele"
+
+
+def test_library_persists(library, tmp_path):
+    reloaded = SongLibrary(str(tmp_path))
+    assert reloaded.get("queen")["queries"] == ["bohemian rhapsody"]
+
+
+def test_search_cache_expires(library, monkeypatch):
+    results = [{"id": "queen", "title": "Queen - Bohemian Rhapsody"}]
+    library.store_search("Bohemian Rhapsody Karaoke", results)
+    assert library.cached_search("bohemian rhapsody") == results
+
+    monkeypatch.setattr(song_library, "SEARCH_TTL_SECONDS", 0)
+    assert library.cached_search("bohemian rhapsody") is None
+
+
+def test_lyrics_are_stored_next_to_the_song(tmp_path):
+    song = tmp_path / "abc123.mp4"
+    assert lyrics_path(song) == str(tmp_path / "abc123.lyrics.json")
+    assert load_lyrics(song) is None
+
+    save_lyrics(song, {"title": "x", "timeline": {"t": [1.0], "text": ["hi"]}})
+    assert load_lyrics(song)["title"] == "x"
+
+    (tmp_path / "abc123.lyrics.json").write_text("{broken")
+    assert load_lyrics(song) is None
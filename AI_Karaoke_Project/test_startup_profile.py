@@ -0,0 +1,53 @@
+import sys
+import threading
+import time
+import uuid
+
+import pytest
+
+from common import startup_profile
+from common.startup_profile import lazy_module, startup_report, timed_import
+
+
+@pytest.fixture
+def slow_module(tmp_path, monkeypatch):
+    """Name of a fresh module whose import takes 0.3 s and defines DONE only at the end."""
+    name = f"slow_{uuid.uuid4().hex}"
+    (tmp_path / f"{name}.py").write_text("import time\ntime.sleep(0.3)\nDONE = True\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield name
+    sys.modules.pop(name, None)
+
+
+def test_timed_import_records_the_import_time(slow_module):
+    module = timed_import(slow_module)
+    assert module.DONE
+    assert startup_report()["imports_ms"][slow_module] >= 250
+
+
+def test_already_loaded_modules_are_not_recorded():
+    timed_import("json")
+    assert "json" not in startup_profile._import_times
+
+
+def test_concurrent_import_waits_for_the_module(slow_module):
+    first = threading.Thread(target=timed_import, args=(slow_module,))
+    first.start()
+    # Let the first thread get into the import, so the module is in sys.modules but half initialized
+    deadline = time.monotonic() + 2
+    while slow_module not in sys.modules and time.monotonic() < deadline:
+        time.sleep(0.005)
+
+    module = timed_import(slow_module)
+    first.join()
+
+    assert module.DONE
+    assert startup_report()["imports_ms"][slow_module] >= 250
+
+
+def test_lazy_module_imports_on_first_use(slow_module):
+    proxy = lazy_module(slow_module)
+    assert slow_module not in sys.modules
+    assert "not loaded" in repr(proxy)
+    assert proxy.DONE
+    assert "(loaded)" in repr(proxy)
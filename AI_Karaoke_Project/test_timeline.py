@@ -0,0 +1,61 @@
+import pytest
+
+from common.timeline import (MIN_LINE_SECONDS, SECONDS_PER_WORD, as_timeline, estimate_end, from_lines, line_at,
+                             to_lines, window)
+
+TIMELINE = {
+    "t": [10.0, 14.0, 20.0],
+    "end": [13.0, 18.0, 23.0],
+    "text": ["first line", "second line", "third line"],
+    "words": [[10.0, 11.0], None, [20.0, 21.5]],
+}
+
+
+@pytest.mark.parametrize("time, index", [(0.0, -1), (9.99, -1), (10.0, 0), (13.5, 0), (14.0, 1), (100.0, 2)])
+def test_line_at(time, index):
+    assert line_at(TIMELINE, time) == index
+
+
+def test_window_takes_lines_starting_inside_and_shifts_them():
+    sub = window(TIMELINE, 10.0, 25.0, shift=10.0)
+    # Starts strictly inside (start, end)
+    assert sub["text"] == ["second line", "third line"]
+    assert sub["t"] == [4.0, 10.0]
+    assert sub["end"] == [8.0, 13.0]
+    assert sub["words"] == [None, [10.0, 11.5]]
+
+
+def test_window_without_words():
+    sub = window({k: v for k, v in TIMELINE.items() if k != "words"}, 0.0, 15.0)
+    assert sub == {"t": [10.0, 14.0], "end": [13.0, 18.0], "text": ["first line", "second line"]}
+
+
+def test_estimate_end():
+    assert estimate_end(10.0, 20.0, "a b c") == pytest.approx(10.0 + 3 * SECONDS_PER_WORD)
+    # Cut off by the next line, but never shorter than MIN_LINE_SECONDS
+    assert estimate_end(10.0, 11.0, "a b c d e") == 11.0
+    assert estimate_end(10.0, 10.1, "a b c") == 10.0 + MIN_LINE_SECONDS
+
+
+def test_from_lines_and_back():
+    lines = [{"timestamp": 14.0, "text": "second line", "end": 18.0},
+             {"start_time": 10.0, "text": "first line", "words": [10.0, 11.0]}]
+    timeline = from_lines(lines)
+    assert timeline["t"] == [10.0, 14.0]
+    assert timeline["end"] == [pytest.approx(10.0 + 2 * SECONDS_PER_WORD), 18.0]
+    assert timeline["words"] == [[10.0, 11.0], None]
+    assert to_lines(timeline)[0] == {"timestamp": 10.0, "end": timeline["end"][0], "text": "first line",
+                                     "words": [10.0, 11.0]}
+
+
+def test_as_timeline_accepts_every_format():
+    assert as_timeline(TIMELINE) is TIMELINE
+    assert as_timeline({"title": "x", "timeline": TIMELINE}) is TIMELINE
+    assert as_timeline({"lyrics": [{"timestamp": 1.0, "text": "hi"}]})["t"] == [1.0]
+    # Old timelines without "end" get estimated ends
+    assert as_timeline({"t": [1.0], "text": ["hi"]})["end"] == [1.0 + SECONDS_PER_WORD]
+
+
+@pytest.mark.parametrize("empty", [None, {}, [], {"t": [], "end": [], "text": []}, {"error": "not found"}])
+def test_as_timeline_empty(empty):
+    assert as_timeline(empty) is None
@@ -0,0 +1,76 @@
+import json
+import threading
+import time
+
+import pytest
+
+from common import tracing
+
+
+@pytest.fixture
+def trace_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(tracing, "_trace_dir", str(tmp_path))
+    monkeypatch.setattr(tracing, "_service_name", "test")
+    return tmp_path
+
+
+def read_spans(trace_dir):
+    tracing.flush()
+    with open(trace_dir / "test.jsonl") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_parse_traceparent():
+    trace_id, span_id = "a" * 32, "b" * 16
+    assert tracing.parse_traceparent(f"00-{trace_id}-{span_id}-01") == (trace_id, span_id)
+    assert tracing.parse_traceparent("00-short-span-01") == (None, None)
+    assert tracing.parse_traceparent(None) == (None, None)
+
+
+def test_child_spans_continue_the_trace(trace_dir):
+    with tracing.start_span("request", kind="SERVER") as parent:
+        with tracing.start_span("mcp:play_song", agent="audio") as child:
+            assert tracing.current_traceparent() == child.traceparent
+        assert tracing.current_span() is parent
+
+    spans = {span["name"]: span for span in read_spans(trace_dir)}
+    assert spans["mcp:play_song"]["traceId"] == spans["request"]["traceId"]
+    assert spans["mcp:play_song"]["parentId"] == spans["request"]["id"]
+    assert spans["mcp:play_song"]["tags"] == {"agent": "audio"}
+    assert "parentId" not in spans["request"]
+
+
+def test_traceparent_crosses_process_boundaries(trace_dir):
+    traceparent = f"00-{'c' * 32}-{'d' * 16}-01"
+    with tracing.start_span("tool:evaluate_singing", traceparent=traceparent):
+        pass
+    [span] = read_spans(trace_dir)
+    assert (span["traceId"], span["parentId"]) == ("c" * 32, "d" * 16)
+
+
+def test_errors_are_tagged(trace_dir):
+    with pytest.raises(RuntimeError):
+        with tracing.start_span("stage"):
+            raise RuntimeError("boom")
+    [span] = read_spans(trace_dir)
+    assert span["tags"]["error"] == "boom"
+
+
+def test_finishing_a_span_does_not_wait_for_the_disk(trace_dir, monkeypatch):
+    release = threading.Event()
+    write = tracing._write
+
+    def slow_write(batch):
+        release.wait(5)
+        write(batch)
+    monkeypatch.setattr(tracing, "_write", slow_write)
+
+    t0 = time.perf_counter()
+    for i in range(20):
+        with tracing.start_span(f"span {i}"):
+            pass
+    elapsed = time.perf_counter() - t0
+    release.set()
+
+    assert elapsed < 0.5
+    assert len(read_spans(trace_dir)) == 20
@@ -0,0 +1,94 @@
+import io
+import os
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from common.uploads import UploadOffsetError, UploadStore, UploadTooLargeError
+
+
+@pytest.fixture
+def store(tmp_path):
+    return UploadStore(spool_dir=str(tmp_path), max_bytes=1000, stream_decode=False)
+
+
+def wav_bytes(seconds=0.5, sr=16000):
+    buf = io.BytesIO()
+    t = np.arange(int(seconds * sr)) / sr
+    sf.write(buf, (0.3 * np.sin(2 * np.pi * 440 * t)).astype(np.float32), sr, format="WAV")
+    return buf.getvalue()
+
+
+def test_chunks_append_in_order(store):
+    session = store.create()
+    assert session.append(0, b"abc") == 3
+    assert session.append(3, b"def") == 6
+    assert session.read_bytes() == b"abcdef"
+    assert session.spool_path.endswith(".wav")  # unknown container: the default suffix
+
+
+def test_resent_bytes_are_ignored(store):
+    session = store.create()
+    session.append(0, b"abcdef")
+    # A retried chunk overlapping what arrived: only the new tail is kept
+    assert session.append(4, b"efgh") == 8
+    assert session.append(2, b"cd") == 8
+    assert session.read_bytes() == b"abcdefgh"
+
+
+def test_gap_is_rejected_with_the_resume_offset(store):
+    session = store.create()
+    session.append(0, b"abc")
+    with pytest.raises(UploadOffsetError) as excinfo:
+        session.append(10, b"xyz")
+    assert excinfo.value.received == 3
+    assert session.read_bytes() == b"abc"
+
+
+def test_upload_size_is_capped(store):
+    session = store.create()
+    session.append(0, b"x" * 900)
+    with pytest.raises(UploadTooLargeError):
+        session.append(900, b"x" * 200)
+    assert session.received == 900
+
+
+def test_finish_decodes_the_recording(tmp_path):
+    data = wav_bytes()
+    session = UploadStore(spool_dir=str(tmp_path), stream_decode=False).create()
+    session.append(0, data[:1000])
+    session.append(1000, data[1000:])
+
+    y, sr = session.finish()
+
+    assert sr > 0
+    assert len(y) / sr == pytest.approx(0.5, abs=0.05)
+
+
+def test_empty_upload_has_nothing_to_finish(store):
+    session = store.create()
+    assert session.spool_path is None
+    with pytest.raises(ValueError):
+        session.finish()
+
+
+def test_pop_and_discard(store):
+    session = store.create()
+    session.append(0, b"abc")
+    assert store.pop(session.id) is session
+    assert store.get(session.id) is None
+    session.discard()
+    assert not os.path.exists(session.spool_path)
+
+
+def test_idle_uploads_expire(store):
+    stale, fresh = store.create(), store.create()
+    stale.append(0, b"abc")
+    stale.updated_at -= store.ttl + 1
+
+    store.expire()
+
+    assert store.get(stale.id) is None
+    assert store.get(fresh.id) is fresh
+    assert not os.path.exists(stale.spool_path)
@@ -0,0 +1,43 @@
+import subprocess
+
+import pytest
+
+from common.video import faststart_path, have_ffmpeg, is_faststart, make_faststart, rendition_path
+
+needs_ffmpeg = pytest.mark.skipif(not have_ffmpeg(), reason="ffmpeg not installed")
+
+
+@pytest.fixture
+def slow_start_mp4(tmp_path):
+    """A short MP4 with its moov atom after the media data (ffmpeg's default layout)."""
+    path = tmp_path / "abc123.mp4"
+    subprocess.run(["ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+                    "-f", "lavfi", "-i", "sine=frequency=440:duration=1",
+                    "-c:a", "aac", str(path)], check=True)
+    return path
+
+
+def test_rendition_and_faststart_paths():
+    assert rendition_path("songs/abc123.mp4", "low") == "songs/abc123.low.mp4"
+    assert faststart_path("songs/abc123.mp4") == "songs/abc123.faststart.mp4"
+
+
+@needs_ffmpeg
+def test_make_faststart_writes_a_copy_and_leaves_the_original(slow_start_mp4):
+    original = slow_start_mp4.read_bytes()
+    assert not is_faststart(slow_start_mp4)
+
+    out = make_faststart(slow_start_mp4)
+
+    assert out == faststart_path(slow_start_mp4)
+    assert is_faststart(out)
+    # Served as immutable: the original's bytes must never change
+    assert slow_start_mp4.read_bytes() == original
+    # Existing copy is reused
+    assert make_faststart(slow_start_mp4) == out
+
+
+def test_is_faststart_ignores_non_mp4(tmp_path):
+    path = tmp_path / "notes.mp4"
+    path.write_bytes(b"not an mp4")
+    assert is_faststart(path)